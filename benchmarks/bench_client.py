@@ -0,0 +1,203 @@
+"""Benchmarks of the client against the in-process fake server.
+
+Measures channel setup cost, single-call latency, throughput under
+concurrency with threads and asyncio, and memory per in-flight call.
+
+Usage: python benchmarks/bench_client.py [--calls N] [--concurrency N] ...
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import multiprocessing.queues
+import statistics
+import time
+import tracemalloc
+from typing import Any
+
+import google.oauth2.credentials
+import grpc
+
+from gassist_text import AsyncTextAssistant, TextAssistant
+from gassist_text.fake_server import FakeEmbeddedAssistant, serve
+
+CREDENTIALS = google.oauth2.credentials.Credentials(token=None)
+
+
+def _percentiles(latencies: list[float]) -> str:
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return (
+        f"p50 {quantiles[49] * 1e3:.2f} ms, p95 {quantiles[94] * 1e3:.2f} ms, "
+        f"p99 {quantiles[98] * 1e3:.2f} ms"
+    )
+
+
+def bench_channel_setup(address: str, repeat: int) -> None:
+    """Time to create a channel, connect it and complete the first call."""
+    connect = []
+    first_call = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with grpc.insecure_channel(address) as channel:
+            grpc.channel_ready_future(channel).result(timeout=10)
+            connected = time.perf_counter()
+            with TextAssistant(CREDENTIALS, channel=channel) as assistant:
+                assistant.assist("hi")
+            done = time.perf_counter()
+        connect.append(connected - start)
+        first_call.append(done - connected)
+    print(
+        f"channel setup: connect {statistics.median(connect) * 1e3:.2f} ms, "
+        f"first call {statistics.median(first_call) * 1e3:.2f} ms"
+    )
+
+
+def bench_latency(address: str, calls: int, audio_out: bool) -> None:
+    """Latency of sequential calls on a warm channel."""
+    latencies = []
+    with (
+        grpc.insecure_channel(address) as channel,
+        TextAssistant(CREDENTIALS, audio_out=audio_out, channel=channel) as assistant,
+    ):
+        assistant.assist("warmup")
+        for _ in range(calls):
+            start = time.perf_counter()
+            assistant.assist("what's the weather")
+            latencies.append(time.perf_counter() - start)
+    print(f"single call (audio_out={audio_out}): {_percentiles(latencies)}")
+
+
+def bench_threads(address: str, calls: int, concurrency: int) -> None:
+    """Throughput of concurrent calls from a thread pool sharing one channel."""
+    with grpc.insecure_channel(address) as channel:
+
+        def call(i: int) -> float:
+            with TextAssistant(CREDENTIALS, channel=channel) as assistant:
+                start = time.perf_counter()
+                assistant.assist(f"query {i}")
+                latency = time.perf_counter() - start
+            return latency
+
+        with ThreadPoolExecutor(concurrency) as executor:
+            start = time.perf_counter()
+            latencies = list(executor.map(call, range(calls)))
+            elapsed = time.perf_counter() - start
+    print(
+        f"threads x{concurrency}: {calls / elapsed:,.0f} calls/s, "
+        f"{_percentiles(latencies)}"
+    )
+
+
+def bench_asyncio(address: str, calls: int, concurrency: int) -> None:
+    """Throughput of concurrent calls on one event loop sharing one channel."""
+
+    async def run() -> tuple[float, list[float]]:
+        semaphore = asyncio.Semaphore(concurrency)
+        async with grpc.aio.insecure_channel(address) as channel:
+
+            async def call(i: int) -> float:
+                async with semaphore:
+                    assistant = AsyncTextAssistant(CREDENTIALS, channel=channel)
+                    start = time.perf_counter()
+                    await assistant.assist(f"query {i}")
+                    return time.perf_counter() - start
+
+            start = time.perf_counter()
+            latencies = await asyncio.gather(*(call(i) for i in range(calls)))
+            return time.perf_counter() - start, list(latencies)
+
+    elapsed, latencies = asyncio.run(run())
+    print(
+        f"asyncio x{concurrency}: {calls / elapsed:,.0f} calls/s, "
+        f"{_percentiles(latencies)}"
+    )
+
+
+def _serve_forever(
+    servicer_options: dict[str, Any],
+    max_workers: int,
+    addresses: "multiprocessing.queues.Queue[str]",
+) -> None:
+    """Run a fake server until the process is terminated."""
+    server, address = serve(
+        FakeEmbeddedAssistant(**servicer_options), max_workers=max_workers
+    )
+    addresses.put(address)
+    server.wait_for_termination()
+
+
+def bench_memory(servicer_options: dict[str, Any], concurrency: int) -> None:
+    """Peak Python memory per in-flight call with audio output.
+
+    The server runs in a subprocess, so that only the client's allocations
+    are traced.
+    """
+
+    async def run(address: str) -> None:
+        async with grpc.aio.insecure_channel(address) as channel:
+            assistants = [
+                AsyncTextAssistant(CREDENTIALS, audio_out=True, channel=channel)
+                for _ in range(concurrency)
+            ]
+            await asyncio.gather(
+                *(assistant.assist("tell me the news") for assistant in assistants)
+            )
+
+    context = multiprocessing.get_context("spawn")
+    addresses: multiprocessing.queues.Queue[str] = context.Queue()
+    process = context.Process(
+        target=_serve_forever,
+        args=(servicer_options, max(concurrency, 32), addresses),
+        daemon=True,
+    )
+    process.start()
+    try:
+        address = addresses.get(timeout=30)
+        tracemalloc.start()
+        asyncio.run(run(address))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        process.terminate()
+        process.join()
+    print(f"memory: {peak / concurrency / 1024:,.1f} KiB peak per in-flight call")
+
+
+def main() -> None:
+    """Run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.0, help="server latency")
+    parser.add_argument("--chunk-count", type=int, default=10)
+    parser.add_argument("--audio-size", type=int, default=100_000)
+    parser.add_argument("--html-size", type=int, default=20_000)
+    args = parser.parse_args()
+
+    servicer_options: dict[str, Any] = {
+        "latency": args.latency,
+        "chunk_count": args.chunk_count,
+        "audio_size": args.audio_size,
+        "html_size": args.html_size,
+        # Don't keep the requests of the benchmark.
+        "max_requests": 0,
+    }
+    servicer = FakeEmbeddedAssistant(**servicer_options)
+    server, address = serve(servicer, max_workers=max(args.concurrency, 32))
+    try:
+        bench_channel_setup(address, repeat=20)
+        bench_latency(address, args.calls, audio_out=False)
+        bench_latency(address, args.calls, audio_out=True)
+        bench_threads(address, args.calls, args.concurrency)
+        bench_asyncio(address, args.calls, args.concurrency)
+        bench_memory(
+            {**servicer_options, "latency": max(args.latency, 0.05)},
+            args.concurrency,
+        )
+    finally:
+        server.stop(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Microbenchmark of extracting the card text from screen_out HTML.
+
+Compares BeautifulSoup, as demo.py used to do, with extract_card_text. The
+pages are synthetic but shaped like screen_out pages: a large head with
+inline styles and scripts, the card, then suggestion chips and more scripts.
+
+Usage: python benchmarks/bench_html_text.py [number of pages]
+"""
+
+import functools
+import sys
+import timeit
+
+from bs4 import BeautifulSoup
+
+from gassist_text.html_text import extract_card_text
+
+
+def make_page(card_paragraphs: int, suggestions: int) -> str:
+    """Return a page similar to screen_out pages."""
+    style = (
+        "<style>"
+        + ".c%d { margin: 0 4px; color: #202124; }" * 200 % tuple(range(200))
+        + "</style>"
+    )
+    script = (
+        "<script>"
+        + "window.a%d = function() { return 1; };" * 200 % tuple(range(200))
+        + "</script>"
+    )
+    card = "".join(
+        f"<div class='line'><span>Paragraph {i}</span> with <b>some</b> &amp; <i>markup</i></div>"
+        for i in range(card_paragraphs)
+    )
+    chips = "".join(
+        f"<div class='suggestion'><span>Suggestion {i}</span></div>"
+        for i in range(suggestions)
+    )
+    return (
+        f"<!DOCTYPE html><html><head><meta charset='utf-8'>{style}{script}</head><body>"
+        f"<div id='assistant-card-content'>{card}</div>"
+        f"<div class='suggestions'>{chips}</div>{script}</body></html>"
+    )
+
+
+def with_bs4(html: str) -> str:
+    """Extract the text the way demo.py used to."""
+    soup = BeautifulSoup(html, "html.parser")
+    card_content = soup.find("div", id="assistant-card-content")
+    text_source = card_content if card_content else soup
+    return text_source.get_text(separator="\n", strip=True)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    pages = {
+        "short answer": make_page(1, 8),
+        "list answer": make_page(20, 8),
+        "long page": make_page(20, 500),
+    }
+    for name, page in pages.items():
+        assert with_bs4(page) == extract_card_text(page)
+        bs4_time = timeit.timeit(functools.partial(with_bs4, page), number=number)
+        fast_time = timeit.timeit(
+            functools.partial(extract_card_text, page), number=number
+        )
+        print(
+            f"{name} ({len(page)} bytes): "
+            f"BeautifulSoup {bs4_time / number * 1e6:.0f} us/page, "
+            f"extract_card_text {fast_time / number * 1e6:.0f} us/page, "
+            f"{bs4_time / fast_time:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
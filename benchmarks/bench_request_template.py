@@ -0,0 +1,86 @@
+"""Microbenchmark of per-request serialization cost.
+
+Compares building and serializing the full AssistRequest on every call, as
+TextAssistant used to do, with serializing from a prebuilt template.
+
+Usage: python benchmarks/bench_request_template.py [number of requests]
+"""
+
+import sys
+import timeit
+
+from gassist_text.wire import AssistRequestTemplate
+from google.assistant.embedded.v1alpha2 import embedded_assistant_pb2
+
+PLAYING = embedded_assistant_pb2.ScreenOutConfig.PLAYING
+CONVERSATION_STATE = bytes(range(256)) * 2
+
+
+def build_full(text_query: str) -> bytes:
+    """Build and serialize the whole request."""
+    config = embedded_assistant_pb2.AssistConfig(
+        audio_out_config=embedded_assistant_pb2.AudioOutConfig(
+            encoding="MP3",
+            sample_rate_hertz=24000,
+            volume_percentage=100,
+        ),
+        dialog_state_in=embedded_assistant_pb2.DialogStateIn(
+            language_code="en-US",
+            conversation_state=CONVERSATION_STATE,
+            is_new_conversation=False,
+        ),
+        device_config=embedded_assistant_pb2.DeviceConfig(
+            device_id="device-id",
+            device_model_id="device-model-id",
+        ),
+        text_query=text_query,
+    )
+    config.screen_out_config.screen_mode = PLAYING
+    data: bytes = embedded_assistant_pb2.AssistRequest(
+        config=config
+    ).SerializeToString()
+    return data
+
+
+TEMPLATE = AssistRequestTemplate(
+    embedded_assistant_pb2.AssistConfig(
+        audio_out_config=embedded_assistant_pb2.AudioOutConfig(
+            encoding="MP3",
+            sample_rate_hertz=24000,
+            volume_percentage=100,
+        ),
+        dialog_state_in=embedded_assistant_pb2.DialogStateIn(language_code="en-US"),
+        device_config=embedded_assistant_pb2.DeviceConfig(
+            device_id="device-id",
+            device_model_id="device-model-id",
+        ),
+        screen_out_config=embedded_assistant_pb2.ScreenOutConfig(screen_mode=PLAYING),
+    )
+)
+
+
+def build_from_template(text_query: str) -> bytes:
+    """Serialize the request from the template."""
+    return TEMPLATE.serialize(text_query, CONVERSATION_STATE, False)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    assert embedded_assistant_pb2.AssistRequest.FromString(
+        build_from_template("what's the weather")
+    ) == embedded_assistant_pb2.AssistRequest.FromString(
+        build_full("what's the weather")
+    )
+    for name, func in (("full", build_full), ("template", build_from_template)):
+        best = min(
+            timeit.repeat(lambda: func("what's the weather"), number=number, repeat=5)
+        )
+        print(
+            f"{name:>10}: {best / number * 1e6:.2f} us/request, "
+            f"{number / best:,.0f} requests/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
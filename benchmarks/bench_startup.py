@@ -0,0 +1,73 @@
+"""Benchmark of the cold-start cost of gassist_text.
+
+Runs fresh interpreters and reports the median of:
+- the cumulative python -X importtime of `import gassist_text` and of
+  `from gassist_text import TextAssistant`,
+- the wall time from the start of the import until the first TextAssistant is
+  constructed, which includes creating its channel.
+
+Usage: python benchmarks/bench_startup.py [number of runs]
+"""
+
+import statistics
+import subprocess
+import sys
+
+STATEMENTS = {
+    "import gassist_text": "import gassist_text",
+    "from gassist_text import TextAssistant": "from gassist_text import TextAssistant",
+}
+
+FIRST_ASSISTANT = """
+import time
+start = time.perf_counter()
+import google.oauth2.credentials
+from gassist_text import TextAssistant
+assistant = TextAssistant(google.oauth2.credentials.Credentials(token=None))
+print(time.perf_counter() - start)
+assistant.close()
+"""
+
+
+def import_time(statement: str) -> float:
+    """Return the cumulative import time in seconds of the modules imported by statement."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # Only count top-level imports, nested ones are in their cumulative time.
+        if not name.startswith("  ") and name.strip() != "site":
+            total += int(cumulative)
+    return total / 1e6
+
+
+def first_assistant_time() -> float:
+    """Return the seconds to import and construct the first TextAssistant."""
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_ASSISTANT],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for name, statement in STATEMENTS.items():
+        median = statistics.median(import_time(statement) for _ in range(runs))
+        print(f"{name}: {median * 1000:.1f} ms")
+    median = statistics.median(first_assistant_time() for _ in range(runs))
+    print(f"first TextAssistant constructed: {median * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,11 +26,19 @@ class SystemBrowser:
         """Initialize temp directory."""
         self.tempdir = tempfile.mkdtemp()
 
+    def path(self, filename: str) -> str:
+        """Return the path of a file in the temp directory, e.g. to write audio to."""
+        return os.path.join(self.tempdir, filename)
+
     def display(self, contents: bytes, filename: str) -> None:
         """Store HTML contents in a file in the temp directory and open it."""
-        full_filename = os.path.join(self.tempdir, filename)
+        full_filename = self.path(filename)
         with open(full_filename, "wb") as f:
             f.write(contents)
+        self.display_file(full_filename)
+
+    def display_file(self, full_filename: str) -> None:
+        """Open a file that is already written."""
         webbrowser.open(full_filename, new=0)
 
 
@@ -1,17 +1,29 @@
 """Command line interactive tool for TextAssistant."""
 
+from collections.abc import Callable, Hashable, Iterator
 import json
 import logging
 import os
-from typing import Any
+import sys
+import time
+from typing import IO, Any
 
-from bs4 import BeautifulSoup
 import click
-import google.auth.transport.requests
 import google.oauth2.credentials
 
 import browser_helpers
-from gassist_text import TextAssistant
+from gassist_text import (
+    BatchResult,
+    ChannelPool,
+    CredentialManager,
+    FileSink,
+    SingleQuery,
+    TextAssistant,
+    assist_many,
+    extract_card_text,
+)
+from gassist_text.audio import AUDIO_ENCODINGS, AUDIO_FILE_EXTENSIONS
+from gassist_text.instrumentation import Histogram, call_status
 
 ASSISTANT_API_ENDPOINT = "embeddedassistant.googleapis.com"
 DEFAULT_GRPC_DEADLINE = 60 * 3 + 5
@@ -68,6 +80,20 @@ DEFAULT_GRPC_DEADLINE = 60 * 3 + 5
     help="Enable visual display of Assistant responses in HTML.",
 )
 @click.option("--audio_out", is_flag=True, default=False, help="Enable audio response.")
+@click.option(
+    "--audio-encoding",
+    type=click.Choice(AUDIO_ENCODINGS),
+    default="MP3",
+    show_default=True,
+    help="Encoding of the audio response.",
+)
+@click.option(
+    "--audio-sample-rate",
+    type=click.IntRange(16000, 24000),
+    default=24000,
+    show_default=True,
+    help="Sample rate of the audio response in Hz.",
+)
 @click.option("--verbose", "-v", is_flag=True, default=False, help="Verbose logging.")
 @click.option(
     "--grpc-deadline",
@@ -76,6 +102,38 @@ DEFAULT_GRPC_DEADLINE = 60 * 3 + 5
     show_default=True,
     help="gRPC deadline in seconds",
 )
+@click.option(
+    "--batch",
+    type=click.File("r"),
+    help=(
+        "Run the queries of a file, or - for stdin, instead of prompting. Each "
+        'line is a query or a JSON object like {"conversation_id": "a", '
+        '"text_query": "hi"}.'
+    ),
+)
+@click.option(
+    "--output",
+    type=click.File("w"),
+    default="-",
+    help="File to write a JSON line per result of --batch to.",
+)
+@click.option(
+    "--concurrency",
+    default=8,
+    show_default=True,
+    help="Maximum number of conversations running at once in --batch mode.",
+)
+@click.option(
+    "--group-conversations/--no-group-conversations",
+    default=True,
+    show_default=True,
+    help="Run queries with the same conversation_id in order in one conversation.",
+)
+@click.option(
+    "--audio-dir",
+    type=click.Path(file_okay=False),
+    help="Directory to write the audio of --batch results to.",
+)
 def _main(
     api_endpoint: str,
     credentials: str,
@@ -84,8 +142,15 @@ def _main(
     lang: str,
     display: bool,
     audio_out: bool,
+    audio_encoding: str,
+    audio_sample_rate: int,
     verbose: bool,
     grpc_deadline: int,
+    batch: IO[str] | None,
+    output: IO[str],
+    concurrency: int,
+    group_conversations: bool,
+    audio_dir: str | None,
     *args: Any,
     **kwargs: Any,
 ) -> None:
@@ -100,8 +165,6 @@ def _main(
             credentials_obj = google.oauth2.credentials.Credentials(
                 token=None, **json.load(f)
             )
-            http_request = google.auth.transport.requests.Request()
-            credentials_obj.refresh(http_request)
     except Exception as e:
         logging.error(f"Error loading credentials: {e}")
         logging.error(
@@ -109,6 +172,40 @@ def _main(
         )
         return
 
+    # Fetch the access token in the background while waiting for the first query.
+    credential_manager = CredentialManager()
+    credential_manager.register(credentials_obj)
+
+    if batch is not None:
+        pool = ChannelPool(credential_manager=credential_manager)
+
+        def assistant_factory(conversation_id: Hashable) -> TextAssistant:
+            return TextAssistant(
+                credentials_obj,
+                lang,
+                device_model_id,
+                device_id,
+                display,
+                audio_out,
+                grpc_deadline,
+                api_endpoint,
+                channel_pool=pool,
+                audio_encoding=audio_encoding,
+                sample_rate_hertz=audio_sample_rate,
+            )
+
+        _run_batch(
+            assistant_factory,
+            _read_queries(batch, group_conversations, output),
+            output,
+            concurrency,
+            audio_dir,
+            AUDIO_FILE_EXTENSIONS[audio_encoding],
+        )
+        pool.close()
+        credential_manager.close()
+        return
+
     with TextAssistant(
         credentials_obj,
         lang,
@@ -118,28 +215,130 @@ def _main(
         audio_out,
         grpc_deadline,
         api_endpoint,
+        credential_manager=credential_manager,
+        audio_encoding=audio_encoding,
+        sample_rate_hertz=audio_sample_rate,
     ) as assistant:
         while True:
             query = click.prompt("", type=str)
             click.echo(f"<you> {query}")
-            response_text, response_html, audio_response = assistant.assist(
-                text_query=query
-            )
+            audio_size = 0
+            if audio_out:
+                audio_path = system_browser.path(
+                    "google-assistant-sdk-audio-out."
+                    + AUDIO_FILE_EXTENSIONS[audio_encoding]
+                )
+                # Stream the audio to the file instead of buffering it.
+                with FileSink(audio_path) as audio_sink:
+                    response_text, response_html, _ = assistant.assist(
+                        text_query=query, audio_sink=audio_sink
+                    )
+                    audio_size = audio_sink.tell()
+            else:
+                response_text, response_html, _ = assistant.assist(text_query=query)
             if response_text:
                 click.echo(f"<@assistant> {response_text}")
             if response_html:
-                soup = BeautifulSoup(response_html, "html.parser")
-                card_content = soup.find("div", id="assistant-card-content")
-                text_source = card_content if card_content else soup
-                html_text = text_source.get_text(separator="\n", strip=True)
+                html_text = extract_card_text(response_html)
                 click.echo(f"<@assistant (parsed from html)> {html_text}")
                 system_browser.display(
                     response_html, "google-assistant-sdk-screen-out.html"
                 )
-            if audio_response:
-                system_browser.display(
-                    audio_response, "google-assistant-sdk-audio-out.mp3"
-                )
+            if audio_size:
+                system_browser.display_file(audio_path)
+
+
+def _read_queries(
+    lines: IO[str], group_conversations: bool, output: IO[str]
+) -> Iterator[str | tuple[Hashable, str]]:
+    """Yield the queries of --batch input, writing the error of invalid lines to output."""
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith("{"):
+            yield line
+            continue
+        try:
+            query = json.loads(line)
+            text_query = query["text_query"]
+            if not isinstance(text_query, str):
+                raise TypeError("text_query must be a string")
+        except (ValueError, TypeError, KeyError) as err:
+            record = {
+                "line": line_number,
+                "status": "INVALID_ARGUMENT",
+                "error": f"Invalid query: {err!r}",
+            }
+            output.write(json.dumps(record) + "\n")
+            continue
+        if group_conversations and "conversation_id" in query:
+            yield str(query["conversation_id"]), text_query
+        else:
+            yield text_query
+
+
+def _batch_record(
+    result: BatchResult, audio_dir: str | None, audio_extension: str
+) -> dict[str, Any]:
+    """Return the JSON output of a --batch result."""
+    conversation_id = result.conversation_id
+    record: dict[str, Any] = {
+        "index": result.index,
+        "conversation_id": (
+            None if isinstance(conversation_id, SingleQuery) else conversation_id
+        ),
+        "text_query": result.text_query,
+        "latency": round(result.elapsed, 6),
+    }
+    if result.error is not None:
+        record["status"] = call_status(result.error).name
+        record["error"] = str(result.error)
+        return record
+    assert result.response is not None
+    text, html, audio = result.response
+    record["status"] = "OK"
+    record["text"] = text
+    record["html_text"] = extract_card_text(html) if html else None
+    if audio_dir is not None and audio:
+        path = os.path.join(audio_dir, f"{result.index}.{audio_extension}")
+        with open(path, "wb") as f:
+            f.write(audio)
+        record["audio_path"] = path
+    else:
+        record["audio_size"] = len(audio)
+    return record
+
+
+def _run_batch(
+    assistant_factory: Callable[[Hashable], TextAssistant],
+    queries: Iterator[str | tuple[Hashable, str]],
+    output: IO[str],
+    concurrency: int,
+    audio_dir: str | None,
+    audio_extension: str,
+) -> None:
+    """Run queries concurrently, write a JSON line per result and print statistics."""
+    if audio_dir is not None:
+        os.makedirs(audio_dir, exist_ok=True)
+    latencies = Histogram()
+    errors = 0
+    start = time.perf_counter()
+    for result in assist_many(assistant_factory, queries, concurrency):
+        record = _batch_record(result, audio_dir, audio_extension)
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+        latencies.record(result.elapsed)
+        errors += result.error is not None
+    elapsed = time.perf_counter() - start
+    print(
+        f"{latencies.count} queries, {errors} errors in {elapsed:.2f} s, "
+        f"{latencies.count / elapsed if elapsed else 0:.1f} queries/s, latency "
+        + ", ".join(
+            f"p{p} {latencies.percentile(p) * 1000:.0f} ms" for p in (50, 90, 99)
+        ),
+        file=sys.stderr,
+    )
 
 
 if __name__ == "__main__":
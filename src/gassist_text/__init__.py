@@ -1,7 +1,148 @@
 """A Python library for interacting with Google Assistant API via text."""
 
-from .textinput import TextAssistant
+# Submodules are imported on first access of their exports, so that importing
+# the package doesn't import grpc, google-auth and the protobuf descriptors.
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .audio_sink import (
+        AudioSink,
+        FileSink,
+        MemorySink,
+        SocketSink,
+        SpillSink,
+    )
+    from .batch import BatchResult, SingleQuery, assist_many, async_assist_many
+    from .cache import CacheBackend, MemoryCacheBackend, ResponseCache
+    from .cassette import Cassette, RecordingChannel, ReplayChannel
+    from .channel_pool import ChannelPool
+    from .coalesce import Coalescer
+    from .credential_manager import CredentialManager
+    from .events import (
+        AssistEvent,
+        AudioOut,
+        ConversationStateUpdate,
+        DisplayText,
+        ScreenOut,
+    )
+    from .html_text import CardTextExtractor, extract_card_text
+    from .instrumentation import (
+        CallObserver,
+        HistogramCollector,
+        Instrumentation,
+    )
+    from .policy import CallPolicy
+    from .ratelimit import RateLimiter, RateLimitExceeded
+    from .server import GatewayClient, GatewayError, GatewayServer
+    from .sessions import (
+        AsyncSessionManager,
+        FileSessionStore,
+        Session,
+        SessionManager,
+        SessionStore,
+    )
+    from .textinput import AsyncTextAssistant, TextAssistant
+
+_EXPORTS = {
+    "AssistEvent": "events",
+    "AsyncSessionManager": "sessions",
+    "AsyncTextAssistant": "textinput",
+    "AudioOut": "events",
+    "AudioSink": "audio_sink",
+    "BatchResult": "batch",
+    "CacheBackend": "cache",
+    "CallObserver": "instrumentation",
+    "CallPolicy": "policy",
+    "CardTextExtractor": "html_text",
+    "Cassette": "cassette",
+    "ChannelPool": "channel_pool",
+    "Coalescer": "coalesce",
+    "ConversationStateUpdate": "events",
+    "CredentialManager": "credential_manager",
+    "DisplayText": "events",
+    "FileSessionStore": "sessions",
+    "FileSink": "audio_sink",
+    "GatewayClient": "server",
+    "GatewayError": "server",
+    "GatewayServer": "server",
+    "HistogramCollector": "instrumentation",
+    "Instrumentation": "instrumentation",
+    "MemoryCacheBackend": "cache",
+    "MemorySink": "audio_sink",
+    "RateLimitExceeded": "ratelimit",
+    "RateLimiter": "ratelimit",
+    "RecordingChannel": "cassette",
+    "ReplayChannel": "cassette",
+    "ResponseCache": "cache",
+    "ScreenOut": "events",
+    "Session": "sessions",
+    "SessionManager": "sessions",
+    "SessionStore": "sessions",
+    "SingleQuery": "batch",
+    "SocketSink": "audio_sink",
+    "SpillSink": "audio_sink",
+    "TextAssistant": "textinput",
+    "assist_many": "batch",
+    "async_assist_many": "batch",
+    "extract_card_text": "html_text",
+}
 
 __all__ = [
+    "AssistEvent",
+    "AsyncSessionManager",
+    "AsyncTextAssistant",
+    "AudioOut",
+    "AudioSink",
+    "BatchResult",
+    "CacheBackend",
+    "CallObserver",
+    "CallPolicy",
+    "CardTextExtractor",
+    "Cassette",
+    "ChannelPool",
+    "Coalescer",
+    "ConversationStateUpdate",
+    "CredentialManager",
+    "DisplayText",
+    "FileSessionStore",
+    "FileSink",
+    "GatewayClient",
+    "GatewayError",
+    "GatewayServer",
+    "HistogramCollector",
+    "Instrumentation",
+    "MemoryCacheBackend",
+    "MemorySink",
+    "RateLimitExceeded",
+    "RateLimiter",
+    "RecordingChannel",
+    "ReplayChannel",
+    "ResponseCache",
+    "ScreenOut",
+    "Session",
+    "SessionManager",
+    "SessionStore",
+    "SingleQuery",
+    "SocketSink",
+    "SpillSink",
     "TextAssistant",
+    "assist_many",
+    "async_assist_many",
+    "extract_card_text",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    """Import the submodule of an export on first access."""
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    """Return the module attributes including the exports not imported yet."""
+    return sorted({*globals(), *__all__})
@@ -14,44 +14,166 @@
 
 """Helper functions for the Google Assistant API."""
 
+from collections.abc import Sequence
 import logging
+import random
+import struct
+
+from google.protobuf.descriptor import Descriptor, FieldDescriptor
+from google.protobuf.message import Message
 
 from google.assistant.embedded.v1alpha2 import embedded_assistant_pb2
 
+from . import wire
+
+_LOGGER = logging.getLogger(__name__)
+
+# Fraction of messages logged at DEBUG level.
+_sample_rate = 1.0
+
+
+def set_debug_sample_rate(rate: float) -> None:
+    """Set the fraction, between 0 and 1, of requests and responses logged at DEBUG level."""
+    global _sample_rate
+    if not 0 <= rate <= 1:
+        raise ValueError(f"Invalid sample rate: {rate}")
+    _sample_rate = rate
+
+
+def _should_log() -> bool:
+    if not _LOGGER.isEnabledFor(logging.DEBUG):
+        return False
+    return _sample_rate >= 1 or random.random() < _sample_rate
+
+
+def _format_scalar(field: FieldDescriptor, value: object) -> str:
+    if (
+        field.type == FieldDescriptor.TYPE_ENUM
+        and field.enum_type is not None
+        and isinstance(value, int)
+    ):
+        enum_value = field.enum_type.values_by_number.get(value)
+        return enum_value.name if enum_value is not None else str(value)
+    if field.type == FieldDescriptor.TYPE_STRING:
+        return repr(value)
+    return str(value)
+
+
+def summarize_message(message: Message) -> str:
+    """Summarize a message on one line with bytes fields replaced by their size."""
+    parts = []
+    for field, value in message.ListFields():
+        repeated = isinstance(value, Sequence) and not isinstance(value, str | bytes)
+        values = value if repeated else [value]
+        for item in values:
+            if field.type == FieldDescriptor.TYPE_MESSAGE:
+                parts.append(f"{field.name} {{ {summarize_message(item)} }}")
+            elif field.type == FieldDescriptor.TYPE_BYTES:
+                parts.append(f"{field.name}: <{len(item)} bytes>")
+            else:
+                parts.append(f"{field.name}: {_format_scalar(field, item)}")
+    return " ".join(parts)
+
+
+def summarize_serialized(data: bytes | memoryview, descriptor: Descriptor) -> str:
+    """Summarize a serialized message like summarize_message without parsing or copying it."""
+    view = memoryview(data)
+    parts = []
+    pos = 0
+    while pos < len(view):
+        tag, pos = wire.read_varint(view, pos)
+        number, wire_type = tag >> 3, tag & 0x7
+        field = descriptor.fields_by_number.get(number)
+        name = field.name if field is not None else str(number)
+        value: object
+        if wire_type == 0:
+            value, pos = wire.read_varint(view, pos)
+            if field is not None and field.type == FieldDescriptor.TYPE_BOOL:
+                value = bool(value)
+            elif value >= 1 << 63:
+                value -= 1 << 64
+        elif wire_type == 1:
+            value = struct.unpack_from("<d", view, pos)[0]
+            pos += 8
+        elif wire_type == 5:
+            value = struct.unpack_from("<f", view, pos)[0]
+            pos += 4
+        elif wire_type == 2:
+            length, pos = wire.read_varint(view, pos)
+            payload = view[pos : pos + length]
+            pos += length
+            if field is not None and field.message_type is not None:
+                parts.append(
+                    f"{name} {{ {summarize_serialized(payload, field.message_type)} }}"
+                )
+            elif field is not None and field.type == FieldDescriptor.TYPE_STRING:
+                parts.append(f"{name}: {str(payload, 'utf-8', 'replace')!r}")
+            else:
+                parts.append(f"{name}: <{length} bytes>")
+            continue
+        else:
+            parts.append(f"<{len(view) - pos} bytes not summarized>")
+            break
+        if field is not None:
+            value = _format_scalar(field, value)
+        parts.append(f"{name}: {value}")
+    return " ".join(parts)
+
+
+class _MessageSummary:
+    """Renders summarize_message only when the log record is emitted."""
+
+    __slots__ = ("_message",)
+
+    def __init__(self, message: Message) -> None:
+        self._message = message
+
+    def __str__(self) -> str:
+        return summarize_message(self._message)
+
+
+class _SerializedSummary:
+    """Renders summarize_serialized only when the log record is emitted."""
+
+    __slots__ = ("_data", "_descriptor")
+
+    def __init__(self, data: bytes, descriptor: Descriptor) -> None:
+        self._data = data
+        self._descriptor = descriptor
+
+    def __str__(self) -> str:
+        return summarize_serialized(self._data, self._descriptor)
+
 
 def log_assist_request_without_audio(
     assist_request: embedded_assistant_pb2.AssistRequest,
 ) -> None:
     """Log AssistRequest fields without audio data."""
-    if logging.getLogger().isEnabledFor(logging.DEBUG):
-        resp_copy = embedded_assistant_pb2.AssistRequest()
-        resp_copy.CopyFrom(assist_request)
-        if len(resp_copy.audio_in) > 0:
-            size = len(resp_copy.audio_in)
-            resp_copy.ClearField("audio_in")
-            logging.debug("AssistRequest: audio_in (%d bytes)", size)
-            return
-        logging.debug("AssistRequest: %s", resp_copy)
+    if _should_log():
+        _LOGGER.debug("AssistRequest: %s", _MessageSummary(assist_request))
+
+
+def log_serialized_assist_request(data: bytes) -> None:
+    """Log a serialized AssistRequest without audio data."""
+    if _should_log():
+        _LOGGER.debug(
+            "AssistRequest: %s",
+            _SerializedSummary(data, embedded_assistant_pb2.AssistRequest.DESCRIPTOR),
+        )
 
 
 def log_assist_response_without_audio(
     assist_response: embedded_assistant_pb2.AssistResponse,
 ) -> None:
     """Log AssistResponse fields without audio data."""
-    if logging.getLogger().isEnabledFor(logging.DEBUG):
-        resp_copy = embedded_assistant_pb2.AssistResponse()
-        resp_copy.CopyFrom(assist_response)
-        has_audio_data = (
-            resp_copy.HasField("audio_out") and len(resp_copy.audio_out.audio_data) > 0
+    if _should_log():
+        _LOGGER.debug("AssistResponse: %s", _MessageSummary(assist_response))
+
+
+def log_serialized_assist_response(data: bytes) -> None:
+    """Log a serialized AssistResponse without audio data."""
+    if _should_log():
+        _LOGGER.debug(
+            "AssistResponse: %s",
+            _SerializedSummary(data, embedded_assistant_pb2.AssistResponse.DESCRIPTOR),
         )
-        if has_audio_data:
-            size = len(resp_copy.audio_out.audio_data)
-            resp_copy.audio_out.ClearField("audio_data")
-            if resp_copy.audio_out.ListFields():
-                logging.debug(
-                    "AssistResponse: %s audio_data (%d bytes)", resp_copy, size
-                )
-            else:
-                logging.debug("AssistResponse: audio_data (%d bytes)", size)
-            return
-        logging.debug("AssistResponse: %s", resp_copy)
@@ -0,0 +1,70 @@
+"""Audio output configuration and framing of the audio response."""
+
+import struct
+
+from google.assistant.embedded.v1alpha2 import embedded_assistant_pb2
+
+# Encodings supported by AudioOutConfig.
+AUDIO_ENCODINGS = tuple(
+    value.name
+    for value in embedded_assistant_pb2.AudioOutConfig.Encoding.DESCRIPTOR.values
+    if value.number != embedded_assistant_pb2.AudioOutConfig.ENCODING_UNSPECIFIED
+)
+MIN_SAMPLE_RATE_HERTZ = 16000
+MAX_SAMPLE_RATE_HERTZ = 24000
+
+# File extension of the audio returned by assist for each encoding.
+AUDIO_FILE_EXTENSIONS = {"LINEAR16": "wav", "MP3": "mp3", "OPUS_IN_OGG": "ogg"}
+
+
+def check_audio_config(
+    encoding: str, sample_rate_hertz: int, volume_percentage: int
+) -> None:
+    """Raise ValueError if the audio output configuration isn't supported by the API."""
+    if encoding not in AUDIO_ENCODINGS:
+        raise ValueError(
+            f"audio_encoding must be one of {', '.join(AUDIO_ENCODINGS)}, got {encoding!r}"
+        )
+    if not MIN_SAMPLE_RATE_HERTZ <= sample_rate_hertz <= MAX_SAMPLE_RATE_HERTZ:
+        raise ValueError(
+            f"sample_rate_hertz must be between {MIN_SAMPLE_RATE_HERTZ} and "
+            f"{MAX_SAMPLE_RATE_HERTZ}, got {sample_rate_hertz}"
+        )
+    if not 1 <= volume_percentage <= 100:
+        raise ValueError(
+            f"volume_percentage must be between 1 and 100, got {volume_percentage}"
+        )
+
+
+def wav_header(data_size: int, sample_rate_hertz: int) -> bytes:
+    """Return the header of a WAV file of 16-bit mono PCM samples."""
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + data_size,
+        b"WAVE",
+        b"fmt ",
+        16,  # size of the fmt chunk
+        1,  # PCM
+        1,  # channels
+        sample_rate_hertz,
+        sample_rate_hertz * 2,  # bytes per second
+        2,  # bytes per frame
+        16,  # bits per sample
+        b"data",
+        data_size,
+    )
+
+
+def assemble_audio(chunks: list[bytes], encoding: str, sample_rate_hertz: int) -> bytes:
+    """Join the streamed chunks into a playable file.
+
+    MP3 frames and Ogg pages are self-delimiting and can be concatenated.
+    LINEAR16 is raw PCM and is wrapped in a WAV header.
+    """
+    if not chunks:
+        return b""
+    if encoding != "LINEAR16":
+        return b"".join(chunks)
+    data_size = sum(len(chunk) for chunk in chunks)
+    return b"".join([wav_header(data_size, sample_rate_hertz), *chunks])
@@ -0,0 +1,212 @@
+"""Sinks that receive the audio response as it arrives instead of buffering it.
+
+Any object with a write(bytes) method is a sink, e.g. a file opened in binary
+mode or the stdin pipe of a player process. The sink receives the same bytes
+assist would return: LINEAR16 audio is preceded by a WAV header, which is
+rewritten with the final size once the response is complete if the sink is
+seekable.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import io
+import socket
+import tempfile
+from typing import Protocol, runtime_checkable
+
+from .audio import wav_header
+
+# Data size of the WAV header of a stream whose length isn't known yet.
+_STREAMING_DATA_SIZE = 0xFFFFFFFF - 36
+_COPY_CHUNK_SIZE = 64 * 1024
+
+
+class AudioSink(Protocol):
+    """Receives the chunks of the audio response in order."""
+
+    def write(self, data: bytes, /) -> object:
+        """Write a chunk."""
+
+
+@runtime_checkable
+class _SeekableSink(Protocol):
+    """Sink whose header can be rewritten, e.g. a file or MemorySink."""
+
+    def write(self, data: bytes, /) -> object:
+        """Write a chunk."""
+
+    def seekable(self) -> bool:
+        """Return whether seek is supported."""
+
+    def tell(self) -> int:
+        """Return the position."""
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET, /) -> int:
+        """Move to a position."""
+
+
+class MemorySink(io.BytesIO):
+    """Sink that keeps the audio in memory.
+
+    Unlike concatenating bytes, the buffer grows geometrically, so each chunk
+    is copied once. Call getvalue() for the audio.
+    """
+
+
+class FileSink:
+    """Sink that writes the audio to a file."""
+
+    def __init__(self, path: str, append: bool = False) -> None:
+        """Initialize.
+
+        path: file to write.
+        append: append to the file instead of truncating it. The WAV header of
+            appended LINEAR16 audio keeps its streaming size.
+        """
+        self.path = path
+        self._append = append
+        self._file = open(path, "ab" if append else "wb")  # noqa: SIM115
+
+    def __enter__(self) -> FileSink:  # noqa: D105
+        return self
+
+    def __exit__(  # noqa: D105
+        self, etype: object, e: object, traceback: object
+    ) -> None:
+        self.close()
+
+    def write(self, data: bytes) -> int:
+        """Write a chunk."""
+        return self._file.write(data)
+
+    def seekable(self) -> bool:
+        """Return whether the header can be rewritten, False when appending."""
+        return not self._append
+
+    def tell(self) -> int:
+        """Return the position in the file."""
+        return self._file.tell()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """Move to a position in the file."""
+        return self._file.seek(offset, whence)
+
+    def flush(self) -> None:
+        """Flush the written audio to the file."""
+        self._file.flush()
+
+    def close(self) -> None:
+        """Close the file."""
+        self._file.close()
+
+
+class SpillSink:
+    """Sink that keeps the audio in memory up to max_memory bytes and in a temporary file beyond.
+
+    The temporary file is deleted when the sink is closed.
+    """
+
+    def __init__(self, max_memory: int = 1024 * 1024, dir: str | None = None) -> None:
+        """Initialize.
+
+        max_memory: bytes of audio to keep in memory before spilling to disk.
+        dir: directory of the temporary file, the system default if None.
+        """
+        self._file: tempfile.SpooledTemporaryFile[bytes] = (
+            tempfile.SpooledTemporaryFile(max_size=max_memory, dir=dir)  # noqa: SIM115
+        )
+
+    def __enter__(self) -> SpillSink:  # noqa: D105
+        return self
+
+    def __exit__(  # noqa: D105
+        self, etype: object, e: object, traceback: object
+    ) -> None:
+        self.close()
+
+    def write(self, data: bytes) -> int:
+        """Write a chunk."""
+        return self._file.write(data)
+
+    def seekable(self) -> bool:
+        """Return True, the header can be rewritten."""
+        return True
+
+    def tell(self) -> int:
+        """Return the size written so far."""
+        return self._file.tell()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """Move to a position in the buffer."""
+        return self._file.seek(offset, whence)
+
+    def copy_to(self, sink: AudioSink) -> None:
+        """Write the audio to another sink in chunks of bounded size."""
+        end = self._file.tell()
+        self._file.seek(0)
+        try:
+            while chunk := self._file.read(_COPY_CHUNK_SIZE):
+                sink.write(chunk)
+        finally:
+            self._file.seek(end)
+
+    def getvalue(self) -> bytes:
+        """Return the audio."""
+        memory = MemorySink()
+        self.copy_to(memory)
+        return memory.getvalue()
+
+    def close(self) -> None:
+        """Discard the audio and delete the temporary file."""
+        self._file.close()
+
+
+class SocketSink:
+    """Sink that sends the audio over a connected socket, e.g. to a player.
+
+    The socket isn't closed by the sink.
+    """
+
+    def __init__(self, sock: socket.socket) -> None:
+        """Initialize."""
+        self.socket = sock
+
+    def write(self, data: bytes) -> None:
+        """Send a chunk."""
+        self.socket.sendall(data)
+
+
+class _SinkWriter:
+    """Frames the chunks of one response and writes them to a sink."""
+
+    def __init__(self, sink: AudioSink, encoding: str, sample_rate_hertz: int) -> None:
+        """Initialize."""
+        self.sink = sink
+        self.encoding = encoding
+        self.sample_rate_hertz = sample_rate_hertz
+        self.size = 0
+        self._seekable_sink: _SeekableSink | None = None
+        self._header_position = 0
+
+    def write(self, chunk: bytes) -> None:
+        """Write a chunk, preceded by the WAV header if it is the first LINEAR16 chunk."""
+        if not self.size and self.encoding == "LINEAR16":
+            if isinstance(self.sink, _SeekableSink) and self.sink.seekable():
+                self._seekable_sink = self.sink
+                self._header_position = self.sink.tell()
+            self.sink.write(wav_header(_STREAMING_DATA_SIZE, self.sample_rate_hertz))
+        self.sink.write(chunk)
+        self.size += len(chunk)
+
+    def finish(self) -> None:
+        """Rewrite the WAV header with the final size and flush the sink."""
+        sink = self._seekable_sink
+        if sink is not None:
+            end = sink.tell()
+            sink.seek(self._header_position)
+            sink.write(wav_header(self.size, self.sample_rate_hertz))
+            sink.seek(end)
+        flush: Callable[[], None] | None = getattr(self.sink, "flush", None)
+        if flush is not None:
+            flush()
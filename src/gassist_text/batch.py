@@ -0,0 +1,190 @@
+"""Run batches of text queries concurrently."""
+
+import asyncio
+from collections.abc import AsyncIterator, Callable, Hashable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import queue
+import time
+
+from .textinput import AsyncTextAssistant, TextAssistant
+
+BatchQuery = str | tuple[Hashable, str]
+
+
+@dataclass(frozen=True, slots=True)
+class SingleQuery:
+    """Conversation id of a plain string query, which is a conversation of its own.
+
+    Never equal to the conversation ids of (conversation id, text query) tuples.
+    """
+
+    # Position of the query in the input.
+    index: int
+
+
+@dataclass(frozen=True, slots=True)
+class BatchResult:
+    """Result of one query of a batch."""
+
+    conversation_id: Hashable
+    # Position of the query in the input.
+    index: int
+    text_query: str
+    # Tuple of: [text, html, audio] or None if the query failed.
+    response: tuple[str, bytes | None, bytes] | None
+    error: Exception | None
+    # Seconds spent in assist.
+    elapsed: float
+
+
+def _group_by_conversation(
+    queries: Iterable[BatchQuery],
+) -> dict[Hashable, list[tuple[int, str]]]:
+    """Group queries by conversation id preserving their order.
+
+    A plain string query is a conversation of its own, see SingleQuery.
+    """
+    conversations: dict[Hashable, list[tuple[int, str]]] = {}
+    for index, query in enumerate(queries):
+        if isinstance(query, str):
+            conversation_id: Hashable = SingleQuery(index)
+            text_query = query
+        else:
+            conversation_id, text_query = query
+        conversations.setdefault(conversation_id, []).append((index, text_query))
+    return conversations
+
+
+def assist_many(
+    assistant_factory: Callable[[Hashable], TextAssistant],
+    queries: Iterable[BatchQuery],
+    max_concurrency: int = 8,
+) -> Iterator[BatchResult]:
+    """Run queries concurrently on a thread pool and yield results in completion order.
+
+    assistant_factory: creates the assistant of a conversation id. Pass a
+        ChannelPool to the assistants to share connections between them.
+    queries: text queries or tuples of (conversation id, text query). Queries
+        of the same conversation run one after the other in the given order on
+        the same assistant, different conversations run in parallel. The
+        conversation id of a text query is a SingleQuery.
+    max_concurrency: maximum number of conversations running at the same time.
+    """
+    conversations = _group_by_conversation(queries)
+    results: queue.SimpleQueue[BatchResult] = queue.SimpleQueue()
+
+    def run_conversation(
+        conversation_id: Hashable, items: list[tuple[int, str]]
+    ) -> None:
+        try:
+            assistant = assistant_factory(conversation_id)
+        except Exception as err:
+            for index, text_query in items:
+                results.put(
+                    BatchResult(conversation_id, index, text_query, None, err, 0.0)
+                )
+            return
+        with assistant:
+            for index, text_query in items:
+                start = time.perf_counter()
+                try:
+                    response = assistant.assist(text_query)
+                except Exception as err:
+                    results.put(
+                        BatchResult(
+                            conversation_id,
+                            index,
+                            text_query,
+                            None,
+                            err,
+                            time.perf_counter() - start,
+                        )
+                    )
+                    continue
+                results.put(
+                    BatchResult(
+                        conversation_id,
+                        index,
+                        text_query,
+                        response,
+                        None,
+                        time.perf_counter() - start,
+                    )
+                )
+
+    remaining = sum(len(items) for items in conversations.values())
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+    try:
+        for conversation_id, items in conversations.items():
+            executor.submit(run_conversation, conversation_id, items)
+        for _ in range(remaining):
+            yield results.get()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def async_assist_many(
+    assistant_factory: Callable[[Hashable], AsyncTextAssistant],
+    queries: Iterable[BatchQuery],
+    max_concurrency: int = 8,
+) -> AsyncIterator[BatchResult]:
+    """Run queries concurrently on the event loop and yield results in completion order.
+
+    Arguments are the same as for assist_many.
+    """
+    conversations = _group_by_conversation(queries)
+    results: asyncio.Queue[BatchResult] = asyncio.Queue()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_conversation(
+        conversation_id: Hashable, items: list[tuple[int, str]]
+    ) -> None:
+        async with semaphore:
+            try:
+                assistant = assistant_factory(conversation_id)
+            except Exception as err:
+                for index, text_query in items:
+                    results.put_nowait(
+                        BatchResult(conversation_id, index, text_query, None, err, 0.0)
+                    )
+                return
+            async with assistant:
+                for index, text_query in items:
+                    start = time.perf_counter()
+                    try:
+                        response = await assistant.assist(text_query)
+                    except Exception as err:
+                        results.put_nowait(
+                            BatchResult(
+                                conversation_id,
+                                index,
+                                text_query,
+                                None,
+                                err,
+                                time.perf_counter() - start,
+                            )
+                        )
+                        continue
+                    results.put_nowait(
+                        BatchResult(
+                            conversation_id,
+                            index,
+                            text_query,
+                            response,
+                            None,
+                            time.perf_counter() - start,
+                        )
+                    )
+
+    remaining = sum(len(items) for items in conversations.values())
+    tasks = [
+        asyncio.create_task(run_conversation(conversation_id, items))
+        for conversation_id, items in conversations.items()
+    ]
+    try:
+        for _ in range(remaining):
+            yield await results.get()
+    finally:
+        for task in tasks:
+            task.cancel()
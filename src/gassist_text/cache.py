@@ -0,0 +1,113 @@
+"""Response cache for stateless queries."""
+
+from collections import OrderedDict
+from collections.abc import Hashable
+import threading
+import time
+from typing import Protocol
+
+CachedResponse = tuple[str, bytes | None, bytes]
+
+
+class CacheBackend(Protocol):
+    """Storage of cached responses."""
+
+    def get(self, key: Hashable) -> CachedResponse | None:
+        """Return the cached response or None if missing or expired."""
+
+    def set(self, key: Hashable, value: CachedResponse) -> None:
+        """Store a response."""
+
+
+class MemoryCacheBackend:
+    """In-memory backend with TTL and size bounded LRU eviction."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300) -> None:
+        """Initialize.
+
+        maxsize: maximum number of cached responses.
+        ttl: seconds a response stays valid.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[float, CachedResponse]] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> CachedResponse | None:
+        """Return the cached response or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: CachedResponse) -> None:
+        """Store a response evicting the least recently used one if full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all responses."""
+        with self._lock:
+            self._entries.clear()
+
+
+class ResponseCache:
+    """Cache of assist responses with hit/miss counters.
+
+    Responses are keyed on the normalized query and the assistant's language,
+    device and output configuration. By default queries continuing a
+    conversation, i.e. when the assistant has a conversation state, bypass the
+    cache since their response depends on the conversation. Queries sent with
+    assist(..., stateless=True) don't continue one and use the cache.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend | None = None,
+        cache_in_conversation: bool = False,
+    ) -> None:
+        """Initialize.
+
+        backend: storage of the responses, MemoryCacheBackend by default.
+        cache_in_conversation: also cache queries that continue a conversation.
+        """
+        self.backend: CacheBackend = (
+            backend if backend is not None else MemoryCacheBackend()
+        )
+        self.cache_in_conversation = cache_in_conversation
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_query(text_query: str) -> str:
+        """Normalize case and whitespace of a query."""
+        return " ".join(text_query.casefold().split())
+
+    def get(self, key: Hashable) -> CachedResponse | None:
+        """Return the cached response and update the counters."""
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: CachedResponse) -> None:
+        """Store a response."""
+        self.backend.set(key, value)
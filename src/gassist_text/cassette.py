@@ -0,0 +1,515 @@
+"""Record Assist calls to a cassette file and replay them without network access.
+
+A cassette is a sequence of length-prefixed records. Each call starts with a
+CALL record holding the method, followed by its serialized requests and
+responses, each with the seconds since the start of the call, and ends with
+a STATUS record. An optional index file next to it holds the start and end
+offsets of each call so that opening a large cassette doesn't scan it. An
+index that doesn't match the cassette, e.g. left by an interrupted recording,
+is ignored. Cassettes are memory
+mapped when replayed, so recordings with audio aren't loaded into memory.
+
+Pass a RecordingChannel or a ReplayChannel as the channel of a TextAssistant:
+
+    with RecordingChannel(grpc_channel, "calls.cassette") as channel:
+        TextAssistant(credentials, channel=channel).assist("hi")
+    with ReplayChannel("calls.cassette", realtime=True) as channel:
+        TextAssistant(credentials, channel=channel).assist("hi")
+"""
+
+from collections.abc import Callable, Iterable, Iterator
+import contextlib
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Any
+
+import grpc
+
+_MAGIC = b"GACAS001"
+_INDEX_MAGIC = b"GAIDX002"
+# kind, seconds since the start of the call, payload length
+_RECORD = struct.Struct("<BdI")
+# status code, followed by the details
+_STATUS = struct.Struct("<i")
+# start and end offsets of a call
+_INDEX_ENTRY = struct.Struct("<QQ")
+
+CALL = 0
+REQUEST = 1
+RESPONSE = 2
+STATUS = 3
+
+_STATUS_CODES = {code.value[0]: code for code in grpc.StatusCode}
+
+
+def index_path(path: str) -> str:
+    """Return the path of the index of a cassette."""
+    return path + ".idx"
+
+
+class _CassetteWriter:
+    """Appends calls to a cassette, each call written at once so calls don't interleave."""
+
+    def __init__(self, path: str, index: bool) -> None:
+        self._lock = threading.Lock()
+        self._file = open(path, "wb")
+        self._file.write(_MAGIC)
+        self._index = open(index_path(path), "wb") if index else None
+        if self._index is not None:
+            self._index.write(_INDEX_MAGIC)
+        else:
+            # Don't leave the index of a previous recording next to the new one.
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(index_path(path))
+
+    def write_call(self, records: list[tuple[int, float, bytes]]) -> None:
+        data = b"".join(
+            _RECORD.pack(kind, offset, len(payload)) + payload
+            for kind, offset, payload in records
+        )
+        with self._lock:
+            position = self._file.tell()
+            self._file.write(data)
+            self._file.flush()
+            if self._index is not None:
+                self._index.write(_INDEX_ENTRY.pack(position, position + len(data)))
+                self._index.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+            if self._index is not None:
+                self._index.close()
+
+
+class _RecordingCall:
+    """Response iterator of a recorded call."""
+
+    def __init__(
+        self,
+        call: Any,
+        records: list[tuple[int, float, bytes]],
+        start: float,
+        writer: _CassetteWriter,
+        response_deserializer: Callable[[bytes], Any] | None,
+    ) -> None:
+        self._call = call
+        self._records = records
+        self._start = start
+        self._writer = writer
+        self._response_deserializer = response_deserializer
+        self._finished = False
+
+    def __iter__(self) -> "_RecordingCall":  # noqa: D105
+        return self
+
+    def __next__(self) -> Any:  # noqa: D105
+        try:
+            data = next(self._call)
+        except StopIteration:
+            self._finish(grpc.StatusCode.OK, "")
+            raise
+        except grpc.RpcError as err:
+            code = err.code() if isinstance(err, grpc.Call) else grpc.StatusCode.UNKNOWN
+            details = err.details() if isinstance(err, grpc.Call) else str(err)
+            self._finish(code, details or "")
+            raise
+        self._records.append((RESPONSE, time.monotonic() - self._start, data))
+        if self._response_deserializer is None:
+            return data
+        return self._response_deserializer(data)
+
+    def cancel(self) -> bool:
+        """Cancel the call."""
+        return bool(self._call.cancel())
+
+    def _finish(self, code: grpc.StatusCode, details: str) -> None:
+        if self._finished:
+            return
+        self._finished = True
+        payload = _STATUS.pack(code.value[0]) + details.encode()
+        self._records.append((STATUS, time.monotonic() - self._start, payload))
+        self._writer.write_call(self._records)
+
+
+class _RecordingMultiCallable:
+    def __init__(
+        self,
+        channel: grpc.Channel,
+        method: str,
+        writer: _CassetteWriter,
+        request_serializer: Callable[[Any], bytes] | None,
+        response_deserializer: Callable[[bytes], Any] | None,
+    ) -> None:
+        # Requests and responses pass through as bytes to record them.
+        self._multi_callable = channel.stream_stream(method)
+        self._method = method
+        self._writer = writer
+        self._request_serializer = request_serializer
+        self._response_deserializer = response_deserializer
+
+    def __call__(
+        self,
+        request_iterator: Iterable[Any],
+        timeout: float | None = None,
+        **kwargs: Any,
+    ) -> _RecordingCall:
+        start = time.monotonic()
+        records = [(CALL, time.time(), self._method.encode())]
+
+        def requests() -> Iterator[bytes]:
+            for request in request_iterator:
+                if self._request_serializer is not None:
+                    request = self._request_serializer(request)
+                records.append((REQUEST, time.monotonic() - start, request))
+                yield request
+
+        call = self._multi_callable(requests(), timeout, **kwargs)
+        return _RecordingCall(
+            call, records, start, self._writer, self._response_deserializer
+        )
+
+
+class RecordingChannel:
+    """Channel that records the calls made through another channel to a cassette.
+
+    Only streaming calls are supported, which is all TextAssistant makes. The
+    wrapped channel isn't closed.
+    """
+
+    def __init__(self, channel: grpc.Channel, path: str, index: bool = True) -> None:
+        """Initialize.
+
+        channel: channel to make the calls on.
+        path: cassette file to create, an existing file is overwritten.
+        index: also write an index of the calls to path + ".idx".
+        """
+        self.channel = channel
+        self._writer = _CassetteWriter(path, index)
+
+    def __enter__(self) -> "RecordingChannel":  # noqa: D105
+        return self
+
+    def __exit__(  # noqa: D105
+        self, etype: object, e: object, traceback: object
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the cassette."""
+        self._writer.close()
+
+    def subscribe(
+        self,
+        callback: Callable[[grpc.ChannelConnectivity], None],
+        try_to_connect: bool = False,
+    ) -> None:
+        """Subscribe to the connectivity of the wrapped channel."""
+        self.channel.subscribe(callback, try_to_connect)
+
+    def unsubscribe(self, callback: Callable[[grpc.ChannelConnectivity], None]) -> None:
+        """Unsubscribe from the connectivity of the wrapped channel."""
+        self.channel.unsubscribe(callback)
+
+    def stream_stream(
+        self,
+        method: str,
+        request_serializer: Callable[[Any], bytes] | None = None,
+        response_deserializer: Callable[[bytes], Any] | None = None,
+        **kwargs: Any,
+    ) -> _RecordingMultiCallable:
+        """Return a callable for a stream-stream method that records its calls."""
+        return _RecordingMultiCallable(
+            self.channel,
+            method,
+            self._writer,
+            request_serializer,
+            response_deserializer,
+        )
+
+
+class Cassette:
+    """Memory-mapped reader of a cassette."""
+
+    def __init__(self, path: str) -> None:
+        """Initialize.
+
+        path: cassette file. Its index is used if it exists and matches the
+            cassette, otherwise the cassette is scanned.
+        """
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(_MAGIC)] != _MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} isn't a cassette")
+        offsets = self._read_index(path)
+        self._offsets = offsets if offsets is not None else self._scan()
+
+    def __len__(self) -> int:
+        """Return the number of calls."""
+        return len(self._offsets)
+
+    def __enter__(self) -> "Cassette":  # noqa: D105
+        return self
+
+    def __exit__(  # noqa: D105
+        self, etype: object, e: object, traceback: object
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmap the cassette."""
+        self._mmap.close()
+
+    def _read_index(self, path: str) -> list[int] | None:
+        """Return the offsets of the calls in the index, None if it doesn't match the cassette.
+
+        The calls of the index must follow each other from the start to the end
+        of the cassette.
+        """
+        try:
+            with open(index_path(path), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        entries = data[len(_INDEX_MAGIC) :]
+        if not data.startswith(_INDEX_MAGIC) or len(entries) % _INDEX_ENTRY.size:
+            return None
+        offsets = []
+        position = len(_MAGIC)
+        for start, end in _INDEX_ENTRY.iter_unpack(entries):
+            if start != position or end <= start:
+                return None
+            offsets.append(start)
+            position = end
+        if position != len(self._mmap):
+            return None
+        return offsets
+
+    def _scan(self) -> list[int]:
+        """Return the offsets of the calls by reading the headers of all records."""
+        offsets = []
+        position = len(_MAGIC)
+        end = len(self._mmap)
+        while position + _RECORD.size <= end:
+            kind, _, length = _RECORD.unpack_from(self._mmap, position)
+            if kind == CALL:
+                offsets.append(position)
+            position += _RECORD.size + length
+        return offsets
+
+    def records(self, index: int) -> Iterator[tuple[int, float, bytes]]:
+        """Yield the (kind, seconds since the start of the call, payload) of the records of a call.
+
+        The payload of the CALL record is the method and the one of the
+        STATUS record is the status code and details, see status().
+        """
+        position = self._offsets[index]
+        end = len(self._mmap)
+        first = True
+        while position + _RECORD.size <= end:
+            kind, offset, length = _RECORD.unpack_from(self._mmap, position)
+            if kind == CALL and not first:
+                return
+            first = False
+            start = position + _RECORD.size
+            position = start + length
+            yield kind, offset, self._mmap[start:position]
+            if kind == STATUS:
+                return
+
+    @staticmethod
+    def status(payload: bytes) -> tuple[grpc.StatusCode, str]:
+        """Return the status code and details of the payload of a STATUS record."""
+        (code,) = _STATUS.unpack_from(payload)
+        details = payload[_STATUS.size :].decode()
+        return _STATUS_CODES.get(code, grpc.StatusCode.UNKNOWN), details
+
+
+class ReplayError(grpc.RpcError):  # type: ignore[misc]
+    """Recorded error status of a replayed call."""
+
+    def __init__(self, code: grpc.StatusCode, details: str) -> None:
+        """Initialize."""
+        super().__init__(f"{code.name}: {details}")
+        self._code = code
+        self._details = details
+
+    def code(self) -> grpc.StatusCode:
+        """Return the status code."""
+        return self._code
+
+    def details(self) -> str:
+        """Return the status details."""
+        return self._details
+
+
+class _ReplayCall:
+    """Response iterator of a replayed call."""
+
+    def __init__(
+        self,
+        records: Iterator[tuple[int, float, bytes]],
+        realtime: bool,
+        deadline: float | None,
+        response_deserializer: Callable[[bytes], Any] | None,
+    ) -> None:
+        self._records = records
+        self._realtime = realtime
+        self._deadline = deadline
+        self._response_deserializer = response_deserializer
+        self._start = time.monotonic()
+        self._cancelled = False
+
+    def __iter__(self) -> "_ReplayCall":  # noqa: D105
+        return self
+
+    def __next__(self) -> Any:  # noqa: D105
+        for kind, offset, payload in self._records:
+            if self._cancelled:
+                raise ReplayError(grpc.StatusCode.CANCELLED, "Locally cancelled")
+            if kind not in (RESPONSE, STATUS):
+                continue
+            if self._realtime:
+                self._wait(offset)
+            if kind == STATUS:
+                try:
+                    code, details = Cassette.status(payload)
+                except (struct.error, UnicodeDecodeError) as err:
+                    raise ReplayError(
+                        grpc.StatusCode.DATA_LOSS, f"Corrupt status record: {err}"
+                    ) from err
+                if code != grpc.StatusCode.OK:
+                    raise ReplayError(code, details)
+                raise StopIteration
+            if self._response_deserializer is None:
+                return payload
+            return self._response_deserializer(payload)
+        raise StopIteration
+
+    def _wait(self, offset: float) -> None:
+        delay = self._start + offset - time.monotonic()
+        if self._deadline is not None and self._start + offset > self._deadline:
+            time.sleep(max(self._deadline - time.monotonic(), 0))
+            raise ReplayError(grpc.StatusCode.DEADLINE_EXCEEDED, "Deadline Exceeded")
+        if delay > 0:
+            time.sleep(delay)
+
+    def cancel(self) -> bool:
+        """Cancel the call."""
+        self._cancelled = True
+        return True
+
+
+class _ReplayMultiCallable:
+    def __init__(
+        self,
+        channel: "ReplayChannel",
+        method: str,
+        request_serializer: Callable[[Any], bytes] | None,
+        response_deserializer: Callable[[bytes], Any] | None,
+    ) -> None:
+        self._channel = channel
+        self._method = method
+        self._request_serializer = request_serializer
+        self._response_deserializer = response_deserializer
+
+    def __call__(
+        self,
+        request_iterator: Iterable[Any],
+        timeout: float | None = None,
+        **kwargs: Any,
+    ) -> _ReplayCall:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # Consume the requests like a server would.
+        for _ in request_iterator:
+            pass
+        records = self._channel._next_call(self._method)
+        return _ReplayCall(
+            records, self._channel.realtime, deadline, self._response_deserializer
+        )
+
+
+class ReplayChannel:
+    """Channel that replays the calls of a cassette in the recorded order.
+
+    Requests are consumed but not compared to the recorded ones.
+    """
+
+    def __init__(self, path: str, realtime: bool = False, loop: bool = False) -> None:
+        """Initialize.
+
+        path: cassette file.
+        realtime: stream responses with their recorded timing instead of as fast
+            as possible.
+        loop: start over after the last call instead of failing with
+            OUT_OF_RANGE, e.g. for load tests.
+        """
+        self.cassette = Cassette(path)
+        self.realtime = realtime
+        self.loop = loop
+        self._lock = threading.Lock()
+        self._position = 0
+
+    def __enter__(self) -> "ReplayChannel":  # noqa: D105
+        return self
+
+    def __exit__(  # noqa: D105
+        self, etype: object, e: object, traceback: object
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the cassette."""
+        self.cassette.close()
+
+    def subscribe(
+        self,
+        callback: Callable[[grpc.ChannelConnectivity], None],
+        try_to_connect: bool = False,
+    ) -> None:
+        """Report the channel as ready, it has no connection to wait for."""
+        callback(grpc.ChannelConnectivity.READY)
+
+    def unsubscribe(self, callback: Callable[[grpc.ChannelConnectivity], None]) -> None:
+        """Do nothing, the channel's connectivity never changes."""
+
+    def stream_stream(
+        self,
+        method: str,
+        request_serializer: Callable[[Any], bytes] | None = None,
+        response_deserializer: Callable[[bytes], Any] | None = None,
+        **kwargs: Any,
+    ) -> _ReplayMultiCallable:
+        """Return a callable for a stream-stream method that replays recorded calls."""
+        return _ReplayMultiCallable(
+            self, method, request_serializer, response_deserializer
+        )
+
+    def _next_call(self, method: str) -> Iterator[tuple[int, float, bytes]]:
+        with self._lock:
+            if self._position >= len(self.cassette):
+                if not self.loop or not len(self.cassette):
+                    raise ReplayError(
+                        grpc.StatusCode.OUT_OF_RANGE, "No more recorded calls"
+                    )
+                self._position = 0
+            index = self._position
+            self._position += 1
+        records = self.cassette.records(index)
+        kind, _, payload = next(records)
+        try:
+            recorded_method = payload.decode()
+        except UnicodeDecodeError as err:
+            raise ReplayError(
+                grpc.StatusCode.DATA_LOSS, f"Corrupt method of recorded call {index}"
+            ) from err
+        if kind != CALL or recorded_method != method:
+            raise ReplayError(
+                grpc.StatusCode.UNIMPLEMENTED,
+                f"Recorded call {index} isn't a call of {method}",
+            )
+        return records
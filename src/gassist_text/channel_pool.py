@@ -0,0 +1,248 @@
+"""Shared, reference-counted pool of authorized gRPC channels."""
+
+from collections.abc import Callable, Sequence
+import functools
+import threading
+import time
+from typing import Any
+
+import google.auth.transport.grpc
+import google.oauth2.credentials
+import grpc
+
+from .credential_manager import CredentialManager, _LazyRequest
+
+ChannelFactory = Callable[[google.oauth2.credentials.Credentials, str], grpc.Channel]
+ChannelOptions = Sequence[tuple[str, Any]]
+
+
+def channel_options(
+    keepalive_time: float | None = None,
+    keepalive_timeout: float = 20,
+    max_receive_message_length: int | None = None,
+    max_send_message_length: int | None = None,
+) -> list[tuple[str, Any]]:
+    """Return gRPC channel arguments for create_channel.
+
+    keepalive_time: seconds between HTTP/2 pings, also while no call is in
+        flight, so that NATs and load balancers don't drop an idle connection.
+        Servers answer pings sent more often than every 5 minutes by closing
+        the connection, so keep it at 300 or more. Disabled if None.
+    keepalive_timeout: seconds to wait for a ping to be acknowledged before
+        closing the connection.
+    max_receive_message_length: maximum size in bytes of a response message,
+        gRPC's default is 4 MiB.
+    max_send_message_length: maximum size in bytes of a request message.
+    """
+    options: list[tuple[str, Any]] = []
+    if keepalive_time is not None:
+        options += [
+            ("grpc.keepalive_time_ms", int(keepalive_time * 1000)),
+            ("grpc.keepalive_timeout_ms", int(keepalive_timeout * 1000)),
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.max_pings_without_data", 0),
+        ]
+    if max_receive_message_length is not None:
+        options.append(("grpc.max_receive_message_length", max_receive_message_length))
+    if max_send_message_length is not None:
+        options.append(("grpc.max_send_message_length", max_send_message_length))
+    return options
+
+
+def _channel_credentials(
+    credentials: google.oauth2.credentials.Credentials,
+    credential_manager: CredentialManager | None,
+) -> grpc.ChannelCredentials:
+    metadata_plugin: grpc.AuthMetadataPlugin
+    if credential_manager is not None:
+        metadata_plugin = credential_manager.metadata_plugin(credentials)
+    else:
+        metadata_plugin = google.auth.transport.grpc.AuthMetadataPlugin(
+            credentials, _LazyRequest()
+        )
+    return grpc.composite_channel_credentials(
+        grpc.ssl_channel_credentials(), grpc.metadata_call_credentials(metadata_plugin)
+    )
+
+
+def create_channel(
+    credentials: google.oauth2.credentials.Credentials,
+    api_endpoint: str,
+    credential_manager: CredentialManager | None = None,
+    options: ChannelOptions = (),
+    compression: grpc.Compression | None = None,
+) -> grpc.Channel:
+    """Create an authorized gRPC channel.
+
+    credential_manager: refreshes the credentials ahead of expiry. Without it
+        credentials are refreshed on the first call after they expire.
+    options: gRPC channel arguments, see channel_options.
+    compression: compression of the requests, e.g. grpc.Compression.Gzip.
+    """
+    if credential_manager is None:
+        return google.auth.transport.grpc.secure_authorized_channel(
+            credentials,
+            _LazyRequest(),
+            api_endpoint,
+            options=options,
+            compression=compression,
+        )
+    return grpc.secure_channel(
+        api_endpoint,
+        _channel_credentials(credentials, credential_manager),
+        options,
+        compression,
+    )
+
+
+def create_aio_channel(
+    credentials: google.oauth2.credentials.Credentials,
+    api_endpoint: str,
+    credential_manager: CredentialManager | None = None,
+    options: ChannelOptions = (),
+    compression: grpc.Compression | None = None,
+) -> grpc.aio.Channel:
+    """Create an authorized asyncio gRPC channel.
+
+    Equivalent of create_channel for grpc.aio.
+    """
+    return grpc.aio.secure_channel(
+        api_endpoint,
+        _channel_credentials(credentials, credential_manager),
+        options,
+        compression,
+    )
+
+
+class _PoolEntry:
+    __slots__ = ("key", "credentials", "channel", "refcount", "idle_since")
+
+    def __init__(
+        self,
+        key: tuple[int, str],
+        credentials: google.oauth2.credentials.Credentials,
+        channel: grpc.Channel,
+    ) -> None:
+        self.key = key
+        # Keep a reference so that id(credentials) in the key isn't reused.
+        self.credentials = credentials
+        self.channel = channel
+        self.refcount = 0
+        self.idle_since = 0.0
+
+
+class ChannelPool:
+    """Pool of channels keyed by (credentials, api_endpoint).
+
+    Channels are reference counted. A channel that is no longer acquired stays
+    open for idle_timeout seconds so that it can be reused, and is closed by
+    the first acquire/release/evict_idle call after that. There is no timer:
+    call evict_idle periodically to close the idle channels of a pool that
+    isn't used anymore, or close the pool.
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float = 300,
+        factory: ChannelFactory | None = None,
+        credential_manager: CredentialManager | None = None,
+        options: ChannelOptions = (),
+        compression: grpc.Compression | None = None,
+    ) -> None:
+        """Initialize.
+
+        idle_timeout: seconds to keep an unused channel open.
+        factory: function that creates a channel for (credentials, api_endpoint).
+            Defaults to create_channel.
+        credential_manager: passed to create_channel if there is no factory.
+        options: passed to create_channel if there is no factory.
+        compression: passed to create_channel if there is no factory.
+        """
+        self.idle_timeout = idle_timeout
+        # Manager the credentials of the created channels are registered with.
+        self._credential_manager = credential_manager if factory is None else None
+        self._factory = factory or functools.partial(
+            create_channel,
+            credential_manager=credential_manager,
+            options=options,
+            compression=compression,
+        )
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[int, str], _PoolEntry] = {}
+        self._by_channel: dict[int, _PoolEntry] = {}
+        self._closed = False
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self._entries)
+
+    def acquire(
+        self, credentials: google.oauth2.credentials.Credentials, api_endpoint: str
+    ) -> grpc.Channel:
+        """Return a shared channel, creating it if needed. Pair with release."""
+        key = (id(credentials), api_endpoint)
+        with self._lock:
+            expired = self._pop_expired(time.monotonic())
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _PoolEntry(
+                    key, credentials, self._factory(credentials, api_endpoint)
+                )
+                self._entries[key] = entry
+                self._by_channel[id(entry.channel)] = entry
+            entry.refcount += 1
+        self._close_all(expired)
+        return entry.channel
+
+    def release(self, channel: grpc.Channel) -> None:
+        """Release a channel returned by acquire.
+
+        Does nothing once the pool is closed, the channel is already closed.
+        """
+        with self._lock:
+            entry = self._by_channel.get(id(channel))
+            if entry is None and self._closed:
+                return
+            if entry is None or entry.refcount == 0:
+                raise ValueError("Channel is not acquired from this pool")
+            now = time.monotonic()
+            entry.refcount -= 1
+            if entry.refcount == 0:
+                entry.idle_since = now
+            expired = self._pop_expired(now)
+        self._close_all(expired)
+
+    def evict_idle(self) -> int:
+        """Close channels idle for longer than idle_timeout and return how many were closed."""
+        with self._lock:
+            expired = self._pop_expired(time.monotonic())
+        self._close_all(expired)
+        return len(expired)
+
+    def close(self) -> None:
+        """Close all channels, including those still acquired.
+
+        Releasing them afterwards does nothing.
+        """
+        with self._lock:
+            self._closed = True
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._by_channel.clear()
+        self._close_all(entries)
+
+    def _pop_expired(self, now: float) -> list[_PoolEntry]:
+        expired = [
+            entry
+            for entry in self._entries.values()
+            if entry.refcount == 0 and now - entry.idle_since >= self.idle_timeout
+        ]
+        for entry in expired:
+            del self._entries[entry.key]
+            del self._by_channel[id(entry.channel)]
+        return expired
+
+    def _close_all(self, entries: list[_PoolEntry]) -> None:
+        for entry in entries:
+            entry.channel.close()
+            if self._credential_manager is not None:
+                self._credential_manager.unregister(entry.credentials)
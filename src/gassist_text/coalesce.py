@@ -0,0 +1,104 @@
+"""Share one in-flight Assist call between identical concurrent queries."""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+import threading
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """Outcome of a call shared by threads."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class Coalescer:
+    """Singleflight of identical stateless queries.
+
+    While a call with a key is in flight, further calls with the same key wait
+    for it and get its result or error instead of making their own call. The
+    conversation state of the waiting calls is left untouched, like on cache
+    hits. Queries sent with assist(..., stateless=True) are coalesced whatever
+    the assistant's conversation state. Share one coalescer between assistants
+    using the same credentials.
+    """
+
+    def __init__(self, coalesce_in_conversation: bool = False) -> None:
+        """Initialize.
+
+        coalesce_in_conversation: also coalesce queries sent with a
+            conversation state, with the queries continuing the same state.
+        """
+        self.coalesce_in_conversation = coalesce_in_conversation
+        self._lock = threading.Lock()
+        self._flights: dict[Hashable, _Flight] = {}
+        self._tasks: dict[
+            tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task[Any]
+        ] = {}
+        # Calls that were served by another call in flight.
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        """Return the number of calls in flight."""
+        return len(self._flights) + len(self._tasks)
+
+    def call(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Return fn(), or the result of the call in flight with the same key."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            result: T = flight.result
+            return result
+        try:
+            result = fn()
+        except BaseException as err:
+            flight.error = err
+            raise
+        else:
+            flight.result = result
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return result
+
+    async def async_call(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Return await fn(), or the result of the call in flight with the same key.
+
+        The call runs in a task, so cancelling one of the callers doesn't
+        cancel it for the others.
+        """
+        loop_key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            task = self._tasks.get(loop_key)
+            if task is None:
+                task = asyncio.ensure_future(fn())
+                self._tasks[loop_key] = task
+                task.add_done_callback(lambda _: self._remove_task(loop_key))
+            else:
+                self.coalesced += 1
+        result: T = await asyncio.shield(task)
+        return result
+
+    def _remove_task(
+        self, loop_key: tuple[asyncio.AbstractEventLoop, Hashable]
+    ) -> None:
+        with self._lock:
+            del self._tasks[loop_key]
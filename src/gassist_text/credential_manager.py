@@ -0,0 +1,222 @@
+"""Proactive, shared refresh of OAuth2 credentials."""
+
+import datetime as dt
+import logging
+import threading
+import time
+from typing import Any
+
+import google.auth.transport
+import google.auth.transport.grpc
+import google.oauth2.credentials
+import grpc
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _LazyRequest(google.auth.transport.Request):
+    """HTTP transport of google-auth that imports requests on the first refresh.
+
+    Importing requests takes longer than creating a channel, so it is kept off
+    the construction of assistants.
+    """
+
+    def __init__(self) -> None:
+        self._request: google.auth.transport.Request | None = None
+
+    def __call__(self, *args: Any, **kwargs: Any) -> google.auth.transport.Response:
+        if self._request is None:
+            import google.auth.transport.requests
+
+            self._request = google.auth.transport.requests.Request()
+        response: google.auth.transport.Response = self._request(*args, **kwargs)
+        return response
+
+
+class _Entry:
+    __slots__ = ("credentials", "lock", "next_attempt", "registrations")
+
+    def __init__(self, credentials: google.oauth2.credentials.Credentials) -> None:
+        self.credentials = credentials
+        # Number of register calls not yet paired with unregister.
+        self.registrations = 0
+        # Serializes refreshes of the credentials.
+        self.lock = threading.Lock()
+        # Monotonic time before which background refresh isn't retried.
+        self.next_attempt = 0.0
+
+
+class CredentialManager:
+    """Refreshes OAuth2 credentials in a background thread before they expire.
+
+    Share one manager between all assistants, or pass it to a ChannelPool, so
+    that each credentials object is refreshed once for all of them. Concurrent
+    refreshes of the same credentials are coalesced into one. Credentials are
+    refreshed until each register call, including the one made for each
+    channel, is paired with an unregister call.
+    """
+
+    def __init__(
+        self,
+        refresh_margin: float = 300,
+        retry_interval: float = 10,
+        request: google.auth.transport.Request | None = None,
+    ) -> None:
+        """Initialize.
+
+        refresh_margin: refresh credentials this many seconds before they expire.
+        retry_interval: seconds to wait before retrying a failed background refresh.
+        request: HTTP transport used to refresh the credentials.
+        """
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self._request = request or _LazyRequest()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._entries: dict[int, _Entry] = {}
+        # Entries of unregistered credentials being refreshed by ensure_valid.
+        self._unregistered: dict[int, _Entry] = {}
+        self._thread: threading.Thread | None = None
+        self._closed = False
+        self.refresh_count = 0
+
+    def __enter__(self) -> "CredentialManager":  # noqa: D105
+        return self
+
+    def __exit__(  # noqa: D105
+        self, etype: object, e: object, traceback: object
+    ) -> None:
+        self.close()
+
+    def register(self, credentials: google.oauth2.credentials.Credentials) -> None:
+        """Start refreshing credentials in the background."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("CredentialManager is closed")
+            entry = self._entries.setdefault(id(credentials), _Entry(credentials))
+            entry.registrations += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="CredentialManager", daemon=True
+                )
+                self._thread.start()
+            self._wakeup.notify()
+
+    def unregister(self, credentials: google.oauth2.credentials.Credentials) -> None:
+        """Stop refreshing credentials once they are unregistered as often as registered."""
+        with self._lock:
+            entry = self._entries.get(id(credentials))
+            if entry is None:
+                return
+            entry.registrations -= 1
+            if not entry.registrations:
+                del self._entries[id(credentials)]
+
+    def close(self) -> None:
+        """Stop the background thread."""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def ensure_valid(self, credentials: google.oauth2.credentials.Credentials) -> None:
+        """Refresh credentials if they aren't valid, sharing a refresh already in progress.
+
+        Credentials that aren't registered are refreshed without registering them.
+        """
+        if credentials.valid:
+            return
+        with self._lock:
+            entry = self._entries.get(id(credentials))
+            unregistered = entry is None
+            if entry is None:
+                entry = self._unregistered.setdefault(
+                    id(credentials), _Entry(credentials)
+                )
+        try:
+            self._refresh(entry, margin=0)
+        finally:
+            if unregistered:
+                with self._lock:
+                    if self._unregistered.get(id(credentials)) is entry:
+                        del self._unregistered[id(credentials)]
+
+    def metadata_plugin(
+        self, credentials: google.oauth2.credentials.Credentials
+    ) -> grpc.AuthMetadataPlugin:
+        """Return a gRPC auth plugin for credentials refreshed by this manager.
+
+        The credentials are registered, unregister them once the channel is closed.
+        """
+        self.register(credentials)
+        return _ManagedAuthMetadataPlugin(self, credentials, self._request)
+
+    def _seconds_left(
+        self, credentials: google.oauth2.credentials.Credentials
+    ) -> float:
+        """Return seconds until the credentials expire, 0 if they have no token."""
+        if not credentials.token:
+            return 0.0
+        if credentials.expiry is None:
+            return float("inf")
+        # google-auth uses naive UTC datetimes.
+        now = dt.datetime.now(dt.UTC).replace(tzinfo=None)
+        seconds_left: float = (credentials.expiry - now).total_seconds()
+        return seconds_left
+
+    def _refresh(self, entry: _Entry, margin: float) -> None:
+        """Refresh the credentials unless another thread just did it."""
+        with entry.lock:
+            credentials = entry.credentials
+            if credentials.valid and self._seconds_left(credentials) > margin:
+                return
+            credentials.refresh(self._request)
+        with self._lock:
+            self.refresh_count += 1
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                due = []
+                wait = float("inf")
+                for entry in self._entries.values():
+                    seconds_left = self._seconds_left(entry.credentials)
+                    delay = max(
+                        seconds_left - self.refresh_margin, entry.next_attempt - now
+                    )
+                    if delay <= 0:
+                        due.append(entry)
+                    else:
+                        wait = min(wait, delay)
+                if not due:
+                    self._wakeup.wait(None if wait == float("inf") else wait)
+                    continue
+            for entry in due:
+                # Also avoids spinning on tokens that live shorter than the margin.
+                entry.next_attempt = time.monotonic() + self.retry_interval
+                try:
+                    self._refresh(entry, self.refresh_margin)
+                except Exception:
+                    _LOGGER.exception("Error refreshing credentials")
+
+
+class _ManagedAuthMetadataPlugin(google.auth.transport.grpc.AuthMetadataPlugin):
+    """AuthMetadataPlugin that refreshes through a CredentialManager."""
+
+    def __init__(
+        self,
+        manager: CredentialManager,
+        credentials: google.oauth2.credentials.Credentials,
+        request: google.auth.transport.Request,
+    ) -> None:
+        super().__init__(credentials, request)
+        self._manager = manager
+
+    def __call__(self, context: Any, callback: Any) -> None:
+        self._manager.ensure_valid(self._credentials)
+        super().__call__(context, callback)
@@ -0,0 +1,38 @@
+"""Typed events yielded by the streaming assist API."""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class AudioOut:
+    """A chunk of the audio response, in the order received.
+
+    LINEAR16 chunks are raw PCM samples without a WAV header.
+    """
+
+    audio_data: bytes
+    encoding: str = "MP3"
+
+
+@dataclass(frozen=True, slots=True)
+class ScreenOut:
+    """HTML of the visual response."""
+
+    html: bytes
+
+
+@dataclass(frozen=True, slots=True)
+class DisplayText:
+    """Supplemental display text of the response."""
+
+    text: str
+
+
+@dataclass(frozen=True, slots=True)
+class ConversationStateUpdate:
+    """Opaque conversation state to send with the next query."""
+
+    conversation_state: bytes
+
+
+AssistEvent = AudioOut | ScreenOut | DisplayText | ConversationStateUpdate
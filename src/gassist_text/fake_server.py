@@ -0,0 +1,130 @@
+"""In-process fake of the Google Assistant API for tests and benchmarks."""
+
+from collections import deque
+from collections.abc import Iterator
+from concurrent import futures
+import random
+import threading
+import time
+
+import grpc
+
+from google.assistant.embedded.v1alpha2 import (
+    embedded_assistant_pb2,
+    embedded_assistant_pb2_grpc,
+)
+
+PLAYING = embedded_assistant_pb2.ScreenOutConfig.PLAYING
+
+
+class FakeEmbeddedAssistant(embedded_assistant_pb2_grpc.EmbeddedAssistantServicer):
+    """Servicer that answers every text query with generated responses.
+
+    The response text echoes the query and the conversation state grows by
+    one byte per query of a conversation.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        chunk_count: int = 1,
+        audio_size: int = 0,
+        html_size: int = 0,
+        error: grpc.StatusCode | None = None,
+        error_rate: float = 1.0,
+        max_requests: int | None = 1000,
+    ) -> None:
+        """Initialize.
+
+        latency: seconds before the first response.
+        chunk_count: number of audio_out responses the audio is split in.
+        audio_size: bytes of audio returned if audio output is configured.
+        html_size: approximate bytes of HTML returned if display is configured.
+        error: status code to abort calls with.
+        error_rate: fraction of calls aborted with error.
+        max_requests: number of most recent requests kept in requests, None to
+            keep all of them.
+        """
+        self.latency = latency
+        self.chunk_count = chunk_count
+        self.audio_size = audio_size
+        self.html_size = html_size
+        self.error = error
+        self.error_rate = error_rate
+        self.requests: deque[embedded_assistant_pb2.AssistRequest] = deque(
+            maxlen=max_requests
+        )
+        self._lock = threading.Lock()
+
+    def Assist(  # noqa: N802
+        self,
+        request_iterator: Iterator[embedded_assistant_pb2.AssistRequest],
+        context: grpc.ServicerContext,
+    ) -> Iterator[embedded_assistant_pb2.AssistResponse]:
+        """Respond to a text query."""
+        request = next(request_iterator)
+        with self._lock:
+            self.requests.append(request)
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error is not None and random.random() < self.error_rate:
+            context.abort(self.error, "Injected error")
+        config = request.config
+        dialog_state_in = config.dialog_state_in
+        conversation_state = (
+            b""
+            if dialog_state_in.is_new_conversation
+            else dialog_state_in.conversation_state
+        ) + b"."
+        yield embedded_assistant_pb2.AssistResponse(
+            dialog_state_out=embedded_assistant_pb2.DialogStateOut(
+                conversation_state=conversation_state,
+                supplemental_display_text=f"You said: {config.text_query}",
+            )
+        )
+        if self.html_size and config.screen_out_config.screen_mode == PLAYING:
+            yield embedded_assistant_pb2.AssistResponse(
+                screen_out=embedded_assistant_pb2.ScreenOut(
+                    format=embedded_assistant_pb2.ScreenOut.HTML,
+                    data=fake_html(config.text_query, self.html_size),
+                )
+            )
+        if self.audio_size and config.HasField("audio_out_config"):
+            chunk_size = -(-self.audio_size // self.chunk_count)
+            for start in range(0, self.audio_size, chunk_size):
+                yield embedded_assistant_pb2.AssistResponse(
+                    audio_out=embedded_assistant_pb2.AudioOut(
+                        audio_data=b"\xff" * min(chunk_size, self.audio_size - start)
+                    )
+                )
+
+
+def fake_html(text: str, size: int) -> bytes:
+    """Return an HTML page similar to screen_out pages, padded to about size bytes."""
+    head = (
+        "<html><head><style>body { font-family: sans-serif; }</style></head><body>"
+        '<div id="assistant-card-content"><div class="card">'
+        f"<p>{text}</p></div></div>"
+    )
+    tail = "</body></html>"
+    padding = max(size - len(head) - len(tail), 0)
+    filler = "<div class='suggestion'>More results</div>" * (padding // 41 + 1)
+    return (head + filler[:padding] + tail).encode()
+
+
+def serve(
+    servicer: FakeEmbeddedAssistant | None = None,
+    address: str = "127.0.0.1:0",
+    max_workers: int = 32,
+) -> tuple[grpc.Server, str]:
+    """Start a server for the servicer and return it with its address.
+
+    Connect with grpc.insecure_channel(address) and pass the channel to the assistant.
+    """
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+    embedded_assistant_pb2_grpc.add_EmbeddedAssistantServicer_to_server(
+        servicer or FakeEmbeddedAssistant(), server
+    )
+    port = server.add_insecure_port(address)
+    server.start()
+    return server, f"{address.rsplit(':', 1)[0]}:{port}"
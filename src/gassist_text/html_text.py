@@ -0,0 +1,137 @@
+"""Extract the text of the assistant card from screen_out HTML without BeautifulSoup."""
+
+import codecs
+from html.parser import HTMLParser
+
+CARD_ID = "assistant-card-content"
+
+# Strings within these elements are not text, like BeautifulSoup's get_text.
+_SKIPPED_ELEMENTS = frozenset({"rp", "rt", "script", "style", "template"})
+
+
+class _CardClosed(Exception):
+    """Raised to stop parsing once the card element closes."""
+
+
+class CardTextExtractor(HTMLParser):
+    """Incrementally extract the text of div#assistant-card-content.
+
+    Feed the page in chunks as they arrive. Parsing stops as soon as the card
+    element closes. The text matches BeautifulSoup's get_text with a newline
+    separator and strip=True of the card, or of the whole page if it has no card.
+    """
+
+    def __init__(self) -> None:
+        """Initialize."""
+        super().__init__(convert_charrefs=True)
+        self.done = False
+        self._decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        self._data: list[str] = []
+        self._page_strings: list[str] = []
+        self._card_strings: list[str] | None = None
+        self._card_depth = 0
+        self._skipped: list[str] = []
+
+    def feed(self, data: bytes | str) -> None:
+        """Parse the next chunk of the page."""
+        if self.done:
+            return
+        if isinstance(data, bytes):
+            data = self._decoder.decode(data)
+        try:
+            super().feed(data)
+        except _CardClosed:
+            self.done = True
+            self.rawdata = ""
+
+    def close(self) -> None:
+        """Parse any buffered data at the end of the page."""
+        if self.done:
+            return
+        try:
+            super().feed(self._decoder.decode(b"", final=True))
+            super().close()
+        except _CardClosed:
+            self.rawdata = ""
+        self._flush()
+        self.done = True
+
+    @property
+    def text(self) -> str:
+        """Return the text extracted so far."""
+        strings = (
+            self._page_strings if self._card_strings is None else self._card_strings
+        )
+        return "\n".join(strings)
+
+    def _flush(self) -> None:
+        if not self._data:
+            return
+        text = "".join(self._data).strip()
+        self._data.clear()
+        if not text:
+            return
+        if self._card_strings is not None:
+            self._card_strings.append(text)
+        else:
+            self._page_strings.append(text)
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        """Track the card and elements whose content is skipped."""
+        self._flush()
+        if tag in _SKIPPED_ELEMENTS:
+            self._skipped.append(tag)
+        if tag != "div":
+            return
+        if self._card_strings is not None:
+            self._card_depth += 1
+        elif ("id", CARD_ID) in attrs:
+            self._card_strings = []
+            self._card_depth = 1
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        """Handle self-closing tags, which have no content."""
+        self._flush()
+
+    def handle_endtag(self, tag: str) -> None:
+        """Stop at the end of the card."""
+        self._flush()
+        if tag in self._skipped:
+            while self._skipped.pop() != tag:
+                pass
+        if tag == "div" and self._card_strings is not None:
+            self._card_depth -= 1
+            if not self._card_depth:
+                raise _CardClosed
+
+    def handle_data(self, data: str) -> None:
+        """Collect text outside of skipped elements."""
+        if not self._skipped:
+            self._data.append(data)
+
+    def handle_comment(self, data: str) -> None:
+        """Skip comments."""
+        self._flush()
+
+    def handle_decl(self, decl: str) -> None:
+        """Skip the doctype."""
+        self._flush()
+
+    def handle_pi(self, data: str) -> None:
+        """Skip processing instructions."""
+        self._flush()
+
+    def unknown_decl(self, data: str) -> None:
+        """Keep the content of CDATA sections."""
+        self._flush()
+        if data.upper().startswith("CDATA["):
+            self._data.append(data[len("CDATA[") :])
+            self._flush()
+
+
+def extract_card_text(html: bytes | str) -> str:
+    """Return the text of the assistant card, or of the whole page if it has no card."""
+    extractor = CardTextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.text
@@ -0,0 +1,204 @@
+"""Per-call latency and payload instrumentation."""
+
+import asyncio
+import bisect
+from collections import Counter
+import math
+import threading
+import time
+
+import grpc
+
+from .events import (
+    AssistEvent,
+    AudioOut,
+    ConversationStateUpdate,
+    DisplayText,
+    ScreenOut,
+)
+
+
+class CallObserver:
+    """Receives the events of one Assist call. All methods do nothing by default."""
+
+    def first_response(self) -> None:
+        """Call received its first AssistResponse."""
+
+    def first_audio(self) -> None:
+        """Call received its first audio chunk."""
+
+    def conversation_state_updated(self) -> None:
+        """Call received a new conversation state."""
+
+    def bytes_received(self, field: str, size: int) -> None:
+        """Call received size bytes of a response field.
+
+        field is one of: audio_out, screen_out, supplemental_display_text,
+        conversation_state.
+        """
+
+    def end(self, status: grpc.StatusCode) -> None:
+        """Call ended with the gRPC status."""
+
+
+class Instrumentation:
+    """Creates an observer per call. Does nothing by default."""
+
+    def start_call(self, text_query: str) -> CallObserver:
+        """Return the observer of a call that is starting."""
+        return _NOOP_OBSERVER
+
+
+_NOOP_OBSERVER = CallObserver()
+
+
+def call_status(err: BaseException) -> grpc.StatusCode:
+    """Return the gRPC status of an exception that ended a call."""
+    if isinstance(err, grpc.RpcError):
+        code = getattr(err, "code", None)
+        if callable(code):
+            status: grpc.StatusCode = code()
+            return status
+    if isinstance(err, GeneratorExit | asyncio.CancelledError):
+        return grpc.StatusCode.CANCELLED
+    return grpc.StatusCode.UNKNOWN
+
+
+class _CallRecorder:
+    """Translates the events of a call into CallObserver calls."""
+
+    __slots__ = ("observer", "got_response", "got_audio")
+
+    def __init__(self, observer: CallObserver) -> None:
+        self.observer = observer
+        self.got_response = False
+        self.got_audio = False
+
+    def response(self) -> None:
+        if not self.got_response:
+            self.got_response = True
+            self.observer.first_response()
+
+    def end(self, err: BaseException | None = None) -> None:
+        self.observer.end(grpc.StatusCode.OK if err is None else call_status(err))
+
+    def event(self, event: AssistEvent) -> None:
+        observer = self.observer
+        if isinstance(event, AudioOut):
+            if not self.got_audio:
+                self.got_audio = True
+                observer.first_audio()
+            observer.bytes_received("audio_out", len(event.audio_data))
+        elif isinstance(event, ScreenOut):
+            observer.bytes_received("screen_out", len(event.html))
+        elif isinstance(event, DisplayText):
+            observer.bytes_received("supplemental_display_text", len(event.text))
+        elif isinstance(event, ConversationStateUpdate):
+            observer.conversation_state_updated()
+            observer.bytes_received("conversation_state", len(event.conversation_state))
+
+
+class Histogram:
+    """Histogram with logarithmic buckets of bounded memory.
+
+    Values are in seconds, between 100 us and about 20 minutes, with a relative
+    error of at most 5%.
+    """
+
+    _MIN = 1e-4
+    _GROWTH = 1.1
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self._buckets: Counter[int] = Counter()
+        self.count = 0
+        self.sum = 0.0
+
+    def _bucket(self, value: float) -> int:
+        if value <= self._MIN:
+            return 0
+        return min(math.ceil(math.log(value / self._MIN, self._GROWTH)), 170)
+
+    def record(self, value: float) -> None:
+        """Add a value."""
+        self._buckets[self._bucket(value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, percentile: float) -> float:
+        """Return the approximate value below which percentile % of values fall."""
+        if not self.count:
+            return math.nan
+        rank = percentile / 100 * self.count
+        buckets = sorted(self._buckets)
+        cumulative = [0]
+        for bucket in buckets:
+            cumulative.append(cumulative[-1] + self._buckets[bucket])
+        index = min(bisect.bisect_left(cumulative, rank, lo=1), len(buckets)) - 1
+        return float(self._MIN * self._GROWTH ** buckets[max(index, 0)])
+
+
+class _HistogramObserver(CallObserver):
+    __slots__ = ("_collector", "_start", "_timings")
+
+    def __init__(self, collector: "HistogramCollector") -> None:
+        self._collector = collector
+        self._start = time.perf_counter()
+        self._timings: dict[str, float] = {}
+
+    def first_response(self) -> None:
+        self._timings["first_response"] = time.perf_counter() - self._start
+
+    def first_audio(self) -> None:
+        self._timings["first_audio"] = time.perf_counter() - self._start
+
+    def bytes_received(self, field: str, size: int) -> None:
+        self._collector._add_bytes(field, size)
+
+    def end(self, status: grpc.StatusCode) -> None:
+        self._timings["call"] = time.perf_counter() - self._start
+        self._collector._end_call(self._timings, status)
+
+
+class HistogramCollector(Instrumentation):
+    """Collects latency histograms, received bytes and statuses of all calls in memory.
+
+    Latency metrics are: call (start to end), first_response and first_audio
+    (from the start of the call).
+    """
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self._lock = threading.Lock()
+        self.histograms: dict[str, Histogram] = {
+            "call": Histogram(),
+            "first_response": Histogram(),
+            "first_audio": Histogram(),
+        }
+        self.bytes_received: Counter[str] = Counter()
+        self.statuses: Counter[grpc.StatusCode] = Counter()
+
+    def start_call(self, text_query: str) -> CallObserver:
+        """Return the observer of a call that is starting."""
+        return _HistogramObserver(self)
+
+    def _add_bytes(self, field: str, size: int) -> None:
+        with self._lock:
+            self.bytes_received[field] += size
+
+    def _end_call(self, timings: dict[str, float], status: grpc.StatusCode) -> None:
+        with self._lock:
+            for metric, value in timings.items():
+                self.histograms[metric].record(value)
+            self.statuses[status] += 1
+
+    def percentiles(
+        self, percentiles: tuple[float, ...] = (50, 90, 95, 99)
+    ) -> dict[str, dict[float, float]]:
+        """Return the latency percentiles, in seconds, of each metric."""
+        with self._lock:
+            return {
+                metric: {p: histogram.percentile(p) for p in percentiles}
+                for metric, histogram in self.histograms.items()
+                if histogram.count
+            }
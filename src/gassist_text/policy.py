@@ -0,0 +1,324 @@
+"""Retry and hedging policy for Assist calls."""
+
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable, Collection
+from concurrent import futures
+import random
+import threading
+import time
+from typing import Any, Generic, TypeVar
+
+import grpc
+
+T = TypeVar("T")
+
+DEFAULT_RETRYABLE_CODES = frozenset(
+    {grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED}
+)
+# Minimum number of observed latencies before hedge_percentile is used.
+_MIN_HEDGE_SAMPLES = 20
+
+
+class AttemptHandle:
+    """Lets a policy cancel the gRPC call of an attempt running in another thread."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self._lock = threading.Lock()
+        self._call: Any = None
+        self.cancelled = False
+
+    def set_call(self, call: Any) -> None:
+        """Register the call of the attempt, cancelling it if the attempt already lost."""
+        with self._lock:
+            self._call = call
+            cancelled = self.cancelled
+        if cancelled:
+            call.cancel()
+
+    def cancel(self) -> None:
+        """Cancel the attempt."""
+        with self._lock:
+            self.cancelled = True
+            call = self._call
+        if call is not None:
+            call.cancel()
+
+
+class _Hedge(Generic[T]):
+    """Hedged attempt racing the first attempt of a call."""
+
+    def __init__(
+        self,
+        attempt: Callable[[float, AttemptHandle], T],
+        end: float,
+        first_handle: AttemptHandle,
+    ) -> None:
+        """Initialize.
+
+        attempt: the attempt to hedge.
+        end: monotonic time at which the hedged attempt times out.
+        first_handle: handle of the first attempt, cancelled if the hedged one wins.
+        """
+        self._attempt = attempt
+        self._end = end
+        self._first_handle = first_handle
+        self._lock = threading.Lock()
+        self._first_done = False
+        self._future: futures.Future[T] | None = None
+        self.handle = AttemptHandle()
+
+    def start(self, executor: futures.Executor) -> bool:
+        """Submit the hedged attempt unless the first one is done."""
+        with self._lock:
+            if self._first_done:
+                return False
+            self._future = executor.submit(self._run)
+        return True
+
+    def _run(self) -> T:
+        # Time out at the end of the call also if the executor was busy.
+        result = self._attempt(self._end - time.monotonic(), self.handle)
+        self._first_handle.cancel()
+        return result
+
+    def finish_first(self) -> futures.Future[T] | None:
+        """Mark the first attempt as done and return the hedged one if it started."""
+        with self._lock:
+            self._first_done = True
+            return self._future
+
+    def cancel(self) -> None:
+        """Cancel the hedged attempt once the first one succeeded."""
+        future = self.finish_first()
+        if future is not None:
+            future.cancel()
+            self.handle.cancel()
+
+
+class CallPolicy:
+    """Per-attempt timeouts, retries with exponential backoff and hedging within a deadline.
+
+    Every attempt starts from the same conversation state and only the
+    attempt whose response is returned updates the conversation, so retried
+    or hedged attempts never fork it. Note that the Assistant may still act
+    on a query more than once, e.g. turn on the lights twice.
+
+    With grpc.aio, an error returned by the server before it read the request
+    can reach the client as INTERNAL instead of its own status code, because
+    sending the request failed. INTERNAL isn't retried by default since it
+    doesn't tell whether the query was received; add it to retryable_codes
+    to retry it anyway.
+    """
+
+    def __init__(
+        self,
+        deadline: float | None = None,
+        attempt_timeout: float | None = None,
+        max_attempts: int = 3,
+        initial_backoff: float = 0.1,
+        max_backoff: float = 5.0,
+        backoff_multiplier: float = 2.0,
+        retryable_codes: Collection[grpc.StatusCode] = DEFAULT_RETRYABLE_CODES,
+        hedge_delay: float | None = None,
+        hedge_percentile: float | None = None,
+        latency_window: int = 1000,
+    ) -> None:
+        """Initialize.
+
+        deadline: overall seconds for all attempts. Defaults to the assistant's deadline.
+        attempt_timeout: seconds for each attempt.
+        max_attempts: maximum number of attempts, not counting hedged ones.
+        initial_backoff: maximum seconds to wait before the first retry.
+        max_backoff: maximum seconds to wait before a retry.
+        backoff_multiplier: growth of the backoff after each retry.
+        retryable_codes: gRPC status codes that are retried.
+        hedge_delay: start a second, hedged, attempt if the first one hasn't
+            finished after this many seconds.
+        hedge_percentile: instead of hedge_delay, once enough calls are
+            observed, hedge after this percentile, e.g. 95, of recent latencies.
+        latency_window: number of recent latencies kept for hedge_percentile.
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.max_attempts = max_attempts
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.backoff_multiplier = backoff_multiplier
+        self.retryable_codes = frozenset(retryable_codes)
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
+        self._latencies: deque[float] = deque(maxlen=latency_window)
+        self._executor: futures.ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.hedges = 0
+
+    def record_latency(self, seconds: float) -> None:
+        """Record the latency of a successful attempt."""
+        self._latencies.append(seconds)
+
+    def hedge_after(self) -> float | None:
+        """Return seconds after which to hedge an attempt or None to not hedge."""
+        if self.hedge_percentile is not None:
+            latencies = sorted(self._latencies)
+            if len(latencies) >= _MIN_HEDGE_SAMPLES:
+                index = round(self.hedge_percentile / 100 * (len(latencies) - 1))
+                return latencies[index]
+        return self.hedge_delay
+
+    def backoff(self, retry: int) -> float:
+        """Return seconds to wait before a retry, with full jitter."""
+        ceiling = min(
+            self.max_backoff, self.initial_backoff * self.backoff_multiplier**retry
+        )
+        return random.uniform(0, ceiling)
+
+    def is_retryable(self, err: BaseException) -> bool:
+        """Return whether an attempt that failed with err can be retried."""
+        code = getattr(err, "code", None)
+        return (
+            isinstance(err, grpc.RpcError)
+            and callable(code)
+            and code() in self.retryable_codes
+        )
+
+    def _attempt_timeout(self, end: float) -> float:
+        remaining = end - time.monotonic()
+        if self.attempt_timeout is not None:
+            return min(self.attempt_timeout, remaining)
+        return remaining
+
+    def call(self, attempt: Callable[[float, AttemptHandle], T], deadline: float) -> T:
+        """Run attempt(timeout, handle) according to the policy and return the first successful result.
+
+        deadline: overall seconds if the policy doesn't set one.
+        """
+        end = time.monotonic() + (self.deadline or deadline)
+        for retry in range(self.max_attempts):
+            try:
+                return self._hedged(attempt, self._attempt_timeout(end))
+            except Exception as err:
+                if retry == self.max_attempts - 1 or not self.is_retryable(err):
+                    raise
+                backoff = self.backoff(retry)
+                if time.monotonic() + backoff >= end:
+                    raise
+            with self._lock:
+                self.retries += 1
+            time.sleep(backoff)
+        raise AssertionError("unreachable")
+
+    def _timed(
+        self, attempt: Callable[[float, AttemptHandle], T]
+    ) -> Callable[[float, AttemptHandle], T]:
+        def run(timeout: float, handle: AttemptHandle) -> T:
+            start = time.monotonic()
+            result = attempt(timeout, handle)
+            self.record_latency(time.monotonic() - start)
+            return result
+
+        return run
+
+    def _hedged(
+        self, attempt: Callable[[float, AttemptHandle], T], timeout: float
+    ) -> T:
+        hedge_after = self.hedge_after()
+        if hedge_after is None or hedge_after >= timeout:
+            return self._timed(attempt)(timeout, AttemptHandle())
+        # The first attempt runs in the caller's thread, only the hedged one
+        # is started in the executor.
+        first_handle = AttemptHandle()
+        hedge = _Hedge(self._timed(attempt), time.monotonic() + timeout, first_handle)
+        timer = threading.Timer(hedge_after, self._start_hedge, (hedge,))
+        timer.daemon = True
+        timer.start()
+        try:
+            result = self._timed(attempt)(timeout, first_handle)
+        except Exception:
+            future = hedge.finish_first()
+            if future is None or future.exception() is not None:
+                raise
+            return future.result()
+        finally:
+            timer.cancel()
+        hedge.cancel()
+        return result
+
+    def _start_hedge(self, hedge: _Hedge[Any]) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = futures.ThreadPoolExecutor(
+                    thread_name_prefix="CallPolicy"
+                )
+            executor = self._executor
+        if hedge.start(executor):
+            with self._lock:
+                self.hedges += 1
+
+    async def async_call(
+        self, attempt: Callable[[float], Awaitable[T]], deadline: float
+    ) -> T:
+        """Run attempt(timeout) according to the policy and return the first successful result.
+
+        deadline: overall seconds if the policy doesn't set one.
+        """
+        end = time.monotonic() + (self.deadline or deadline)
+        for retry in range(self.max_attempts):
+            try:
+                return await self._async_hedged(attempt, self._attempt_timeout(end))
+            except Exception as err:
+                if retry == self.max_attempts - 1 or not self.is_retryable(err):
+                    raise
+                backoff = self.backoff(retry)
+                if time.monotonic() + backoff >= end:
+                    raise
+            with self._lock:
+                self.retries += 1
+            await asyncio.sleep(backoff)
+        raise AssertionError("unreachable")
+
+    async def _async_timed(
+        self, attempt: Callable[[float], Awaitable[T]], timeout: float
+    ) -> T:
+        start = time.monotonic()
+        result = await attempt(timeout)
+        self.record_latency(time.monotonic() - start)
+        return result
+
+    async def _async_hedged(
+        self, attempt: Callable[[float], Awaitable[T]], timeout: float
+    ) -> T:
+        hedge_after = self.hedge_after()
+        if hedge_after is None or hedge_after >= timeout:
+            return await self._async_timed(attempt, timeout)
+        first = asyncio.create_task(self._async_timed(attempt, timeout))
+        pending = {first}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after)
+            if not done:
+                with self._lock:
+                    self.hedges += 1
+                pending.add(
+                    asyncio.create_task(
+                        self._async_timed(attempt, timeout - hedge_after)
+                    )
+                )
+            error: BaseException | None = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+                if not pending:
+                    assert error is not None
+                    raise error
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,191 @@
+"""Client-side admission control for Assist calls."""
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterator
+import contextlib
+import functools
+import math
+import threading
+import time
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call isn't admitted because the wait queue is full or timed out."""
+
+
+class RateLimiter:
+    """Token bucket for QPS, maximum in-flight calls and a bounded wait queue.
+
+    Share one limiter between all assistants using the same credentials. It
+    works for threads and asyncio tasks at the same time.
+    """
+
+    def __init__(
+        self,
+        qps: float | None = None,
+        burst: int = 1,
+        max_in_flight: int | None = None,
+        max_queue: int | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        """Initialize.
+
+        qps: sustained calls per second, unlimited if None.
+        burst: calls that can start at once when no call was made for a while.
+        max_in_flight: maximum concurrent calls, unlimited if None.
+        max_queue: maximum calls waiting to be admitted, unlimited if None.
+        timeout: default maximum seconds a call waits to be admitted.
+        """
+        self.qps = qps
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        # Functions waking the waiting threads and tasks, longest waiting first.
+        self._waiters: deque[Callable[[], object]] = deque()
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        # Metrics.
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def _try_acquire(self, now: float) -> float:
+        """Admit a call and return 0, or return seconds to wait before retrying."""
+        if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+            return math.inf
+        if self.qps is not None:
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last_refill) * self.qps
+            )
+            self._last_refill = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.qps
+            self._tokens -= 1
+        self.in_flight += 1
+        self.admitted += 1
+        return 0.0
+
+    def _enqueue(self) -> None:
+        if self.max_queue is not None and self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise RateLimitExceeded("Too many calls waiting")
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+    def _timed_out(self) -> RateLimitExceeded:
+        self.rejected += 1
+        return RateLimitExceeded("Timed out waiting to be admitted")
+
+    def _wake_next(self) -> None:
+        """Wake the longest waiting call, with the lock held."""
+        if self._waiters:
+            self._waiters.popleft()()
+
+    def _remove_waiter(self, wake: Callable[[], object]) -> None:
+        """Remove a waiter that wasn't woken, with the lock held."""
+        with contextlib.suppress(ValueError):
+            self._waiters.remove(wake)
+
+    def _dequeue(self, admitted: bool) -> None:
+        """Leave the wait queue, with the lock held.
+
+        A call leaving without being admitted, e.g. on timeout or cancellation,
+        may have consumed the wakeup of a free slot, so it's passed on.
+        """
+        self.queue_depth -= 1
+        if not admitted and (
+            self.max_in_flight is None or self.in_flight < self.max_in_flight
+        ):
+            self._wake_next()
+
+    def _release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._wake_next()
+
+    @contextlib.contextmanager
+    def acquire(self, timeout: float | None = None) -> Iterator[None]:
+        """Wait until a call is admitted and hold its slot until exiting the context."""
+        if timeout is None:
+            timeout = self.timeout
+        with self._lock:
+            now = time.monotonic()
+            wait = self._try_acquire(now)
+            if wait:
+                self._enqueue()
+                deadline = math.inf if timeout is None else now + timeout
+                try:
+                    while wait:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            raise self._timed_out()
+                        delay = min(wait, remaining)
+                        cond = threading.Condition(self._lock)
+                        self._waiters.append(cond.notify)
+                        try:
+                            cond.wait(None if delay == math.inf else delay)
+                        finally:
+                            self._remove_waiter(cond.notify)
+                        now = time.monotonic()
+                        wait = self._try_acquire(now)
+                finally:
+                    self._dequeue(admitted=not wait)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @contextlib.asynccontextmanager
+    async def acquire_async(self, timeout: float | None = None) -> AsyncIterator[None]:
+        """Asyncio version of acquire."""
+        if timeout is None:
+            timeout = self.timeout
+        loop = asyncio.get_running_loop()
+        queued = False
+        try:
+            deadline = math.inf
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    wait = self._try_acquire(now)
+                    if not wait:
+                        break
+                    if not queued:
+                        self._enqueue()
+                        queued = True
+                        if timeout is not None:
+                            deadline = now + timeout
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise self._timed_out()
+                    future = loop.create_future()
+                    wake = functools.partial(
+                        loop.call_soon_threadsafe, _set_result, future
+                    )
+                    self._waiters.append(wake)
+                delay = min(wait, remaining)
+                try:
+                    await asyncio.wait_for(future, None if delay == math.inf else delay)
+                except TimeoutError:
+                    pass
+                finally:
+                    with self._lock:
+                        self._remove_waiter(wake)
+        finally:
+            if queued:
+                with self._lock:
+                    self._dequeue(admitted=not wait)
+        try:
+            yield
+        finally:
+            self._release()
+
+
+def _set_result(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
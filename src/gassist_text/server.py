@@ -0,0 +1,380 @@
+"""Local gateway daemon serving assist requests of many processes over a Unix socket.
+
+The daemon owns the gRPC channel, credentials and conversation sessions.
+Clients POST JSON to /assist with a text_query and a session_id and get back
+the text, and the HTML and audio base64 encoded. POST /reset with a
+session_id starts a new conversation in that session.
+
+Run it with: gassist-text-server --socket /run/gassist.sock
+"""
+
+import argparse
+import base64
+from collections.abc import Sequence
+import contextlib
+import http.client
+from http.server import BaseHTTPRequestHandler
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import threading
+from typing import Any
+import uuid
+
+import google.oauth2.credentials
+import grpc
+
+from .audio import AUDIO_ENCODINGS
+from .channel_pool import channel_options
+from .credential_manager import CredentialManager
+from .ratelimit import RateLimiter, RateLimitExceeded
+from .sessions import FileSessionStore, SessionManager
+from .textinput import ASSISTANT_API_ENDPOINT, DEFAULT_GRPC_DEADLINE, TextAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class GatewayError(Exception):
+    """Error response of the gateway."""
+
+    def __init__(self, status: int, message: str, code: str | None = None) -> None:
+        """Initialize.
+
+        status: HTTP status of the response.
+        message: description of the error.
+        code: gRPC status code name if the Assistant API call failed.
+        """
+        super().__init__(
+            f"{status} {code}: {message}" if code else f"{status}: {message}"
+        )
+        self.status = status
+        self.message = message
+        self.code = code
+
+
+class _GatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "GatewayServer"
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address.
+        return "local"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        _LOGGER.debug(format, *args)
+
+    def do_POST(self) -> None:  # noqa: N802
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            session_id = request["session_id"]
+            if not isinstance(session_id, str):
+                raise TypeError("session_id must be a string")
+            if self.path == "/assist":
+                text_query = request["text_query"]
+                if not isinstance(text_query, str):
+                    raise TypeError("text_query must be a string")
+                self._assist(session_id, text_query)
+            elif self.path == "/reset":
+                self.server.sessions.reset(session_id)
+                self._send(200, {})
+            else:
+                self._send(404, {"error": f"Unknown path {self.path}"})
+        except (ValueError, TypeError, KeyError, AttributeError) as err:
+            self._send(400, {"error": f"Invalid request: {err!r}"})
+
+    def _assist(self, session_id: str, text_query: str) -> None:
+        try:
+            text, html, audio = self.server.sessions.assist(session_id, text_query)
+        except RateLimitExceeded as err:
+            self._send(503, {"error": str(err)})
+        except grpc.RpcError as err:
+            code = err.code() if isinstance(err, grpc.Call) else None
+            self._send(
+                502,
+                {
+                    "error": err.details() if isinstance(err, grpc.Call) else str(err),
+                    "code": code.name if code is not None else None,
+                },
+            )
+        except Exception as err:
+            _LOGGER.exception("Error serving assist request")
+            self._send(500, {"error": repr(err)})
+        else:
+            self._send(
+                200,
+                {
+                    "text": text,
+                    "html": base64.b64encode(html).decode() if html else None,
+                    "audio": base64.b64encode(audio).decode(),
+                },
+            )
+
+    def _send(self, status: int, response: dict[str, Any]) -> None:
+        body = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class GatewayServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP/JSON server on a Unix socket that serves the sessions of a SessionManager.
+
+    Each connection is served by its own thread, so requests of many clients
+    run concurrently over the one channel of the manager's assistant.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, sessions: SessionManager) -> None:
+        """Initialize.
+
+        socket_path: path of the Unix socket. A stale socket file is replaced.
+        sessions: manager of the conversations served.
+        """
+        self.socket_path = socket_path
+        self.sessions = sessions
+        _remove_stale_socket(socket_path)
+        super().__init__(socket_path, _GatewayHandler)
+
+    def server_close(self) -> None:
+        """Close the socket and remove the socket file."""
+        super().server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.socket_path)
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    """Remove the socket file of a server that is no longer running."""
+    try:
+        mode = os.stat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise OSError(f"{socket_path} exists and isn't a socket")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except ConnectionRefusedError:
+            os.remove(socket_path)
+        else:
+            raise OSError(f"A server is already listening on {socket_path}")
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float | None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class GatewayClient:
+    """Thin client of a GatewayServer.
+
+    Each thread keeps its own connection to the gateway open between requests.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        timeout: float | None = None,
+        session_id: str | None = None,
+    ) -> None:
+        """Initialize.
+
+        socket_path: path of the gateway's Unix socket.
+        timeout: seconds to wait for a response, None to wait forever.
+        session_id: session of the requests that don't specify one, a new
+            session of this client if None.
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.session_id = session_id if session_id is not None else uuid.uuid4().hex
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[_UnixHTTPConnection] = []
+
+    def __enter__(self) -> "GatewayClient":  # noqa: D105
+        return self
+
+    def __exit__(  # noqa: D105
+        self, etype: object, e: object, traceback: object
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the connections of all threads."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+
+    def assist(
+        self, text_query: str, session_id: str | None = None
+    ) -> tuple[str, bytes | None, bytes]:
+        """Send a text request in a session and return the response as a tuple of: [text, html, audio]."""
+        response = self._post(
+            "/assist",
+            {"text_query": text_query, "session_id": session_id or self.session_id},
+        )
+        html = response["html"]
+        return (
+            response["text"],
+            base64.b64decode(html) if html is not None else None,
+            base64.b64decode(response["audio"]),
+        )
+
+    def reset(self, session_id: str | None = None) -> None:
+        """Start a new conversation in a session."""
+        self._post("/reset", {"session_id": session_id or self.session_id})
+
+    def _connection(self) -> tuple[_UnixHTTPConnection, bool]:
+        """Return the connection of this thread and whether it was used before."""
+        connection: _UnixHTTPConnection | None = getattr(
+            self._local, "connection", None
+        )
+        if connection is not None:
+            return connection, True
+        connection = _UnixHTTPConnection(self.socket_path, self.timeout)
+        self._local.connection = connection
+        with self._lock:
+            self._connections.append(connection)
+        return connection, False
+
+    def _drop_connection(self, connection: _UnixHTTPConnection) -> None:
+        connection.close()
+        self._local.connection = None
+        with self._lock, contextlib.suppress(ValueError):
+            self._connections.remove(connection)
+
+    def _post(self, path: str, request: dict[str, Any]) -> dict[str, Any]:
+        body = json.dumps(request).encode()
+        headers = {"Content-Type": "application/json"}
+        while True:
+            connection, reused = self._connection()
+            try:
+                connection.request("POST", path, body, headers)
+            except (BrokenPipeError, ConnectionResetError):
+                self._drop_connection(connection)
+                # The gateway closed an idle connection, the request wasn't sent.
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                self._drop_connection(connection)
+                raise
+            try:
+                http_response = connection.getresponse()
+                data = http_response.read()
+            except BaseException:
+                # The request may have been served, so it isn't sent again.
+                self._drop_connection(connection)
+                raise
+            break
+        response: dict[str, Any] = json.loads(data)
+        if http_response.status != 200:
+            raise GatewayError(
+                http_response.status, response.get("error", ""), response.get("code")
+            )
+        return response
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Run the gateway until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socket", required=True, help="Path of the Unix socket.")
+    parser.add_argument(
+        "--credentials",
+        required=True,
+        help="Path to read OAuth2 credentials, e.g. created by google-oauthlib-tool.",
+    )
+    parser.add_argument("--api-endpoint", default=ASSISTANT_API_ENDPOINT)
+    parser.add_argument(
+        "--lang", default="en-US", help="Language code of the Assistant."
+    )
+    parser.add_argument("--device-model-id", default="default")
+    parser.add_argument("--device-id", default="default")
+    parser.add_argument("--display", action="store_true", help="Return HTML responses.")
+    parser.add_argument("--audio-out", action="store_true", help="Return audio.")
+    parser.add_argument("--audio-encoding", choices=AUDIO_ENCODINGS, default="MP3")
+    parser.add_argument("--audio-sample-rate", type=int, default=24000)
+    parser.add_argument(
+        "--grpc-deadline", type=int, default=DEFAULT_GRPC_DEADLINE, help="Seconds."
+    )
+    parser.add_argument(
+        "--session-dir",
+        help="Directory to persist sessions in, kept in memory if unset.",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=3600,
+        help="Seconds after which an unused session starts a new conversation.",
+    )
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--qps", type=float, help="Maximum calls per second.")
+    parser.add_argument("--max-in-flight", type=int, help="Maximum concurrent calls.")
+    parser.add_argument(
+        "--keepalive-time",
+        type=float,
+        default=300,
+        help="Seconds between pings keeping the idle connection open, 0 to disable.",
+    )
+    parser.add_argument("--verbose", "-v", action="store_true", help="Verbose logging.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    with open(args.credentials) as f:
+        credentials = google.oauth2.credentials.Credentials(token=None, **json.load(f))
+    rate_limiter = None
+    if args.qps is not None or args.max_in_flight is not None:
+        rate_limiter = RateLimiter(
+            qps=args.qps,
+            burst=max(1, int(args.qps or 1)),
+            max_in_flight=args.max_in_flight,
+        )
+    with CredentialManager() as credential_manager:
+        # Fetch the access token in the background while waiting for requests.
+        credential_manager.register(credentials)
+        assistant = TextAssistant(
+            credentials,
+            args.lang,
+            args.device_model_id,
+            args.device_id,
+            args.display,
+            args.audio_out,
+            args.grpc_deadline,
+            args.api_endpoint,
+            credential_manager=credential_manager,
+            rate_limiter=rate_limiter,
+            audio_encoding=args.audio_encoding,
+            sample_rate_hertz=args.audio_sample_rate,
+            channel_options=channel_options(keepalive_time=args.keepalive_time or None),
+        )
+        try:
+            # Connect before the first request instead of on its critical path.
+            assistant.warmup(timeout=10)
+        except grpc.FutureTimeoutError:
+            _LOGGER.warning("Could not connect to %s yet", args.api_endpoint)
+        store = FileSessionStore(args.session_dir) if args.session_dir else None
+        sessions = SessionManager(
+            assistant, store, args.idle_timeout, args.max_sessions
+        )
+        with assistant, GatewayServer(args.socket, sessions) as server:
+            _LOGGER.info("Serving on %s", args.socket)
+            with contextlib.suppress(KeyboardInterrupt):
+                server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""Multiplex many conversations over one assistant."""
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Callable
+import contextlib
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Generic, Protocol, TypeVar
+
+from .textinput import AsyncTextAssistant, TextAssistant
+
+_LockT = TypeVar("_LockT")
+_T = TypeVar("_T")
+# is_new_conversation, last_used
+_HEADER = struct.Struct("<?d")
+
+
+class Session:
+    """Conversation state of a session."""
+
+    __slots__ = ("session_id", "conversation_state", "is_new_conversation", "last_used")
+
+    def __init__(
+        self,
+        session_id: str,
+        conversation_state: bytes | None = None,
+        is_new_conversation: bool = True,
+        last_used: float = 0.0,
+    ) -> None:
+        """Initialize."""
+        self.session_id = session_id
+        self.conversation_state = conversation_state
+        self.is_new_conversation = is_new_conversation
+        self.last_used = last_used
+
+
+class SessionStore(Protocol):
+    """Persistent storage of sessions."""
+
+    def load(self, session_id: str) -> Session | None:
+        """Return the stored session or None."""
+
+    def save(self, session: Session) -> None:
+        """Store a session."""
+
+    def delete(self, session_id: str) -> None:
+        """Delete a session if stored."""
+
+
+class FileSessionStore:
+    """Stores each session in a small binary file in a directory."""
+
+    def __init__(self, directory: str) -> None:
+        """Initialize.
+
+        directory: where session files are stored. Created if missing.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        name = hashlib.sha256(session_id.encode()).hexdigest()
+        return os.path.join(self.directory, name)
+
+    def load(self, session_id: str) -> Session | None:
+        """Return the stored session or None."""
+        try:
+            with open(self._path(session_id), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        is_new_conversation, last_used = _HEADER.unpack_from(data)
+        conversation_state = data[_HEADER.size :] or None
+        return Session(session_id, conversation_state, is_new_conversation, last_used)
+
+    def save(self, session: Session) -> None:
+        """Store a session atomically."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(session.is_new_conversation, session.last_used))
+            f.write(session.conversation_state or b"")
+        os.replace(tmp_path, self._path(session.session_id))
+
+    def delete(self, session_id: str) -> None:
+        """Delete a session if stored."""
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._path(session_id))
+
+
+class _SessionLock(Generic[_LockT]):
+    """Lock of a session and the number of queries using it."""
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self, lock: _LockT) -> None:
+        self.lock = lock
+        self.users = 0
+
+
+class _SessionManagerBase(Generic[_LockT]):
+    def __init__(
+        self,
+        store: SessionStore | None,
+        idle_timeout: float,
+        max_sessions: int,
+        lock_factory: Callable[[], _LockT],
+    ) -> None:
+        self.store = store
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        # Least recently used first.
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        # Locks serializing the queries of a session, held while it is in use.
+        self._session_locks: dict[str, _SessionLock[_LockT]] = {}
+        self._lock_factory = lock_factory
+
+    def __len__(self) -> int:
+        """Return the number of sessions held in memory."""
+        return len(self._sessions)
+
+    def _acquire_session_lock(self, session_id: str) -> _LockT:
+        """Return the lock of a session, creating it if no query uses the session."""
+        with self._lock:
+            session_lock = self._session_locks.get(session_id)
+            if session_lock is None:
+                session_lock = _SessionLock(self._lock_factory())
+                self._session_locks[session_id] = session_lock
+            session_lock.users += 1
+            return session_lock.lock
+
+    def _release_session_lock(self, session_id: str) -> None:
+        """Drop the lock of a session once no query uses it."""
+        with self._lock:
+            session_lock = self._session_locks[session_id]
+            session_lock.users -= 1
+            if not session_lock.users:
+                del self._session_locks[session_id]
+
+    def _expired(self, session: Session, now: float) -> bool:
+        return now - session.last_used > self.idle_timeout
+
+    def _checkout(self, session_id: str) -> Session:
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None and self.store is not None:
+            session = self.store.load(session_id)
+        if session is None or self._expired(session, now):
+            session = Session(session_id, last_used=now)
+        return session
+
+    def _checkin(self, session: Session) -> None:
+        session.last_used = time.time()
+        if self.store is not None:
+            self.store.save(session)
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            # Evicted sessions stay in the store until they expire.
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def _delete_stored(self, session_ids: list[str]) -> None:
+        if self.store is not None:
+            for session_id in session_ids:
+                self.store.delete(session_id)
+
+    def _forget(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        self._delete_stored([session_id])
+
+    def _forget_idle(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [
+                session_id
+                for session_id, session in self._sessions.items()
+                if self._expired(session, now)
+            ]
+            for session_id in expired:
+                del self._sessions[session_id]
+        self._delete_stored(expired)
+        return len(expired)
+
+
+class SessionManager(_SessionManagerBase[threading.Lock]):
+    """Serves many conversations, identified by session id, with one TextAssistant.
+
+    Only the opaque conversation state of each session is kept. Queries of the
+    same session are serialized, different sessions run concurrently.
+    """
+
+    def __init__(
+        self,
+        assistant: TextAssistant,
+        store: SessionStore | None = None,
+        idle_timeout: float = 3600,
+        max_sessions: int = 10000,
+    ) -> None:
+        """Initialize.
+
+        assistant: assistant used for all sessions.
+        store: optional persistent storage to resume sessions, e.g. after a restart.
+        idle_timeout: seconds after which an unused session starts a new conversation.
+        max_sessions: maximum number of sessions held in memory.
+        """
+        super().__init__(store, idle_timeout, max_sessions, threading.Lock)
+        self.assistant = assistant
+
+    def assist(
+        self, session_id: str, text_query: str
+    ) -> tuple[str, bytes | None, bytes]:
+        """Send a text request in a session and return the response as a tuple of: [text, html, audio]."""
+        lock = self._acquire_session_lock(session_id)
+        try:
+            with lock:
+                session = self._checkout(session_id)
+                try:
+                    return self.assistant._assist(text_query, session)
+                finally:
+                    self._checkin(session)
+        finally:
+            self._release_session_lock(session_id)
+
+    def reset(self, session_id: str) -> None:
+        """Forget a session, its next query starts a new conversation."""
+        self._forget(session_id)
+
+    def evict_idle(self) -> int:
+        """Forget sessions idle for longer than idle_timeout and return how many."""
+        return self._forget_idle()
+
+
+class AsyncSessionManager(_SessionManagerBase[asyncio.Lock]):
+    """Serves many conversations, identified by session id, with one AsyncTextAssistant.
+
+    Arguments are the same as for SessionManager. The store is accessed in a
+    worker thread to not block the event loop.
+    """
+
+    def __init__(
+        self,
+        assistant: AsyncTextAssistant,
+        store: SessionStore | None = None,
+        idle_timeout: float = 3600,
+        max_sessions: int = 10000,
+    ) -> None:
+        """Initialize."""
+        super().__init__(store, idle_timeout, max_sessions, asyncio.Lock)
+        self.assistant = assistant
+
+    async def assist(
+        self, session_id: str, text_query: str
+    ) -> tuple[str, bytes | None, bytes]:
+        """Send a text request in a session and return the response as a tuple of: [text, html, audio]."""
+        lock = self._acquire_session_lock(session_id)
+        try:
+            async with lock:
+                session = await self._run(self._checkout, session_id)
+                try:
+                    return await self.assistant._assist(text_query, session)
+                finally:
+                    await self._run(self._checkin, session)
+        finally:
+            self._release_session_lock(session_id)
+
+    async def reset(self, session_id: str) -> None:
+        """Forget a session, its next query starts a new conversation."""
+        await self._run(self._forget, session_id)
+
+    async def evict_idle(self) -> int:
+        """Forget sessions idle for longer than idle_timeout and return how many."""
+        return await self._run(self._forget_idle)
+
+    async def _run(self, fn: Callable[..., _T], *args: object) -> _T:
+        """Call fn in a worker thread if it accesses the store."""
+        if self.store is None:
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
@@ -24,26 +24,363 @@
 # - Return audio response as mp3
 # - Extracted command line tool to demo.py
 # - Added strict typing with mypy
+# - Added AsyncTextAssistant built on grpc.aio
+# - Added streaming assist API yielding typed events
+# - Added optional sharing of channels through a ChannelPool
+# - Added optional ResponseCache
+# - Decoupled conversation state from the assistant for SessionManager
+# - Skip deserializing audio and screen output that wasn't requested
+# - Serialize requests from a prebuilt template
+# - Log summaries of serialized messages without copying them
+# - Allow passing an existing channel
+# - Added optional per-call instrumentation
+# - Added optional background credential refresh
+# - Added optional retry and hedging CallPolicy
+# - Added optional client-side RateLimiter
+# - Added configurable audio encoding, sample rate and volume
+# - Added optional coalescing of identical concurrent queries
+# - Import grpc, google-auth and optional features on first use
+# - Added channel options, compression and warmup
+# - Added optional streaming of the audio response to a sink
 
-from collections.abc import Generator
+from __future__ import annotations
 
-import google.auth.transport.grpc
-import google.auth.transport.requests
-import google.oauth2.credentials
+from collections.abc import AsyncIterator, Generator, Hashable, Iterator
+from typing import TYPE_CHECKING, Any, Protocol
 
-from google.assistant.embedded.v1alpha2 import (
-    embedded_assistant_pb2,
-    embedded_assistant_pb2_grpc,
+from google.assistant.embedded.v1alpha2 import embedded_assistant_pb2
+
+from . import assistant_helpers, wire
+from .audio import assemble_audio, check_audio_config
+from .cache import CachedResponse, ResponseCache
+from .events import (
+    AssistEvent,
+    AudioOut,
+    ConversationStateUpdate,
+    DisplayText,
+    ScreenOut,
 )
 
-from . import assistant_helpers
+# grpc, google-auth and its requests transport take longer to import than
+# the rest of the package, they are imported when a channel is created.
+if TYPE_CHECKING:
+    import google.oauth2.credentials
+    import grpc
+
+    from .audio_sink import AudioSink, SpillSink, _SinkWriter
+    from .channel_pool import ChannelOptions, ChannelPool
+    from .coalesce import Coalescer
+    from .credential_manager import CredentialManager
+    from .instrumentation import Instrumentation, _CallRecorder
+    from .policy import AttemptHandle, CallPolicy
+    from .ratelimit import RateLimiter
 
 ASSISTANT_API_ENDPOINT = "embeddedassistant.googleapis.com"
 DEFAULT_GRPC_DEADLINE = 60 * 3 + 5
 PLAYING = embedded_assistant_pb2.ScreenOutConfig.PLAYING
+ASSIST_METHOD = "/google.assistant.embedded.v1alpha2.EmbeddedAssistant/Assist"
+
+
+class Conversation(Protocol):
+    """Conversation state chained from one query to the next."""
+
+    conversation_state: bytes | None
+    is_new_conversation: bool
+
+
+class _NewConversation:
+    """Conversation of a stateless query, it doesn't affect the assistant's conversation."""
+
+    __slots__ = ("conversation_state", "is_new_conversation")
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.conversation_state: bytes | None = None
+        self.is_new_conversation = True
+
+
+class _ConversationSnapshot:
+    """Copy of a conversation that an attempt updates without affecting other attempts."""
+
+    __slots__ = ("conversation_state", "is_new_conversation", "audio_sink")
+
+    audio_sink: SpillSink | None
+
+    def __init__(self, conversation: Conversation, spill_audio: bool = False) -> None:
+        """Initialize.
+
+        spill_audio: buffer the audio of the attempt in a SpillSink, so that
+            only the returned attempt writes to the caller's sink.
+        """
+        self.conversation_state = conversation.conversation_state
+        self.is_new_conversation = conversation.is_new_conversation
+        self.audio_sink = None
+        if spill_audio:
+            from .audio_sink import SpillSink
+
+            self.audio_sink = SpillSink()
+
+    def commit(
+        self, conversation: Conversation, audio_sink: AudioSink | None = None
+    ) -> None:
+        """Update the conversation to this snapshot and copy the buffered audio to audio_sink."""
+        conversation.conversation_state = self.conversation_state
+        conversation.is_new_conversation = self.is_new_conversation
+        if self.audio_sink is not None and audio_sink is not None:
+            self.audio_sink.copy_to(audio_sink)
 
+    def close(self) -> None:
+        """Discard the buffered audio."""
+        if self.audio_sink is not None:
+            self.audio_sink.close()
 
-class TextAssistant:
+
+class _AssistStub:
+    """Client of the Assist method that sends requests serialized by the assistant."""
+
+    __slots__ = ("Assist",)
+
+    def __init__(
+        self, channel: grpc.Channel | grpc.aio.Channel, deserializer: Any
+    ) -> None:
+        """Initialize."""
+        self.Assist = channel.stream_stream(
+            ASSIST_METHOD,
+            # Requests are serialized by _iter_assist_requests.
+            request_serializer=None,
+            response_deserializer=deserializer,
+        )
+
+
+class _AssistResult:
+    """Accumulates streamed events into a tuple of: [text, html, audio]."""
+
+    audio_writer: _SinkWriter | None
+
+    def __init__(
+        self, encoding: str, sample_rate_hertz: int, audio_sink: AudioSink | None
+    ) -> None:
+        """Initialize.
+
+        audio_sink: receives the audio instead of the result.
+        """
+        self.encoding = encoding
+        self.sample_rate_hertz = sample_rate_hertz
+        self.text: str = ""
+        self.html: bytes | None = None
+        self.audio_chunks: list[bytes] = []
+        self.audio_writer = None
+        if audio_sink is not None:
+            from .audio_sink import _SinkWriter
+
+            self.audio_writer = _SinkWriter(audio_sink, encoding, sample_rate_hertz)
+
+    def add(self, event: AssistEvent) -> None:
+        """Add an event."""
+        if isinstance(event, AudioOut):
+            if self.audio_writer is not None:
+                self.audio_writer.write(event.audio_data)
+            else:
+                self.audio_chunks.append(event.audio_data)
+        elif isinstance(event, ScreenOut):
+            self.html = event.html
+        elif isinstance(event, DisplayText):
+            self.text = event.text
+
+    def result(self) -> tuple[str, bytes | None, bytes]:
+        """Return the accumulated response, without audio if it went to a sink."""
+        if self.audio_writer is not None:
+            self.audio_writer.finish()
+            return self.text, self.html, b""
+        audio = assemble_audio(self.audio_chunks, self.encoding, self.sample_rate_hertz)
+        return self.text, self.html, audio
+
+
+class _TextAssistantBase:
+    """Configuration and conversation state shared by the sync and async assistants."""
+
+    def __init__(
+        self,
+        language_code: str,
+        device_model_id: str,
+        device_id: str,
+        display: bool,
+        audio_out: bool,
+        deadline_sec: int,
+        cache: ResponseCache | None,
+        instrumentation: Instrumentation | None,
+        call_policy: CallPolicy | None,
+        rate_limiter: RateLimiter | None,
+        audio_encoding: str,
+        sample_rate_hertz: int,
+        volume_percentage: int,
+        coalescer: Coalescer | None,
+    ) -> None:
+        """Initialize."""
+        check_audio_config(audio_encoding, sample_rate_hertz, volume_percentage)
+        self.language_code = language_code
+        self.device_model_id = device_model_id
+        self.device_id = device_id
+        self.conversation_state: bytes | None = None
+        # Force reset of first conversation.
+        self.is_new_conversation = True
+        self.display = display
+        self.audio_out = audio_out
+        self.audio_encoding = audio_encoding
+        self.sample_rate_hertz = sample_rate_hertz
+        self.volume_percentage = volume_percentage
+        self.deadline = deadline_sec
+        self.cache = cache
+        self.instrumentation = instrumentation
+        self.call_policy = call_policy
+        self.rate_limiter = rate_limiter
+        self.coalescer = coalescer
+        self._template: (
+            tuple[tuple[str, str, str, bool, str, int, int], wire.AssistRequestTemplate]
+            | None
+        ) = None
+
+    def _cache_lookup(
+        self, text_query: str, conversation: Conversation
+    ) -> tuple[Hashable | None, CachedResponse | None]:
+        """Return the cache key of a query, or None if it shouldn't be cached, and the cached response."""
+        cache = self.cache
+        if cache is None or (
+            conversation.conversation_state is not None
+            and not cache.cache_in_conversation
+        ):
+            return None, None
+        key = self._query_key(text_query)
+        return key, cache.get(key)
+
+    @staticmethod
+    def _cached_response(
+        cached: CachedResponse, audio_sink: AudioSink | None
+    ) -> tuple[str, bytes | None, bytes]:
+        """Return a cached response, writing its audio to the sink if there is one."""
+        if audio_sink is None:
+            return cached
+        text, html, audio = cached
+        if audio:
+            audio_sink.write(audio)
+        return text, html, b""
+
+    def _coalesce_key(
+        self, text_query: str, conversation: Conversation
+    ) -> Hashable | None:
+        """Return the key to coalesce a query on, or None if it shouldn't be coalesced."""
+        coalescer = self.coalescer
+        conversation_state = conversation.conversation_state
+        if coalescer is None:
+            return None
+        if conversation_state is None:
+            return self._query_key(text_query)
+        if not coalescer.coalesce_in_conversation:
+            return None
+        # Only queries continuing the same conversation get the same response.
+        return (self._query_key(text_query), conversation_state)
+
+    def _query_key(self, text_query: str) -> Hashable:
+        """Return the key of queries that get the same response outside of a conversation."""
+        return (
+            ResponseCache.normalize_query(text_query),
+            self.language_code,
+            self.device_model_id,
+            self.device_id,
+            self.display,
+            self.audio_out,
+            self.audio_encoding,
+            self.sample_rate_hertz,
+            self.volume_percentage,
+        )
+
+    def _cache_store(self, key: Hashable | None, response: CachedResponse) -> None:
+        if key is not None and self.cache is not None:
+            self.cache.set(key, response)
+
+    def _start_call(self, text_query: str) -> _CallRecorder | None:
+        if self.instrumentation is None:
+            return None
+        from .instrumentation import _CallRecorder
+
+        return _CallRecorder(self.instrumentation.start_call(text_query))
+
+    def _create_stub(self, channel: grpc.Channel | grpc.aio.Channel) -> _AssistStub:
+        """Create a stub that only deserializes the response fields that are enabled."""
+        return _AssistStub(channel, self._deserialize_response)
+
+    def _deserialize_response(
+        self, data: bytes
+    ) -> embedded_assistant_pb2.AssistResponse:
+        assistant_helpers.log_serialized_assist_response(data)
+        return wire.parse_assist_response(data, self.audio_out, self.display)
+
+    def _request_template(self) -> wire.AssistRequestTemplate:
+        """Return the template of requests, rebuilt if the configuration changed."""
+        key = (
+            self.language_code,
+            self.device_model_id,
+            self.device_id,
+            self.display,
+            self.audio_encoding,
+            self.sample_rate_hertz,
+            self.volume_percentage,
+        )
+        template = self._template
+        if template is not None and template[0] == key:
+            return template[1]
+        check_audio_config(
+            self.audio_encoding, self.sample_rate_hertz, self.volume_percentage
+        )
+        config = embedded_assistant_pb2.AssistConfig(
+            audio_out_config=embedded_assistant_pb2.AudioOutConfig(
+                encoding=self.audio_encoding,
+                sample_rate_hertz=self.sample_rate_hertz,
+                volume_percentage=self.volume_percentage,
+            ),
+            dialog_state_in=embedded_assistant_pb2.DialogStateIn(
+                language_code=self.language_code,
+            ),
+            device_config=embedded_assistant_pb2.DeviceConfig(
+                device_id=self.device_id,
+                device_model_id=self.device_model_id,
+            ),
+        )
+        if self.display:
+            config.screen_out_config.screen_mode = PLAYING
+        self._template = (key, wire.AssistRequestTemplate(config))
+        return self._template[1]
+
+    def _iter_assist_requests(
+        self, text_query: str, conversation: Conversation
+    ) -> Generator[bytes, None, None]:
+        """Yield the serialized requests of a call."""
+        req = self._request_template().serialize(
+            text_query,
+            conversation.conversation_state,
+            conversation.is_new_conversation,
+        )
+        # Continue current conversation with later requests.
+        conversation.is_new_conversation = False
+        assistant_helpers.log_serialized_assist_request(req)
+        yield req
+
+    def _response_events(
+        self, resp: embedded_assistant_pb2.AssistResponse, conversation: Conversation
+    ) -> Iterator[AssistEvent]:
+        if resp.dialog_state_out.conversation_state:
+            conversation_state = resp.dialog_state_out.conversation_state
+            conversation.conversation_state = conversation_state
+            yield ConversationStateUpdate(conversation_state)
+        if resp.dialog_state_out.supplemental_display_text:
+            yield DisplayText(resp.dialog_state_out.supplemental_display_text)
+        if resp.screen_out.data:
+            yield ScreenOut(resp.screen_out.data)
+        if self.audio_out and resp.audio_out.audio_data:
+            yield AudioOut(resp.audio_out.audio_data, self.audio_encoding)
+
+
+class TextAssistant(_TextAssistantBase):
     """Assistant that supports text based conversations."""
 
     def __init__(
@@ -56,6 +393,19 @@ class TextAssistant:
         audio_out: bool = False,
         deadline_sec: int = DEFAULT_GRPC_DEADLINE,
         api_endpoint: str = ASSISTANT_API_ENDPOINT,
+        channel_pool: ChannelPool | None = None,
+        cache: ResponseCache | None = None,
+        channel: grpc.Channel | None = None,
+        instrumentation: Instrumentation | None = None,
+        credential_manager: CredentialManager | None = None,
+        call_policy: CallPolicy | None = None,
+        rate_limiter: RateLimiter | None = None,
+        audio_encoding: str = "MP3",
+        sample_rate_hertz: int = 24000,
+        volume_percentage: int = 100,
+        coalescer: Coalescer | None = None,
+        channel_options: ChannelOptions = (),
+        compression: grpc.Compression | None = None,
     ) -> None:
         """Initialize.
 
@@ -67,75 +417,500 @@ class TextAssistant:
         audio_out: enable audio response.
         deadline_sec: gRPC deadline in seconds for Google Assistant API call.
         api_endpoint: Address of Google Assistant API service.
+        channel_pool: pool to share the gRPC channel with other assistants.
+        cache: cache of responses to stateless queries.
+        channel: existing gRPC channel to use instead of creating one. It isn't
+            closed by the assistant.
+        instrumentation: receives timings and payload sizes of each call.
+        credential_manager: refreshes the credentials ahead of expiry. Not used
+            with a channel_pool, pass it to the pool instead.
+        call_policy: retries and hedging of assist calls. Doesn't apply to
+            assist_stream.
+        rate_limiter: admission control of calls, share it between assistants
+            using the same credentials.
+        audio_encoding: encoding of the audio response, one of LINEAR16, MP3 or
+            OPUS_IN_OGG. LINEAR16 audio returned by assist is wrapped in a WAV
+            header.
+        sample_rate_hertz: sample rate of the audio response, 16000 to 24000.
+        volume_percentage: volume of the audio response, 1 to 100.
+        coalescer: shares one call between identical concurrent queries that
+            don't continue a conversation. Doesn't apply to assist_stream.
+        channel_options: gRPC arguments of the created channel, e.g. keepalive,
+            see channel_pool.channel_options. Not used with a channel_pool,
+            pass them to the pool instead.
+        compression: compression of the requests of the created channel, e.g.
+            grpc.Compression.Gzip. Not used with a channel_pool.
         """
-        self.language_code = language_code
-        self.device_model_id = device_model_id
-        self.device_id = device_id
-        self.conversation_state: bytes | None = None
-        # Force reset of first conversation.
-        self.is_new_conversation = True
-        self.display = display
-        self.audio_out = audio_out
-        # Create an authorized gRPC channel.
-        channel = google.auth.transport.grpc.secure_authorized_channel(
-            credentials, google.auth.transport.requests.Request(), api_endpoint
+        super().__init__(
+            language_code,
+            device_model_id,
+            device_id,
+            display,
+            audio_out,
+            deadline_sec,
+            cache,
+            instrumentation,
+            call_policy,
+            rate_limiter,
+            audio_encoding,
+            sample_rate_hertz,
+            volume_percentage,
+            coalescer,
         )
-        self.assistant = embedded_assistant_pb2_grpc.EmbeddedAssistantStub(channel)
-        self.deadline = deadline_sec
+        self._channel_pool = channel_pool
+        self._owns_channel = channel is None
+        self._credentials = credentials
+        # Manager the credentials of the created channel are registered with.
+        self._credential_manager: CredentialManager | None = None
+        if channel is None:
+            # Create an authorized gRPC channel.
+            if channel_pool is not None:
+                channel = channel_pool.acquire(credentials, api_endpoint)
+            else:
+                from .channel_pool import create_channel
+
+                self._credential_manager = credential_manager
+                channel = create_channel(
+                    credentials,
+                    api_endpoint,
+                    credential_manager,
+                    channel_options,
+                    compression,
+                )
+        self._channel: grpc.Channel | None = channel
+        self.assistant = self._create_stub(channel)
 
-    def __enter__(self) -> "TextAssistant":  # noqa: D105
+    def __enter__(self) -> TextAssistant:  # noqa: D105
         return self
 
     def __exit__(  # noqa: D105
         self, etype: object, e: object, traceback: object
     ) -> bool:
+        self.close()
         if e:
             return False
         return True
 
-    def assist(self, text_query: str) -> tuple[str, bytes | None, bytes]:
-        """Send a text request to the Assistant and return the response as a tuple of: [text, html, audio]."""
+    def close(self) -> None:
+        """Release the gRPC channel to the pool or close it if it isn't shared."""
+        channel, self._channel = self._channel, None
+        if channel is None or not self._owns_channel:
+            return
+        if self._channel_pool is not None:
+            self._channel_pool.release(channel)
+        else:
+            channel.close()
+            if self._credential_manager is not None:
+                self._credential_manager.unregister(self._credentials)
 
-        def iter_assist_requests() -> (
-            Generator[embedded_assistant_pb2.AssistRequest, None, None]
-        ):
-            config = embedded_assistant_pb2.AssistConfig(
-                audio_out_config=embedded_assistant_pb2.AudioOutConfig(
-                    encoding="MP3",
-                    sample_rate_hertz=24000,
-                    volume_percentage=100,
-                ),
-                dialog_state_in=embedded_assistant_pb2.DialogStateIn(
-                    language_code=self.language_code,
-                    conversation_state=self.conversation_state,
-                    is_new_conversation=self.is_new_conversation,
-                ),
-                device_config=embedded_assistant_pb2.DeviceConfig(
-                    device_id=self.device_id,
-                    device_model_id=self.device_model_id,
-                ),
-                text_query=text_query,
+    def warmup(self, timeout: float | None = None) -> None:
+        """Connect the gRPC channel ahead of the first call.
+
+        Raises grpc.FutureTimeoutError if the channel isn't ready within
+        timeout seconds.
+        """
+        if self._channel is None:
+            raise ValueError("Assistant is closed")
+        import grpc
+
+        grpc.channel_ready_future(self._channel).result(timeout)
+
+    def assist(
+        self,
+        text_query: str,
+        audio_sink: AudioSink | None = None,
+        stateless: bool = False,
+    ) -> tuple[str, bytes | None, bytes]:
+        """Send a text request to the Assistant and return the response as a tuple of: [text, html, audio].
+
+        audio_sink: receives the audio as it arrives instead of buffering it,
+            the returned audio is then empty. See audio_sink for sinks. Such
+            responses aren't coalesced and not stored in the cache. With a
+            call_policy the audio of each attempt is buffered in a SpillSink
+            and written to audio_sink once the returned attempt completed.
+        stateless: send the query as a new conversation and leave the
+            conversation state untouched, e.g. for commands like "turn on the
+            lights". Such queries are cached and coalesced even if the
+            assistant has a conversation state.
+        """
+        return self._assist(text_query, self, audio_sink, stateless)
+
+    def assist_stream(self, text_query: str) -> Iterator[AssistEvent]:
+        """Send a text request to the Assistant and yield events as responses arrive.
+
+        Responses are never served from the cache.
+        """
+        return self._assist_stream(text_query, self)
+
+    def _assist(
+        self,
+        text_query: str,
+        conversation: Conversation,
+        audio_sink: AudioSink | None = None,
+        stateless: bool = False,
+    ) -> tuple[str, bytes | None, bytes]:
+        if stateless:
+            conversation = _NewConversation()
+        cache_key, cached = self._cache_lookup(text_query, conversation)
+        if cached is not None:
+            return self._cached_response(cached, audio_sink)
+        if audio_sink is not None:
+            # Every caller streams to its own sink, the call can't be shared.
+            return self._assist_uncached(text_query, conversation, None, audio_sink)
+        coalesce_key = self._coalesce_key(text_query, conversation)
+        if coalesce_key is None or self.coalescer is None:
+            return self._assist_uncached(text_query, conversation, cache_key)
+        return self.coalescer.call(
+            coalesce_key,
+            lambda: self._assist_uncached(text_query, conversation, cache_key),
+        )
+
+    def _assist_uncached(
+        self,
+        text_query: str,
+        conversation: Conversation,
+        cache_key: Hashable | None,
+        audio_sink: AudioSink | None = None,
+    ) -> tuple[str, bytes | None, bytes]:
+        if self.call_policy is None:
+            response = self._collect(text_query, conversation, audio_sink=audio_sink)
+        else:
+            response = self._assist_with_policy(
+                text_query, conversation, self.call_policy, audio_sink
+            )
+        self._cache_store(cache_key, response)
+        return response
+
+    def _assist_with_policy(
+        self,
+        text_query: str,
+        conversation: Conversation,
+        call_policy: CallPolicy,
+        audio_sink: AudioSink | None,
+    ) -> tuple[str, bytes | None, bytes]:
+        snapshots: list[_ConversationSnapshot] = []
+
+        def attempt(
+            timeout: float, handle: AttemptHandle
+        ) -> tuple[tuple[str, bytes | None, bytes], _ConversationSnapshot]:
+            snapshot = _ConversationSnapshot(conversation, audio_sink is not None)
+            snapshots.append(snapshot)
+            try:
+                response = self._collect(
+                    text_query, snapshot, timeout, handle, snapshot.audio_sink
+                )
+            except BaseException:
+                snapshot.close()
+                raise
+            return response, snapshot
+
+        try:
+            response, snapshot = call_policy.call(attempt, self.deadline)
+            snapshot.commit(conversation, audio_sink)
+        finally:
+            # Attempts still running fail on their closed sink.
+            for snapshot in snapshots:
+                snapshot.close()
+        return response
+
+    def _collect(
+        self,
+        text_query: str,
+        conversation: Conversation,
+        timeout: float | None = None,
+        handle: AttemptHandle | None = None,
+        audio_sink: AudioSink | None = None,
+    ) -> tuple[str, bytes | None, bytes]:
+        result = _AssistResult(self.audio_encoding, self.sample_rate_hertz, audio_sink)
+        for event in self._assist_stream(text_query, conversation, timeout, handle):
+            result.add(event)
+        return result.result()
+
+    def _assist_stream(
+        self,
+        text_query: str,
+        conversation: Conversation,
+        timeout: float | None = None,
+        handle: AttemptHandle | None = None,
+    ) -> Iterator[AssistEvent]:
+        if self.rate_limiter is None:
+            yield from self._rpc_stream(text_query, conversation, timeout, handle)
+            return
+        with self.rate_limiter.acquire():
+            yield from self._rpc_stream(text_query, conversation, timeout, handle)
+
+    def _rpc_stream(
+        self,
+        text_query: str,
+        conversation: Conversation,
+        timeout: float | None,
+        handle: AttemptHandle | None,
+    ) -> Iterator[AssistEvent]:
+        responses: Iterator[embedded_assistant_pb2.AssistResponse] = (
+            self.assistant.Assist(
+                self._iter_assist_requests(text_query, conversation),
+                self.deadline if timeout is None else timeout,
+            )
+        )
+        if handle is not None:
+            handle.set_call(responses)
+        recorder = self._start_call(text_query)
+        if recorder is None:
+            for resp in responses:
+                yield from self._response_events(resp, conversation)
+            return
+        try:
+            for resp in responses:
+                recorder.response()
+                for event in self._response_events(resp, conversation):
+                    recorder.event(event)
+                    yield event
+        except BaseException as err:
+            recorder.end(err)
+            raise
+        recorder.end()
+
+
+class AsyncTextAssistant(_TextAssistantBase):
+    """Assistant that supports text based conversations on an asyncio event loop."""
+
+    def __init__(
+        self,
+        credentials: google.oauth2.credentials.Credentials,
+        language_code: str = "en-US",
+        device_model_id: str = "default",
+        device_id: str = "default",
+        display: bool = False,
+        audio_out: bool = False,
+        deadline_sec: int = DEFAULT_GRPC_DEADLINE,
+        api_endpoint: str = ASSISTANT_API_ENDPOINT,
+        cache: ResponseCache | None = None,
+        channel: grpc.aio.Channel | None = None,
+        instrumentation: Instrumentation | None = None,
+        credential_manager: CredentialManager | None = None,
+        call_policy: CallPolicy | None = None,
+        rate_limiter: RateLimiter | None = None,
+        audio_encoding: str = "MP3",
+        sample_rate_hertz: int = 24000,
+        volume_percentage: int = 100,
+        coalescer: Coalescer | None = None,
+        channel_options: ChannelOptions = (),
+        compression: grpc.Compression | None = None,
+    ) -> None:
+        """Initialize.
+
+        Arguments are the same as for TextAssistant.
+        """
+        super().__init__(
+            language_code,
+            device_model_id,
+            device_id,
+            display,
+            audio_out,
+            deadline_sec,
+            cache,
+            instrumentation,
+            call_policy,
+            rate_limiter,
+            audio_encoding,
+            sample_rate_hertz,
+            volume_percentage,
+            coalescer,
+        )
+        self._owns_channel = channel is None
+        self._credentials = credentials
+        self._credential_manager: CredentialManager | None = None
+        if channel is None:
+            from .channel_pool import create_aio_channel
+
+            self._credential_manager = credential_manager
+            channel = create_aio_channel(
+                credentials,
+                api_endpoint,
+                credential_manager,
+                channel_options,
+                compression,
             )
-            # Continue current conversation with later requests.
-            self.is_new_conversation = False
-            if self.display:
-                config.screen_out_config.screen_mode = PLAYING
-            req = embedded_assistant_pb2.AssistRequest(config=config)
-            assistant_helpers.log_assist_request_without_audio(req)
-            yield req
-
-        text_response: str = ""
-        html_response: bytes | None = None
-        audio_response = b""
-        for resp in self.assistant.Assist(iter_assist_requests(), self.deadline):
-            assistant_helpers.log_assist_response_without_audio(resp)
-            if resp.screen_out.data:
-                html_response = resp.screen_out.data
-            if resp.dialog_state_out.conversation_state:
-                conversation_state = resp.dialog_state_out.conversation_state
-                self.conversation_state = conversation_state
-            if resp.dialog_state_out.supplemental_display_text:
-                text_response = resp.dialog_state_out.supplemental_display_text
-            if self.audio_out and resp.audio_out.audio_data:
-                audio_response += resp.audio_out.audio_data
-        return text_response, html_response, audio_response
+        self._channel: grpc.aio.Channel | None = channel
+        self.assistant = self._create_stub(channel)
+
+    async def __aenter__(self) -> AsyncTextAssistant:  # noqa: D105
+        return self
+
+    async def __aexit__(  # noqa: D105
+        self, etype: object, e: object, traceback: object
+    ) -> bool:
+        await self.close()
+        if e:
+            return False
+        return True
+
+    async def close(self) -> None:
+        """Close the gRPC channel unless it was passed in."""
+        channel, self._channel = self._channel, None
+        if channel is not None and self._owns_channel:
+            await channel.close()
+            if self._credential_manager is not None:
+                self._credential_manager.unregister(self._credentials)
+
+    async def warmup(self, timeout: float | None = None) -> None:
+        """Connect the gRPC channel ahead of the first call.
+
+        Raises asyncio.TimeoutError if the channel isn't ready within timeout
+        seconds.
+        """
+        if self._channel is None:
+            raise ValueError("Assistant is closed")
+        import asyncio
+
+        await asyncio.wait_for(self._channel.channel_ready(), timeout)
+
+    async def assist(
+        self,
+        text_query: str,
+        audio_sink: AudioSink | None = None,
+        stateless: bool = False,
+    ) -> tuple[str, bytes | None, bytes]:
+        """Send a text request to the Assistant and return the response as a tuple of: [text, html, audio].
+
+        audio_sink: same as for TextAssistant.assist. Writes to it block the
+            event loop.
+        stateless: same as for TextAssistant.assist.
+        """
+        return await self._assist(text_query, self, audio_sink, stateless)
+
+    def assist_stream(self, text_query: str) -> AsyncIterator[AssistEvent]:
+        """Send a text request to the Assistant and yield events as responses arrive.
+
+        Responses are never served from the cache.
+        """
+        return self._assist_stream(text_query, self)
+
+    async def _assist(
+        self,
+        text_query: str,
+        conversation: Conversation,
+        audio_sink: AudioSink | None = None,
+        stateless: bool = False,
+    ) -> tuple[str, bytes | None, bytes]:
+        if stateless:
+            conversation = _NewConversation()
+        cache_key, cached = self._cache_lookup(text_query, conversation)
+        if cached is not None:
+            return self._cached_response(cached, audio_sink)
+        if audio_sink is not None:
+            # Every caller streams to its own sink, the call can't be shared.
+            return await self._assist_uncached(
+                text_query, conversation, None, audio_sink
+            )
+        coalesce_key = self._coalesce_key(text_query, conversation)
+        if coalesce_key is None or self.coalescer is None:
+            return await self._assist_uncached(text_query, conversation, cache_key)
+        return await self.coalescer.async_call(
+            coalesce_key,
+            lambda: self._assist_uncached(text_query, conversation, cache_key),
+        )
+
+    async def _assist_uncached(
+        self,
+        text_query: str,
+        conversation: Conversation,
+        cache_key: Hashable | None,
+        audio_sink: AudioSink | None = None,
+    ) -> tuple[str, bytes | None, bytes]:
+        if self.call_policy is None:
+            response = await self._collect(
+                text_query, conversation, audio_sink=audio_sink
+            )
+        else:
+            response = await self._assist_with_policy(
+                text_query, conversation, self.call_policy, audio_sink
+            )
+        self._cache_store(cache_key, response)
+        return response
+
+    async def _assist_with_policy(
+        self,
+        text_query: str,
+        conversation: Conversation,
+        call_policy: CallPolicy,
+        audio_sink: AudioSink | None,
+    ) -> tuple[str, bytes | None, bytes]:
+        snapshots: list[_ConversationSnapshot] = []
+
+        async def attempt(
+            timeout: float,
+        ) -> tuple[tuple[str, bytes | None, bytes], _ConversationSnapshot]:
+            snapshot = _ConversationSnapshot(conversation, audio_sink is not None)
+            snapshots.append(snapshot)
+            try:
+                response = await self._collect(
+                    text_query, snapshot, timeout, snapshot.audio_sink
+                )
+            except BaseException:
+                snapshot.close()
+                raise
+            return response, snapshot
+
+        try:
+            response, snapshot = await call_policy.async_call(attempt, self.deadline)
+            snapshot.commit(conversation, audio_sink)
+        finally:
+            for snapshot in snapshots:
+                snapshot.close()
+        return response
+
+    async def _collect(
+        self,
+        text_query: str,
+        conversation: Conversation,
+        timeout: float | None = None,
+        audio_sink: AudioSink | None = None,
+    ) -> tuple[str, bytes | None, bytes]:
+        result = _AssistResult(self.audio_encoding, self.sample_rate_hertz, audio_sink)
+        async for event in self._assist_stream(text_query, conversation, timeout):
+            result.add(event)
+        return result.result()
+
+    async def _assist_stream(
+        self,
+        text_query: str,
+        conversation: Conversation,
+        timeout: float | None = None,
+    ) -> AsyncIterator[AssistEvent]:
+        if self.rate_limiter is None:
+            async for event in self._rpc_stream(text_query, conversation, timeout):
+                yield event
+            return
+        async with self.rate_limiter.acquire_async():
+            async for event in self._rpc_stream(text_query, conversation, timeout):
+                yield event
+
+    async def _rpc_stream(
+        self,
+        text_query: str,
+        conversation: Conversation,
+        timeout: float | None,
+    ) -> AsyncIterator[AssistEvent]:
+        responses: AsyncIterator[embedded_assistant_pb2.AssistResponse] = (
+            self.assistant.Assist(
+                self._iter_assist_requests(text_query, conversation),
+                self.deadline if timeout is None else timeout,
+            )
+        )
+        recorder = self._start_call(text_query)
+        if recorder is None:
+            async for resp in responses:
+                for event in self._response_events(resp, conversation):
+                    yield event
+            return
+        try:
+            async for resp in responses:
+                recorder.response()
+                for event in self._response_events(resp, conversation):
+                    recorder.event(event)
+                    yield event
+        except BaseException as err:
+            recorder.end(err)
+            raise
+        recorder.end()
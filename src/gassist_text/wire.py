@@ -0,0 +1,140 @@
+"""Helpers working directly on the protobuf wire format."""
+
+from collections.abc import Collection
+
+from google.assistant.embedded.v1alpha2 import embedded_assistant_pb2
+
+# Field numbers of AssistResponse.
+AUDIO_OUT_FIELD = 3
+SCREEN_OUT_FIELD = 4
+
+_VARINT = 0
+_FIXED64 = 1
+_LENGTH_DELIMITED = 2
+_FIXED32 = 5
+
+
+def read_varint(data: memoryview, pos: int) -> tuple[int, int]:
+    """Decode a varint at pos and return it with the position after it."""
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def strip_fields(data: bytes, skip_fields: Collection[int]) -> bytes:
+    """Return a serialized message without the given top-level fields.
+
+    The skipped fields are never decoded or copied. Returns data unchanged if
+    it contains none of them or uses wire types that can't be skipped.
+    """
+    view = memoryview(data)
+    end = len(view)
+    pos = 0
+    kept_start = 0
+    chunks: list[memoryview] = []
+    while pos < end:
+        field_start = pos
+        tag, pos = read_varint(view, pos)
+        wire_type = tag & 0x7
+        if wire_type == _VARINT:
+            _, pos = read_varint(view, pos)
+        elif wire_type == _FIXED64:
+            pos += 8
+        elif wire_type == _LENGTH_DELIMITED:
+            length, pos = read_varint(view, pos)
+            pos += length
+        elif wire_type == _FIXED32:
+            pos += 4
+        else:
+            # Deprecated groups. Let protobuf deal with them.
+            return data
+        if tag >> 3 in skip_fields:
+            chunks.append(view[kept_start:field_start])
+            kept_start = pos
+    if not chunks:
+        return data
+    chunks.append(view[kept_start:])
+    return b"".join(chunks)
+
+
+def parse_assist_response(
+    data: bytes, audio_out: bool = True, display: bool = True
+) -> embedded_assistant_pb2.AssistResponse:
+    """Deserialize an AssistResponse skipping audio_out and screen_out unless enabled."""
+    skip_fields = []
+    if not audio_out:
+        skip_fields.append(AUDIO_OUT_FIELD)
+    if not display:
+        skip_fields.append(SCREEN_OUT_FIELD)
+    if skip_fields:
+        data = strip_fields(data, skip_fields)
+    return embedded_assistant_pb2.AssistResponse.FromString(data)
+
+
+def encode_varint(value: int) -> bytes:
+    """Encode a non-negative integer as a varint."""
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _length_delimited(tag: bytes, payload: bytes) -> bytes:
+    return tag + encode_varint(len(payload)) + payload
+
+
+# Tags of the per-call fields of AssistRequest.
+_ASSIST_REQUEST_CONFIG_TAG = b"\x0a"  # AssistRequest.config = 1
+_TEXT_QUERY_TAG = b"\x32"  # AssistConfig.text_query = 6
+_DIALOG_STATE_IN_TAG = b"\x1a"  # AssistConfig.dialog_state_in = 3
+_CONVERSATION_STATE_TAG = b"\x0a"  # DialogStateIn.conversation_state = 1
+_IS_NEW_CONVERSATION_TRUE = b"\x38\x01"  # DialogStateIn.is_new_conversation = 7
+
+
+class AssistRequestTemplate:
+    """Serialized AssistRequest with the per-call fields spliced in at call time.
+
+    The invariant config is serialized once. Per call only the text query and
+    the conversation state are encoded and appended, relying on protobuf
+    merging repeated occurrences of the config message when parsing.
+    """
+
+    def __init__(self, config: embedded_assistant_pb2.AssistConfig) -> None:
+        """Initialize.
+
+        config: the part of the config that is the same for every call. Its
+            per-call fields are cleared, a later occurrence can't reset them to
+            their default when merged.
+        """
+        request = embedded_assistant_pb2.AssistRequest(config=config)
+        request.config.ClearField("text_query")
+        request.config.dialog_state_in.ClearField("conversation_state")
+        request.config.dialog_state_in.ClearField("is_new_conversation")
+        self.prefix: bytes = request.SerializeToString()
+
+    def serialize(
+        self,
+        text_query: str,
+        conversation_state: bytes | None,
+        is_new_conversation: bool,
+    ) -> bytes:
+        """Return the serialized AssistRequest for a call."""
+        dialog_state_in = b""
+        if conversation_state:
+            dialog_state_in = _length_delimited(
+                _CONVERSATION_STATE_TAG, conversation_state
+            )
+        if is_new_conversation:
+            dialog_state_in += _IS_NEW_CONVERSATION_TRUE
+        config = _length_delimited(_TEXT_QUERY_TAG, text_query.encode())
+        if dialog_state_in:
+            config += _length_delimited(_DIALOG_STATE_IN_TAG, dialog_state_in)
+        return self.prefix + _length_delimited(_ASSIST_REQUEST_CONFIG_TAG, config)
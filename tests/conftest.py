@@ -0,0 +1,119 @@
+"""Fixtures shared by the tests."""
+
+import asyncio
+from collections.abc import AsyncIterator, Callable, Iterator
+import time
+from typing import Any
+
+import google.oauth2.credentials
+import grpc
+import pytest
+
+from gassist_text import AsyncTextAssistant, TextAssistant
+from gassist_text.fake_server import FakeEmbeddedAssistant, serve
+from google.assistant.embedded.v1alpha2 import embedded_assistant_pb2
+
+
+def _respond(data: bytes) -> list[Any]:
+    config = embedded_assistant_pb2.AssistRequest.FromString(data).config
+    if config.text_query == "fail":
+        raise RuntimeError("fail")
+    # Echo the query and chain the conversation state.
+    state = config.dialog_state_in.conversation_state + config.text_query.encode()
+    return [
+        embedded_assistant_pb2.AssistResponse(
+            dialog_state_out=embedded_assistant_pb2.DialogStateOut(
+                conversation_state=state,
+                supplemental_display_text=state.decode(),
+            )
+        )
+    ]
+
+
+class EchoStub:
+    """Stub that appends the query to the conversation state and echoes it."""
+
+    def __init__(self, delay: float = 0.0) -> None:
+        """Initialize.
+
+        delay: seconds each call takes.
+        """
+        self.delay = delay
+
+    def Assist(self, requests: Iterator[Any], timeout: int) -> Iterator[Any]:
+        """Respond to the request."""
+        time.sleep(self.delay)
+        return iter(_respond(next(requests)))
+
+
+class AsyncEchoStub:
+    """Async stub that appends the query to the conversation state and echoes it."""
+
+    def __init__(self, delay: float = 0.0) -> None:
+        """Initialize.
+
+        delay: seconds each call takes.
+        """
+        self.delay = delay
+
+    def Assist(self, requests: Iterator[Any], timeout: int) -> AsyncIterator[Any]:
+        """Respond to the request."""
+
+        async def responses() -> AsyncIterator[Any]:
+            await asyncio.sleep(self.delay)
+            for resp in _respond(next(requests)):
+                yield resp
+
+        return responses()
+
+
+@pytest.fixture
+def credentials() -> google.oauth2.credentials.Credentials:
+    """Return credentials without a token."""
+    return google.oauth2.credentials.Credentials(token=None)
+
+
+@pytest.fixture
+def echo_assistant(
+    credentials: google.oauth2.credentials.Credentials,
+) -> Callable[..., TextAssistant]:
+    """Return a factory of assistants answering with EchoStub(delay)."""
+
+    def create(delay: float = 0.0) -> TextAssistant:
+        assistant = TextAssistant(credentials)
+        assistant.assistant = EchoStub(delay)  # type: ignore[assignment]
+        return assistant
+
+    return create
+
+
+@pytest.fixture
+def async_echo_assistant(
+    credentials: google.oauth2.credentials.Credentials,
+) -> Callable[..., AsyncTextAssistant]:
+    """Return a factory of async assistants answering with AsyncEchoStub(delay)."""
+
+    def create(delay: float = 0.0) -> AsyncTextAssistant:
+        assistant = AsyncTextAssistant(credentials)
+        assistant.assistant = AsyncEchoStub(delay)  # type: ignore[assignment]
+        return assistant
+
+    return create
+
+
+@pytest.fixture
+def fake_server() -> Iterator[Callable[..., str]]:
+    """Return a function that starts a fake server and returns its address.
+
+    The servers are stopped at the end of the test.
+    """
+    servers: list[grpc.Server] = []
+
+    def start(servicer: FakeEmbeddedAssistant | None = None) -> str:
+        server, address = serve(servicer)
+        servers.append(server)
+        return address
+
+    yield start
+    for server in servers:
+        server.stop(None)
@@ -0,0 +1,56 @@
+"""Tests for assistant_helpers."""
+
+import logging
+
+import pytest
+
+from gassist_text import assistant_helpers
+from google.assistant.embedded.v1alpha2 import embedded_assistant_pb2
+
+RESPONSE = embedded_assistant_pb2.AssistResponse(
+    event_type=embedded_assistant_pb2.AssistResponse.END_OF_UTTERANCE,
+    audio_out=embedded_assistant_pb2.AudioOut(audio_data=b"\x00" * 1000),
+    dialog_state_out=embedded_assistant_pb2.DialogStateOut(
+        conversation_state=b"state",
+        supplemental_display_text="hello",
+        volume_percentage=-1,
+    ),
+    speech_results=[embedded_assistant_pb2.SpeechRecognitionResult(stability=0.5)],
+)
+SUMMARY = (
+    "event_type: END_OF_UTTERANCE "
+    "speech_results { stability: 0.5 } "
+    "audio_out { audio_data: <1000 bytes> } "
+    "dialog_state_out { supplemental_display_text: 'hello' "
+    "conversation_state: <5 bytes> volume_percentage: -1 }"
+)
+
+
+def test_summaries() -> None:
+    """Test messages are summarized with sizes of bytes fields."""
+    assert assistant_helpers.summarize_message(RESPONSE) == SUMMARY
+    assert (
+        assistant_helpers.summarize_serialized(
+            RESPONSE.SerializeToString(),
+            embedded_assistant_pb2.AssistResponse.DESCRIPTOR,
+        )
+        == SUMMARY
+    )
+
+
+def test_log_sampling(caplog: pytest.LogCaptureFixture) -> None:
+    """Test the sample rate controls how many messages are logged."""
+    data = RESPONSE.SerializeToString()
+    with caplog.at_level(logging.DEBUG):
+        assistant_helpers.log_serialized_assist_response(data)
+        assert caplog.messages == [f"AssistResponse: {SUMMARY}"]
+        caplog.clear()
+        assistant_helpers.set_debug_sample_rate(0)
+        try:
+            assistant_helpers.log_serialized_assist_response(data)
+            assistant_helpers.log_assist_response_without_audio(RESPONSE)
+        finally:
+            assistant_helpers.set_debug_sample_rate(1)
+        assert not caplog.messages
+    with pytest.raises(ValueError):
+        assistant_helpers.set_debug_sample_rate(2)
@@ -0,0 +1,35 @@
+"""Tests for the audio output configuration and framing."""
+
+import io
+import wave
+
+import pytest
+
+from gassist_text.audio import assemble_audio, check_audio_config
+
+
+def test_check_audio_config() -> None:
+    """Test the configuration is validated against the API's limits."""
+    check_audio_config("OPUS_IN_OGG", 16000, 1)
+    check_audio_config("LINEAR16", 24000, 100)
+    with pytest.raises(ValueError, match="audio_encoding"):
+        check_audio_config("ENCODING_UNSPECIFIED", 24000, 100)
+    with pytest.raises(ValueError, match="audio_encoding"):
+        check_audio_config("AAC", 24000, 100)
+    with pytest.raises(ValueError, match="sample_rate_hertz"):
+        check_audio_config("MP3", 8000, 100)
+    with pytest.raises(ValueError, match="volume_percentage"):
+        check_audio_config("MP3", 24000, 0)
+
+
+def test_assemble_audio() -> None:
+    """Test LINEAR16 is wrapped in a WAV header and other encodings are concatenated."""
+    chunks = [b"\x01\x00\x02\x00", b"\x03\x00"]
+    assert assemble_audio(chunks, "MP3", 24000) == b"\x01\x00\x02\x00\x03\x00"
+    assert assemble_audio(chunks, "OPUS_IN_OGG", 16000) == b"\x01\x00\x02\x00\x03\x00"
+    assert assemble_audio([], "LINEAR16", 16000) == b""
+    with wave.open(io.BytesIO(assemble_audio(chunks, "LINEAR16", 16000))) as wav:
+        assert wav.getnchannels() == 1
+        assert wav.getsampwidth() == 2
+        assert wav.getframerate() == 16000
+        assert wav.readframes(10) == b"".join(chunks)
@@ -0,0 +1,158 @@
+"""Tests for audio sinks."""
+
+import asyncio
+from collections.abc import Callable
+import os
+from pathlib import Path
+import socket
+
+import google.oauth2.credentials
+import grpc
+import pytest
+
+from gassist_text import (
+    AsyncTextAssistant,
+    CallPolicy,
+    FileSink,
+    MemorySink,
+    ResponseCache,
+    SocketSink,
+    SpillSink,
+    TextAssistant,
+)
+from gassist_text.audio import assemble_audio
+from gassist_text.audio_sink import _SinkWriter
+from gassist_text.fake_server import FakeEmbeddedAssistant
+
+CREDENTIALS = google.oauth2.credentials.Credentials(token=None)
+CHUNKS = [b"ab", b"cdef", b"gh"]
+
+
+@pytest.mark.parametrize("encoding", ["LINEAR16", "MP3"])
+def test_sink_writer_frames_audio(tmp_path: Path, encoding: str) -> None:
+    """Test seekable sinks get the same bytes as assemble_audio."""
+    expected = assemble_audio(CHUNKS, encoding, 16000)
+    path = str(tmp_path / "audio")
+    with (
+        MemorySink() as memory,
+        SpillSink(max_memory=4) as spill,
+        FileSink(path) as file,
+    ):
+        for sink in (memory, spill, file):
+            writer = _SinkWriter(sink, encoding, 16000)
+            for chunk in CHUNKS:
+                writer.write(chunk)
+            writer.finish()
+        assert memory.getvalue() == expected
+        assert spill.getvalue() == expected
+        copy = MemorySink()
+        spill.copy_to(copy)
+        assert copy.getvalue() == expected
+    with open(path, "rb") as f:
+        assert f.read() == expected
+
+
+def test_unseekable_sinks_keep_streaming_header(tmp_path: Path) -> None:
+    """Test the WAV header of sinks that can't seek has the streaming size."""
+    expected = assemble_audio(CHUNKS, "LINEAR16", 16000)
+    path = str(tmp_path / "audio.wav")
+    with open(path, "wb") as f:
+        f.write(b"old")
+    with FileSink(path, append=True) as file:
+        writer = _SinkWriter(file, "LINEAR16", 16000)
+        for chunk in CHUNKS:
+            writer.write(chunk)
+        writer.finish()
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data[:3] == b"old"
+    assert data[3:7] == expected[:4]
+    assert data[7:11] == b"\xff\xff\xff\xff"
+    assert data[-len(b"abcdefgh") :] == b"abcdefgh"
+
+    reader, writer_socket = socket.socketpair()
+    with reader, writer_socket:
+        writer = _SinkWriter(SocketSink(writer_socket), "LINEAR16", 16000)
+        for chunk in CHUNKS:
+            writer.write(chunk)
+        writer.finish()
+        writer_socket.shutdown(socket.SHUT_WR)
+        received = b""
+        while data := reader.recv(1024):
+            received += data
+    assert len(received) == len(expected)
+    assert received[44:] == b"abcdefgh"
+
+
+def test_assist_audio_sink(tmp_path: Path, fake_server: Callable[..., str]) -> None:
+    """Test assist streams the audio to the sink, also with a policy and cache hits."""
+    servicer = FakeEmbeddedAssistant(chunk_count=5, audio_size=50000)
+    address = fake_server(servicer)
+    with grpc.insecure_channel(address) as channel:
+        assistant = TextAssistant(
+            CREDENTIALS,
+            audio_out=True,
+            channel=channel,
+            cache=ResponseCache(cache_in_conversation=True),
+            call_policy=CallPolicy(max_attempts=2),
+        )
+        text, _, audio = assistant.assist("hi")
+        assert len(audio) == 50000
+        path = str(tmp_path / "audio.mp3")
+        with FileSink(path) as sink:
+            assert assistant.assist("hello", sink) == ("You said: hello", None, b"")
+        assert os.path.getsize(path) == 50000
+        # Served from the cache.
+        memory_sink = MemorySink()
+        assert assistant.assist("hi", memory_sink) == (text, None, b"")
+        assert memory_sink.getvalue() == audio
+        assert len(servicer.requests) == 2
+
+
+def test_assist_audio_sink_closes_attempt_buffers(
+    monkeypatch: pytest.MonkeyPatch, fake_server: Callable[..., str]
+) -> None:
+    """Test the audio buffers of failed and returned attempts are closed."""
+    buffers = []
+    close = SpillSink.close
+
+    def record_close(self: SpillSink) -> None:
+        buffers.append(self)
+        close(self)
+
+    monkeypatch.setattr(SpillSink, "close", record_close)
+    servicer = FakeEmbeddedAssistant(audio_size=1000, error=grpc.StatusCode.UNAVAILABLE)
+    address = fake_server(servicer)
+    with grpc.insecure_channel(address) as channel:
+        assistant = TextAssistant(
+            CREDENTIALS,
+            audio_out=True,
+            channel=channel,
+            call_policy=CallPolicy(max_attempts=2, initial_backoff=0.01),
+        )
+        with pytest.raises(grpc.RpcError):
+            assistant.assist("hi", MemorySink())
+        assert len({id(buffer) for buffer in buffers}) == 2
+        servicer.error = None
+        sink = MemorySink()
+        assistant.assist("hi", sink)
+        assert len(sink.getvalue()) == 1000
+        assert len({id(buffer) for buffer in buffers}) == 3
+
+
+def test_async_assist_audio_sink(fake_server: Callable[..., str]) -> None:
+    """Test async assist streams the audio to the sink."""
+
+    async def run(address: str) -> None:
+        async with (
+            grpc.aio.insecure_channel(address) as channel,
+            AsyncTextAssistant(
+                CREDENTIALS, audio_out=True, channel=channel
+            ) as assistant,
+        ):
+            sink = MemorySink()
+            assert (await assistant.assist("hi", sink))[2] == b""
+            assert len(sink.getvalue()) == 1000
+
+    address = fake_server(FakeEmbeddedAssistant(chunk_count=3, audio_size=1000))
+    asyncio.run(run(address))
@@ -0,0 +1,59 @@
+"""Tests for assist_many."""
+
+import asyncio
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from gassist_text import (
+    AsyncTextAssistant,
+    SingleQuery,
+    TextAssistant,
+    assist_many,
+    async_assist_many,
+)
+
+QUERIES: list[str | tuple[Hashable, str]] = [
+    ("a", "1"),
+    ("b", "x"),
+    ("a", "2"),
+    "solo",
+    ("a", "fail"),
+    ("a", "3"),
+    # Doesn't share a conversation with the plain string query at index 3.
+    (3, "y"),
+]
+
+
+def _check(results: list[Any]) -> None:
+    by_index = {result.index: result for result in results}
+    assert sorted(by_index) == list(range(len(QUERIES)))
+    assert by_index[0].response[0] == "1"
+    assert by_index[1].response[0] == "x"
+    assert by_index[2].response[0] == "12"
+    assert by_index[3].conversation_id == SingleQuery(3)
+    assert by_index[3].response[0] == "solo"
+    assert by_index[4].response is None
+    assert isinstance(by_index[4].error, RuntimeError)
+    assert by_index[5].response[0] == "123"
+    assert by_index[6].response[0] == "y"
+
+
+def test_assist_many(echo_assistant: Callable[[], TextAssistant]) -> None:
+    """Test conversations keep their order and errors are reported per item."""
+    _check(list(assist_many(lambda _: echo_assistant(), QUERIES, max_concurrency=2)))
+
+
+def test_async_assist_many(
+    async_echo_assistant: Callable[[], AsyncTextAssistant],
+) -> None:
+    """Test the asyncio version."""
+
+    async def run() -> list[Any]:
+        return [
+            result
+            async for result in async_assist_many(
+                lambda _: async_echo_assistant(), QUERIES, max_concurrency=2
+            )
+        ]
+
+    _check(asyncio.run(run()))
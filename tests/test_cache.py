@@ -0,0 +1,102 @@
+"""Tests for ResponseCache."""
+
+from collections.abc import Iterator
+from concurrent import futures
+import time
+from typing import Any
+
+import google.oauth2.credentials
+
+from gassist_text import MemoryCacheBackend, ResponseCache, TextAssistant
+from google.assistant.embedded.v1alpha2 import embedded_assistant_pb2
+
+
+class CountingStub:
+    """Stub that counts calls."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.calls = 0
+
+    def Assist(self, requests: Iterator[Any], timeout: int) -> Iterator[Any]:
+        """Respond with the call number."""
+        list(requests)
+        self.calls += 1
+        return iter(
+            [
+                embedded_assistant_pb2.AssistResponse(
+                    dialog_state_out=embedded_assistant_pb2.DialogStateOut(
+                        conversation_state=b"state",
+                        supplemental_display_text=str(self.calls),
+                    )
+                )
+            ]
+        )
+
+
+def test_memory_backend_lru_and_ttl() -> None:
+    """Test LRU eviction and expiry."""
+    backend = MemoryCacheBackend(maxsize=2, ttl=60)
+    backend.set("a", ("a", None, b""))
+    backend.set("b", ("b", None, b""))
+    assert backend.get("a") == ("a", None, b"")
+    backend.set("c", ("c", None, b""))
+    assert backend.get("b") is None
+    assert backend.get("a") is not None
+    assert len(backend) == 2
+    expiring = MemoryCacheBackend(ttl=0.01)
+    expiring.set("a", ("a", None, b""))
+    time.sleep(0.02)
+    assert expiring.get("a") is None
+
+
+def test_assist_uses_cache_when_stateless() -> None:
+    """Test repeated stateless queries on one assistant hit the cache."""
+    cache = ResponseCache()
+    credentials = google.oauth2.credentials.Credentials(token=None)
+    stub = CountingStub()
+    with TextAssistant(credentials, cache=cache) as assistant:
+        assistant.assistant = stub  # type: ignore[assignment]
+        assistant.conversation_state = b"earlier"
+        responses = [
+            assistant.assist("What's the weather", stateless=True) for _ in range(5)
+        ]
+        assert responses == [("1", None, b"")] * 5
+        # Stateless queries don't change the conversation state.
+        assert assistant.conversation_state == b"earlier"
+    assert stub.calls == 1
+    assert (cache.hits, cache.misses) == (4, 1)
+
+
+def test_assist_bypasses_cache_in_conversation() -> None:
+    """Test cache hits don't change the conversation state and queries in a conversation bypass the cache."""
+    cache = ResponseCache()
+    credentials = google.oauth2.credentials.Credentials(token=None)
+    stub = CountingStub()
+    with TextAssistant(credentials, cache=cache) as assistant:
+        assistant.assistant = stub  # type: ignore[assignment]
+        assert assistant.assist("What's  the weather") == ("1", None, b"")
+        assert assistant.conversation_state == b"state"
+        # Continuing the conversation bypasses the cache.
+        assert assistant.assist("what's the weather") == ("2", None, b"")
+    with TextAssistant(credentials, cache=cache) as assistant:
+        assistant.assistant = stub  # type: ignore[assignment]
+        assert assistant.assist("what's the weather") == ("1", None, b"")
+        assert assistant.conversation_state is None
+        assert assistant.is_new_conversation
+    assert stub.calls == 2
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_counters_thread_safe() -> None:
+    """Test concurrent lookups are all counted."""
+    cache = ResponseCache()
+    cache.set("a", ("a", None, b""))
+
+    def lookup(key: str) -> None:
+        for _ in range(2000):
+            cache.get(key)
+
+    with futures.ThreadPoolExecutor(8) as executor:
+        list(executor.map(lookup, ["a", "b"] * 4))
+    assert (cache.hits, cache.misses) == (8000, 8000)
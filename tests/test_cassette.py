@@ -0,0 +1,148 @@
+"""Tests for recording and replaying calls."""
+
+from collections.abc import Callable
+import os
+from pathlib import Path
+import time
+
+import google.oauth2.credentials
+import grpc
+import pytest
+
+from gassist_text import TextAssistant
+from gassist_text.cassette import (
+    CALL,
+    REQUEST,
+    RESPONSE,
+    STATUS,
+    Cassette,
+    RecordingChannel,
+    ReplayChannel,
+    _CassetteWriter,
+    index_path,
+)
+from gassist_text.fake_server import FakeEmbeddedAssistant
+from gassist_text.textinput import ASSIST_METHOD
+from google.assistant.embedded.v1alpha2 import embedded_assistant_pb2
+
+CREDENTIALS = google.oauth2.credentials.Credentials(token=None)
+
+
+def _record(
+    path: str, address: str, index: bool = True
+) -> list[tuple[str, bytes | None, bytes]]:
+    with (
+        grpc.insecure_channel(address) as channel,
+        RecordingChannel(channel, path, index) as recording,
+        TextAssistant(
+            CREDENTIALS, display=True, audio_out=True, channel=recording
+        ) as assistant,
+    ):
+        responses = [assistant.assist(query) for query in ("one", "two", "three")]
+    return responses
+
+
+@pytest.mark.parametrize("index", [True, False])
+def test_record_and_replay(
+    tmp_path: Path, index: bool, fake_server: Callable[..., str]
+) -> None:
+    """Test replayed calls return the recorded responses and conversation state."""
+    path = str(tmp_path / "calls.cassette")
+    servicer = FakeEmbeddedAssistant(chunk_count=4, audio_size=4000, html_size=300)
+    recorded = _record(path, fake_server(servicer), index)
+    assert os.path.exists(index_path(path)) == index
+
+    with Cassette(path) as cassette:
+        assert len(cassette) == 3
+        records = list(cassette.records(1))
+        requests = [
+            embedded_assistant_pb2.AssistRequest.FromString(payload)
+            for kind, _, payload in records
+            if kind == REQUEST
+        ]
+        assert [request.config.text_query for request in requests] == ["two"]
+        assert sum(kind == RESPONSE for kind, _, _ in records) == 6
+
+    with (
+        ReplayChannel(path) as replay,
+        TextAssistant(
+            CREDENTIALS, display=True, audio_out=True, channel=replay
+        ) as assistant,
+    ):
+        assistant.warmup(timeout=1)
+        assert [assistant.assist(query) for query in ("a", "b", "c")] == recorded
+        assert assistant.conversation_state == b"..."
+        with pytest.raises(grpc.RpcError) as exc_info:
+            assistant.assist("d")
+        assert exc_info.value.code() == grpc.StatusCode.OUT_OF_RANGE
+
+
+def test_replay_errors_and_timing(
+    tmp_path: Path, fake_server: Callable[..., str]
+) -> None:
+    """Test recorded errors are raised and realtime replay keeps the timing."""
+    path = str(tmp_path / "calls.cassette")
+    servicer = FakeEmbeddedAssistant(latency=0.1)
+    address = fake_server(servicer)
+    with (
+        grpc.insecure_channel(address) as channel,
+        RecordingChannel(channel, path) as recording,
+    ):
+        assistant = TextAssistant(CREDENTIALS, channel=recording)
+        assistant.assist("hi")
+        servicer.error = grpc.StatusCode.UNAVAILABLE
+        with pytest.raises(grpc.RpcError):
+            assistant.assist("hi")
+
+    with ReplayChannel(path, loop=True) as replay:
+        assistant = TextAssistant(CREDENTIALS, channel=replay)
+        start = time.monotonic()
+        assert assistant.assist("hi")[0] == "You said: hi"
+        assert time.monotonic() - start < 0.05
+        with pytest.raises(grpc.RpcError) as exc_info:
+            assistant.assist("hi")
+        assert exc_info.value.code() == grpc.StatusCode.UNAVAILABLE
+        assert exc_info.value.details() == "Injected error"
+
+    with ReplayChannel(path, realtime=True) as replay:
+        assistant = TextAssistant(CREDENTIALS, channel=replay)
+        start = time.monotonic()
+        assert assistant.assist("hi")[0] == "You said: hi"
+        assert time.monotonic() - start >= 0.1
+
+
+def test_stale_index(tmp_path: Path, fake_server: Callable[..., str]) -> None:
+    """Test an index that doesn't match the cassette is removed or ignored."""
+    path = str(tmp_path / "calls.cassette")
+    _record(path, fake_server(FakeEmbeddedAssistant(audio_size=4000)))
+    with open(index_path(path), "rb") as f:
+        stale_index = f.read()
+    recorded = _record(path, fake_server(FakeEmbeddedAssistant(audio_size=100)), False)
+    assert not os.path.exists(index_path(path))
+
+    with open(index_path(path), "wb") as f:
+        f.write(stale_index)
+    with (
+        ReplayChannel(path) as replay,
+        TextAssistant(
+            CREDENTIALS, display=True, audio_out=True, channel=replay
+        ) as assistant,
+    ):
+        assert len(replay.cassette) == 3
+        assert [assistant.assist(query) for query in ("a", "b", "c")] == recorded
+
+
+def test_corrupt_records(tmp_path: Path) -> None:
+    """Test undecodable records are replayed as DATA_LOSS errors."""
+    path = str(tmp_path / "calls.cassette")
+    writer = _CassetteWriter(path, index=True)
+    writer.write_call([(CALL, 0, ASSIST_METHOD.encode()), (STATUS, 0, b"\0\0")])
+    writer.write_call([(CALL, 0, ASSIST_METHOD.encode()), (STATUS, 0, b"\0\0\0\0\xff")])
+    writer.write_call([(CALL, 0, b"\xff"), (STATUS, 0, b"\0\0\0\0")])
+    writer.close()
+    with ReplayChannel(path) as replay:
+        assistant = TextAssistant(CREDENTIALS, channel=replay)
+        for _ in range(3):
+            with pytest.raises(grpc.RpcError) as exc_info:
+                assistant.assist("hi")
+            assert exc_info.value.code() == grpc.StatusCode.DATA_LOSS
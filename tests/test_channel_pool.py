@@ -0,0 +1,100 @@
+"""Tests for ChannelPool."""
+
+from typing import Any
+
+import google.oauth2.credentials
+
+from gassist_text import ChannelPool, TextAssistant
+from gassist_text.channel_pool import channel_options
+
+
+class FakeChannel:
+    """Channel that records whether it was closed."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.closed = False
+
+    def stream_stream(self, *args: Any, **kwargs: Any) -> None:
+        """Return no multicallable."""
+
+    def close(self) -> None:
+        """Close."""
+        self.closed = True
+
+
+def fake_factory(credentials: Any, api_endpoint: str) -> Any:
+    """Create a FakeChannel."""
+    return FakeChannel()
+
+
+def test_channel_pool_shares_and_evicts() -> None:
+    """Test channels are shared per (credentials, endpoint) and closed when idle."""
+    pool = ChannelPool(idle_timeout=0, factory=fake_factory)
+    credentials = google.oauth2.credentials.Credentials(token=None)
+    other_credentials = google.oauth2.credentials.Credentials(token=None)
+    channel1 = pool.acquire(credentials, "endpoint")
+    channel2 = pool.acquire(credentials, "endpoint")
+    channel3 = pool.acquire(other_credentials, "endpoint")
+    assert channel1 is channel2
+    assert channel1 is not channel3
+    assert len(pool) == 2
+    pool.release(channel1)
+    assert not channel1.closed
+    pool.release(channel2)
+    assert channel1.closed
+    assert len(pool) == 1
+    pool.close()
+    assert channel3.closed
+    assert len(pool) == 0
+
+
+def test_channel_pool_keeps_idle_channel() -> None:
+    """Test a released channel is reused before idle_timeout."""
+    pool = ChannelPool(idle_timeout=60, factory=fake_factory)
+    credentials = google.oauth2.credentials.Credentials(token=None)
+    channel = pool.acquire(credentials, "endpoint")
+    pool.release(channel)
+    assert pool.evict_idle() == 0
+    assert pool.acquire(credentials, "endpoint") is channel
+
+
+def test_text_assistant_releases_channel() -> None:
+    """Test TextAssistant releases its channel on exit."""
+    pool = ChannelPool(idle_timeout=0, factory=fake_factory)
+    credentials = google.oauth2.credentials.Credentials(token=None)
+    with TextAssistant(credentials, channel_pool=pool):
+        with TextAssistant(credentials, channel_pool=pool):
+            assert len(pool) == 1
+        assert len(pool) == 1
+    assert len(pool) == 0
+
+
+def test_release_after_close() -> None:
+    """Test channels released after the pool is closed are ignored."""
+    pool = ChannelPool(factory=fake_factory)
+    credentials = google.oauth2.credentials.Credentials(token=None)
+    assistant = TextAssistant(credentials, channel_pool=pool)
+    channel = pool.acquire(credentials, "endpoint")
+    pool.close()
+    assert channel.closed
+    pool.release(channel)
+    assistant.close()
+    assistant.close()
+
+
+def test_channel_options() -> None:
+    """Test channel_options only sets the requested arguments."""
+    assert channel_options() == []
+    options = dict(
+        channel_options(
+            keepalive_time=300, keepalive_timeout=10, max_send_message_length=1
+        )
+    )
+    assert options == {
+        "grpc.keepalive_time_ms": 300000,
+        "grpc.keepalive_timeout_ms": 10000,
+        "grpc.keepalive_permit_without_calls": 1,
+        "grpc.http2.max_pings_without_data": 0,
+        "grpc.max_send_message_length": 1,
+    }
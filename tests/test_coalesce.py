@@ -0,0 +1,110 @@
+"""Tests for the coalescing of identical concurrent queries."""
+
+import asyncio
+from collections.abc import Callable
+from concurrent import futures
+import threading
+
+import google.oauth2.credentials
+import grpc
+import pytest
+
+from gassist_text import AsyncTextAssistant, Coalescer, TextAssistant
+from gassist_text.fake_server import FakeEmbeddedAssistant
+
+CREDENTIALS = google.oauth2.credentials.Credentials(token=None)
+
+
+def test_call() -> None:
+    """Test concurrent calls with the same key share the result or error."""
+    coalescer = Coalescer()
+    release = threading.Event()
+    calls = []
+
+    def fn() -> int:
+        calls.append(1)
+        release.wait()
+        return len(calls)
+
+    with futures.ThreadPoolExecutor(4) as executor:
+        results = [executor.submit(coalescer.call, "key", fn) for _ in range(4)]
+        while coalescer.coalesced < 3:
+            threading.Event().wait(0.001)
+        release.set()
+        assert [result.result() for result in results] == [1, 1, 1, 1]
+    assert coalescer.coalesced == 3
+    assert len(coalescer) == 0
+    assert coalescer.call("key", fn) == 2
+
+    def fail() -> int:
+        raise ValueError("failed")
+
+    with pytest.raises(ValueError, match="failed"):
+        coalescer.call("key", fail)
+    assert len(coalescer) == 0
+
+
+def test_assist(fake_server: Callable[..., str]) -> None:
+    """Test identical queries of many assistants make a single call."""
+    servicer = FakeEmbeddedAssistant(latency=0.2)
+    address = fake_server(servicer)
+    coalescer = Coalescer()
+    barrier = threading.Barrier(8)
+    with grpc.insecure_channel(address) as channel:
+
+        def assist(text_query: str) -> tuple[str, bytes | None, bytes]:
+            assistant = TextAssistant(CREDENTIALS, channel=channel, coalescer=coalescer)
+            assistant.conversation_state = b"earlier"
+            barrier.wait()
+            return assistant.assist(text_query, stateless=True)
+
+        with futures.ThreadPoolExecutor(8) as executor:
+            responses = list(executor.map(assist, ["Lights on"] * 7 + ["other"]))
+        assert responses[0] == ("You said: Lights on", None, b"")
+        assert responses[1:7] == responses[:6]
+        assert len(servicer.requests) == 2
+        assert coalescer.coalesced == 6
+        # Stateless queries are sent as new conversations.
+        assert all(
+            not request.config.dialog_state_in.conversation_state
+            and request.config.dialog_state_in.is_new_conversation
+            for request in servicer.requests
+        )
+
+        # Queries continuing a conversation aren't coalesced by default.
+        assistant = TextAssistant(CREDENTIALS, channel=channel, coalescer=coalescer)
+        assistant.conversation_state = b"."
+        assistant.is_new_conversation = False
+        assert assistant._coalesce_key("Lights on", assistant) is None
+        assistant.conversation_state = None
+        assert assistant._coalesce_key("Lights on", assistant) is not None
+
+        # With coalesce_in_conversation only those continuing the same one are.
+        assistant.coalescer = Coalescer(coalesce_in_conversation=True)
+        keys = set()
+        for conversation_state in (b"a", b"a", b"b"):
+            assistant.conversation_state = conversation_state
+            keys.add(assistant._coalesce_key("Lights on", assistant))
+        assert len(keys) == 2
+
+
+def test_async_assist(fake_server: Callable[..., str]) -> None:
+    """Test identical queries on an event loop make a single call."""
+    servicer = FakeEmbeddedAssistant(latency=0.2)
+    address = fake_server(servicer)
+    coalescer = Coalescer()
+
+    async def run() -> None:
+        async with (
+            grpc.aio.insecure_channel(address) as channel,
+            AsyncTextAssistant(
+                CREDENTIALS, channel=channel, coalescer=coalescer
+            ) as assistant,
+        ):
+            queries = [assistant.assist("hi") for _ in range(5)]
+            responses = await asyncio.gather(*queries)
+        assert responses == [("You said: hi", None, b"")] * 5
+
+    asyncio.run(run())
+    assert len(servicer.requests) == 1
+    assert coalescer.coalesced == 4
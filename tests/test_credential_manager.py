@@ -0,0 +1,143 @@
+"""Tests for CredentialManager against a local fake token endpoint."""
+
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from typing import Any
+
+import google.oauth2.credentials
+import pytest
+
+from gassist_text import ChannelPool, CredentialManager, TextAssistant
+
+
+class TokenEndpoint(ThreadingHTTPServer):
+    """Fake OAuth2 token endpoint."""
+
+    expires_in = 3600
+    requests = 0
+
+
+class TokenHandler(BaseHTTPRequestHandler):
+    """Return a new access token for every request."""
+
+    server: TokenEndpoint
+
+    def do_POST(self) -> None:  # noqa: N802
+        """Handle a refresh request."""
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests += 1
+        # Widen the window for concurrent refreshes.
+        time.sleep(0.1)
+        body = json.dumps(
+            {
+                "access_token": f"token-{self.server.requests}",
+                "expires_in": self.server.expires_in,
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Don't log requests."""
+
+
+@pytest.fixture
+def endpoint() -> Iterator[TokenEndpoint]:
+    """Start a fake token endpoint."""
+    server = TokenEndpoint(("127.0.0.1", 0), TokenHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _credentials(endpoint: TokenEndpoint) -> google.oauth2.credentials.Credentials:
+    return google.oauth2.credentials.Credentials(
+        token=None,
+        refresh_token="refresh-token",
+        token_uri=f"http://127.0.0.1:{endpoint.server_address[1]}/token",
+        client_id="client-id",
+        client_secret="client-secret",
+    )
+
+
+def test_concurrent_refreshes_are_coalesced(endpoint: TokenEndpoint) -> None:
+    """Test many threads needing a token trigger a single refresh."""
+    credentials = _credentials(endpoint)
+    with (
+        CredentialManager() as manager,
+        ThreadPoolExecutor(10) as executor,
+    ):
+        list(executor.map(lambda _: manager.ensure_valid(credentials), range(10)))
+        # The credentials weren't registered for background refresh.
+        assert not manager._entries
+        assert not manager._unregistered
+    assert endpoint.requests == 1
+    assert credentials.token == "token-1"
+
+
+def test_ensure_valid_after_close(endpoint: TokenEndpoint) -> None:
+    """Test unregistered credentials are refreshed also once the manager is closed."""
+    credentials = _credentials(endpoint)
+    manager = CredentialManager()
+    manager.close()
+    manager.ensure_valid(credentials)
+    assert credentials.token == "token-1"
+
+
+def test_background_refresh(endpoint: TokenEndpoint) -> None:
+    """Test tokens are refreshed before they expire."""
+    credentials = _credentials(endpoint)
+    # Tokens are due for refresh 0.3 seconds after they are issued.
+    with CredentialManager(
+        refresh_margin=endpoint.expires_in - 0.3, retry_interval=0
+    ) as manager:
+        manager.register(credentials)
+        time.sleep(1)
+        assert endpoint.requests >= 2
+        assert credentials.valid
+
+
+def test_metadata_plugin(endpoint: TokenEndpoint) -> None:
+    """Test the auth plugin returns the refreshed token."""
+    credentials = _credentials(endpoint)
+    with CredentialManager() as manager:
+        plugin = manager.metadata_plugin(credentials)
+        result: list[Any] = []
+        context = type("Context", (), {"method_name": "Assist", "service_url": ""})
+        plugin(context, lambda metadata, error: result.extend([metadata, error]))
+    assert ("authorization", "Bearer token-1") in result[0]
+    assert result[1] is None
+    assert endpoint.requests == 1
+
+
+def test_channels_unregister_credentials(endpoint: TokenEndpoint) -> None:
+    """Test credentials stop being refreshed once their channels are closed."""
+    credentials = _credentials(endpoint)
+    with CredentialManager() as manager:
+        manager.register(credentials)
+        manager.register(credentials)
+        manager.unregister(credentials)
+        assert id(credentials) in manager._entries
+        manager.unregister(credentials)
+        assert not manager._entries
+
+        pool = ChannelPool(idle_timeout=0, credential_manager=manager)
+        with TextAssistant(credentials, channel_pool=pool):
+            with TextAssistant(credentials, channel_pool=pool):
+                assert id(credentials) in manager._entries
+            assert id(credentials) in manager._entries
+        assert not manager._entries
+        assistant = TextAssistant(credentials, credential_manager=manager)
+        assert id(credentials) in manager._entries
+        assistant.close()
+        assistant.close()
+        assert not manager._entries
@@ -0,0 +1,100 @@
+"""Tests for TextAssistant against the in-process fake server."""
+
+import asyncio
+from collections.abc import Callable
+
+import google.oauth2.credentials
+import grpc
+import pytest
+
+from gassist_text import AsyncTextAssistant, TextAssistant
+from gassist_text.fake_server import FakeEmbeddedAssistant
+
+CREDENTIALS = google.oauth2.credentials.Credentials(token=None)
+
+
+@pytest.fixture
+def fake(fake_server: Callable[..., str]) -> tuple[FakeEmbeddedAssistant, str]:
+    """Start a fake server."""
+    servicer = FakeEmbeddedAssistant(chunk_count=3, audio_size=1000, html_size=500)
+    return servicer, fake_server(servicer)
+
+
+def test_assist(fake: tuple[FakeEmbeddedAssistant, str]) -> None:
+    """Test a conversation over a real gRPC channel."""
+    servicer, address = fake
+    with (
+        grpc.insecure_channel(address) as channel,
+        TextAssistant(
+            CREDENTIALS, display=True, audio_out=True, channel=channel
+        ) as assistant,
+    ):
+        text, html, audio = assistant.assist("tell me a joke")
+        assert text == "You said: tell me a joke"
+        assert html is not None
+        assert b"assistant-card-content" in html
+        assert audio == b"\xff" * 1000
+        assert assistant.conversation_state == b"."
+        assistant.assist("another one")
+        assert assistant.conversation_state == b".."
+    assert servicer.requests[0].config.dialog_state_in.is_new_conversation
+    assert not servicer.requests[1].config.dialog_state_in.is_new_conversation
+
+
+def test_assist_text_only(fake: tuple[FakeEmbeddedAssistant, str]) -> None:
+    """Test audio and HTML are dropped when not enabled."""
+    _, address = fake
+    with (
+        grpc.insecure_channel(address) as channel,
+        TextAssistant(CREDENTIALS, channel=channel) as assistant,
+    ):
+        assert assistant.assist("hi") == ("You said: hi", None, b"")
+
+
+def test_max_requests(fake_server: Callable[..., str]) -> None:
+    """Test only the most recent requests are kept."""
+    servicer = FakeEmbeddedAssistant(max_requests=2)
+    address = fake_server(servicer)
+    with (
+        grpc.insecure_channel(address) as channel,
+        TextAssistant(CREDENTIALS, channel=channel) as assistant,
+    ):
+        for query in "abc":
+            assistant.assist(query)
+    assert [request.config.text_query for request in servicer.requests] == ["b", "c"]
+
+
+def test_assist_error(fake_server: Callable[..., str]) -> None:
+    """Test injected errors are raised."""
+    address = fake_server(FakeEmbeddedAssistant(error=grpc.StatusCode.UNAVAILABLE))
+    with (
+        grpc.insecure_channel(address) as channel,
+        TextAssistant(CREDENTIALS, channel=channel) as assistant,
+        pytest.raises(grpc.RpcError) as exc_info,
+    ):
+        assistant.assist("hi")
+    assert exc_info.value.code() == grpc.StatusCode.UNAVAILABLE
+
+
+def test_async_assist(fake: tuple[FakeEmbeddedAssistant, str]) -> None:
+    """Test concurrent async conversations."""
+    _, address = fake
+
+    async def run() -> list[tuple[str, bytes | None, bytes]]:
+        async with grpc.aio.insecure_channel(address) as channel:
+            assistants = [
+                AsyncTextAssistant(CREDENTIALS, audio_out=True, channel=channel)
+                for _ in range(10)
+            ]
+            return await asyncio.gather(
+                *(
+                    assistant.assist(f"query {i}")
+                    for i, assistant in enumerate(assistants)
+                )
+            )
+
+    results = asyncio.run(run())
+    assert [result[0] for result in results] == [
+        f"You said: query {i}" for i in range(10)
+    ]
+    assert all(result[2] == b"\xff" * 1000 for result in results)
@@ -0,0 +1,34 @@
+"""Tests for the screen_out HTML text extraction."""
+
+from gassist_text.html_text import CardTextExtractor, extract_card_text
+
+PAGE = (
+    "<!DOCTYPE html><html><head><title>Title</title><style>p { color: red; }</style>"
+    "<script>var a = '<div>';</script></head><body><!-- comment -->"
+    "<div id='assistant-card-content'> It's 20&deg;C &amp; sunny <br>"
+    "<p>in <b>Paris</b>.</p><template><p>hidden</p></template><div>Nested</div>"
+    "Tail</div><div>After the card</div><script>never parsed</script></body></html>"
+)
+
+
+def test_extract_card_text() -> None:
+    """Test the card text matches BeautifulSoup's get_text with strip=True."""
+    assert extract_card_text(PAGE) == "It's 20°C & sunny\nin\nParis\n.\nNested\nTail"
+    assert (
+        extract_card_text(PAGE.encode())
+        == "It's 20°C & sunny\nin\nParis\n.\nNested\nTail"
+    )
+    assert extract_card_text("<html><body>No <b>card</b></body></html>") == "No\ncard"
+    assert extract_card_text("") == ""
+
+
+def test_card_text_extractor_chunks() -> None:
+    """Test feeding the page in small chunks, including split UTF-8 sequences."""
+    data = PAGE.encode()
+    extractor = CardTextExtractor()
+    end = data.index(b"</div><div>After")
+    for start in range(0, len(data), 3):
+        extractor.feed(data[start : start + 3])
+        assert extractor.done == (start + 3 >= end + len("</div>"))
+    extractor.close()
+    assert extractor.text == "It's 20°C & sunny\nin\nParis\n.\nNested\nTail"
@@ -0,0 +1,32 @@
+"""Tests for the lazy exports of the package."""
+
+import subprocess
+import sys
+
+import pytest
+
+import gassist_text
+
+
+def test_import_is_lazy() -> None:
+    """Test importing the package and TextAssistant doesn't import grpc or google-auth."""
+    code = (
+        "import sys, gassist_text\n"
+        "assert 'gassist_text.textinput' not in sys.modules\n"
+        "from gassist_text import TextAssistant\n"
+        "heavy = ['grpc', 'google.auth', 'requests']\n"
+        "print([name for name in heavy if name in sys.modules])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_exports() -> None:
+    """Test every export resolves and unknown names raise AttributeError."""
+    for name in gassist_text.__all__:
+        assert getattr(gassist_text, name) is not None
+    assert set(gassist_text.__all__) <= set(dir(gassist_text))
+    with pytest.raises(AttributeError):
+        gassist_text.NotAnExport  # noqa: B018
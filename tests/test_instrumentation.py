@@ -0,0 +1,54 @@
+"""Tests for instrumentation."""
+
+from collections.abc import Callable
+
+import google.oauth2.credentials
+import grpc
+import pytest
+
+from gassist_text import HistogramCollector, TextAssistant
+from gassist_text.fake_server import FakeEmbeddedAssistant
+from gassist_text.instrumentation import Histogram
+
+CREDENTIALS = google.oauth2.credentials.Credentials(token=None)
+
+
+def test_histogram_percentiles() -> None:
+    """Test percentiles are within the bucket error."""
+    histogram = Histogram()
+    for i in range(1, 1001):
+        histogram.record(i / 1000)
+    assert histogram.count == 1000
+    assert histogram.percentile(50) == pytest.approx(0.5, rel=0.1)
+    assert histogram.percentile(99) == pytest.approx(0.99, rel=0.1)
+
+
+def test_histogram_collector(fake_server: Callable[..., str]) -> None:
+    """Test timings, bytes and statuses are collected per call."""
+    servicer = FakeEmbeddedAssistant(chunk_count=2, audio_size=1000)
+    address = fake_server(servicer)
+    collector = HistogramCollector()
+    with (
+        grpc.insecure_channel(address) as channel,
+        TextAssistant(
+            CREDENTIALS,
+            audio_out=True,
+            channel=channel,
+            instrumentation=collector,
+        ) as assistant,
+    ):
+        for _ in range(5):
+            assistant.assist("hi")
+        servicer.error = grpc.StatusCode.UNAVAILABLE
+        with pytest.raises(grpc.RpcError):
+            assistant.assist("hi")
+    assert collector.statuses == {
+        grpc.StatusCode.OK: 5,
+        grpc.StatusCode.UNAVAILABLE: 1,
+    }
+    assert collector.bytes_received["audio_out"] == 5000
+    assert collector.bytes_received["conversation_state"] == 1 + 2 + 3 + 4 + 5
+    percentiles = collector.percentiles()
+    assert set(percentiles) == {"call", "first_response", "first_audio"}
+    assert collector.histograms["call"].count == 6
+    assert collector.histograms["first_audio"].count == 5
@@ -0,0 +1,174 @@
+"""Tests for CallPolicy."""
+
+import asyncio
+from collections.abc import Callable, Iterator
+import threading
+import time
+
+import google.oauth2.credentials
+import grpc
+import pytest
+
+from gassist_text import AsyncTextAssistant, CallPolicy, TextAssistant
+from gassist_text.fake_server import FakeEmbeddedAssistant
+from gassist_text.policy import AttemptHandle
+from google.assistant.embedded.v1alpha2 import embedded_assistant_pb2
+
+CREDENTIALS = google.oauth2.credentials.Credentials(token=None)
+
+
+class FlakyFake(FakeEmbeddedAssistant):
+    """Fails the first calls and stalls the first call that doesn't fail."""
+
+    def __init__(
+        self, failures: int = 0, code: grpc.StatusCode = grpc.StatusCode.UNAVAILABLE
+    ) -> None:
+        """Initialize."""
+        super().__init__()
+        self.failures = failures
+        self.code = code
+        self.stall_first = 0.0
+        self.read_request = True
+        self.calls = 0
+
+    def Assist(  # noqa: N802
+        self,
+        request_iterator: Iterator[embedded_assistant_pb2.AssistRequest],
+        context: grpc.ServicerContext,
+    ) -> Iterator[embedded_assistant_pb2.AssistResponse]:
+        """Fail or stall, then respond."""
+        self.calls += 1
+        if self.calls <= self.failures:
+            # Like the API, read the request first unless testing otherwise.
+            # Aborting before it was sent can fail the write of an aio client
+            # with INTERNAL instead.
+            if self.read_request:
+                next(request_iterator)
+            context.abort(self.code, "Injected error")
+        if self.calls == self.failures + 1 and self.stall_first:
+            time.sleep(self.stall_first)
+        return super().Assist(request_iterator, context)
+
+
+@pytest.fixture
+def flaky(fake_server: Callable[..., str]) -> tuple[FlakyFake, str]:
+    """Start a flaky fake server."""
+    servicer = FlakyFake()
+    return servicer, fake_server(servicer)
+
+
+def test_retry(flaky: tuple[FlakyFake, str]) -> None:
+    """Test retryable errors are retried."""
+    servicer, address = flaky
+    servicer.failures = 2
+    policy = CallPolicy(max_attempts=3, initial_backoff=0.01)
+    with (
+        grpc.insecure_channel(address) as channel,
+        TextAssistant(CREDENTIALS, channel=channel, call_policy=policy) as assistant,
+    ):
+        assert assistant.assist("hi")[0] == "You said: hi"
+        assert assistant.conversation_state == b"."
+    assert policy.retries == 2
+
+
+def test_no_retry(flaky: tuple[FlakyFake, str]) -> None:
+    """Test non-retryable errors are raised without updating the conversation."""
+    servicer, address = flaky
+    servicer.failures = 1
+    servicer.code = grpc.StatusCode.INVALID_ARGUMENT
+    policy = CallPolicy(initial_backoff=0.01)
+    with (
+        grpc.insecure_channel(address) as channel,
+        TextAssistant(CREDENTIALS, channel=channel, call_policy=policy) as assistant,
+        pytest.raises(grpc.RpcError),
+    ):
+        assistant.assist("hi")
+    assert policy.retries == 0
+    assert assistant.conversation_state is None
+    assert assistant.is_new_conversation
+
+
+def test_hedge(flaky: tuple[FlakyFake, str]) -> None:
+    """Test a stalled attempt is hedged and the conversation isn't forked."""
+    servicer, address = flaky
+    servicer.stall_first = 1.0
+    policy = CallPolicy(hedge_delay=0.1)
+    with (
+        grpc.insecure_channel(address) as channel,
+        TextAssistant(CREDENTIALS, channel=channel, call_policy=policy) as assistant,
+    ):
+        start = time.monotonic()
+        assistant.assist("hi")
+        assert time.monotonic() - start < 0.9
+        assert assistant.conversation_state == b"."
+        assistant.assist("again")
+        assert assistant.conversation_state == b".."
+    assert policy.hedges == 1
+
+
+def test_hedge_threads() -> None:
+    """Test the first attempt runs in the caller's thread and the losing one is cancelled."""
+    policy = CallPolicy(hedge_delay=0.05)
+    threads = []
+    handles = []
+
+    def attempt(timeout: float, handle: AttemptHandle) -> str:
+        threads.append(threading.current_thread())
+        handles.append(handle)
+        if len(threads) == 1:
+            time.sleep(0.3)
+            # Like a cancelled gRPC call.
+            if handle.cancelled:
+                raise RuntimeError("cancelled")
+            return "first"
+        return "hedge"
+
+    assert policy.call(attempt, 1) == "hedge"
+    assert threads[0] is threading.current_thread()
+    assert threads[1] is not threading.current_thread()
+    assert handles[0].cancelled
+
+
+def test_async_retry_and_hedge(flaky: tuple[FlakyFake, str]) -> None:
+    """Test the asyncio version."""
+    servicer, address = flaky
+    servicer.failures = 1
+    servicer.stall_first = 1.0
+    policy = CallPolicy(hedge_delay=0.1, initial_backoff=0.01)
+
+    async def run() -> None:
+        async with grpc.aio.insecure_channel(address) as channel:
+            assistant = AsyncTextAssistant(
+                CREDENTIALS, channel=channel, call_policy=policy
+            )
+            start = time.monotonic()
+            assert (await assistant.assist("hi"))[0] == "You said: hi"
+            assert time.monotonic() - start < 0.9
+            assert assistant.conversation_state == b"."
+
+    asyncio.run(run())
+    assert policy.retries == 1
+    assert policy.hedges == 1
+
+
+def test_async_abort_before_request_is_read(flaky: tuple[FlakyFake, str]) -> None:
+    """Test an error before the request is read is retried if INTERNAL is retryable on aio."""
+    servicer, address = flaky
+    servicer.read_request = False
+    servicer.failures = 1
+    policy = CallPolicy(
+        initial_backoff=0.01,
+        retryable_codes={grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.INTERNAL},
+    )
+
+    async def run() -> None:
+        async with grpc.aio.insecure_channel(address) as channel:
+            assistant = AsyncTextAssistant(
+                CREDENTIALS, channel=channel, call_policy=policy
+            )
+            # Whether the client gets UNAVAILABLE or INTERNAL, it's retried.
+            assert (await assistant.assist("hi"))[0] == "You said: hi"
+            assert assistant.conversation_state == b"."
+
+    asyncio.run(run())
+    assert policy.retries == 1
@@ -0,0 +1,165 @@
+"""Tests for RateLimiter."""
+
+import asyncio
+from collections.abc import Callable
+import threading
+import time
+
+import google.oauth2.credentials
+import grpc
+import pytest
+
+from gassist_text import RateLimiter, RateLimitExceeded, TextAssistant
+
+
+def test_qps() -> None:
+    """Test calls are spread according to qps."""
+    limiter = RateLimiter(qps=20)
+    start = time.monotonic()
+    for _ in range(5):
+        with limiter.acquire():
+            pass
+    assert time.monotonic() - start >= 0.19
+    assert limiter.admitted == 5
+    assert limiter.max_queue_depth == 1
+
+
+def test_max_in_flight_and_queue() -> None:
+    """Test calls wait for a free slot and are rejected when the queue is full."""
+    limiter = RateLimiter(max_in_flight=1, max_queue=1)
+    holding = threading.Event()
+    release = threading.Event()
+
+    def hold() -> None:
+        with limiter.acquire():
+            holding.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    holding.wait()
+    with pytest.raises(RateLimitExceeded), limiter.acquire(timeout=0.05):
+        pass
+    admitted = threading.Event()
+
+    def wait() -> None:
+        with limiter.acquire():
+            admitted.set()
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    while limiter.queue_depth == 0:
+        time.sleep(0.001)
+    with pytest.raises(RateLimitExceeded), limiter.acquire():
+        pass
+    assert not admitted.is_set()
+    release.set()
+    holder.join()
+    waiter.join()
+    assert admitted.is_set()
+    assert limiter.in_flight == 0
+    assert limiter.rejected == 2
+
+
+def test_async() -> None:
+    """Test asyncio tasks respect max_in_flight."""
+    limiter = RateLimiter(max_in_flight=2)
+    concurrency = 0
+    max_concurrency = 0
+
+    async def call() -> None:
+        nonlocal concurrency, max_concurrency
+        async with limiter.acquire_async():
+            concurrency += 1
+            max_concurrency = max(max_concurrency, concurrency)
+            await asyncio.sleep(0.02)
+            concurrency -= 1
+
+    async def run() -> None:
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(run())
+    assert max_concurrency == 2
+    assert limiter.admitted == 6
+    assert limiter.max_queue_depth == 4
+    assert limiter.in_flight == 0
+
+
+def test_timed_out_waiter_passes_wakeup() -> None:
+    """Test a waiter that times out doesn't leave the next waiter blocked."""
+    limiter = RateLimiter(qps=1, burst=1, max_in_flight=1)
+    release = threading.Event()
+
+    def hold() -> None:
+        with limiter.acquire():
+            release.wait()
+
+    def wait_short() -> None:
+        with pytest.raises(RateLimitExceeded), limiter.acquire(timeout=0.3):
+            pass
+
+    admitted = threading.Event()
+
+    def wait() -> None:
+        with limiter.acquire():
+            admitted.set()
+
+    threads = []
+    for target, started in ((hold, 1), (wait_short, 2), (wait, 3)):
+        threads.append(threading.Thread(target=target, daemon=True))
+        threads[-1].start()
+        while limiter.in_flight + limiter.queue_depth < started:
+            time.sleep(0.001)
+    # The release wakes the short waiter, which then times out waiting for qps.
+    release.set()
+    assert admitted.wait(3)
+    for thread in threads:
+        thread.join()
+    assert limiter.in_flight == 0
+
+
+def test_async_waiters() -> None:
+    """Test a release wakes one task and cancelled tasks leave the queue."""
+    limiter = RateLimiter(max_in_flight=1)
+
+    async def run() -> None:
+        async with limiter.acquire_async():
+            # Keep the contexts so entered ones aren't exited by garbage collection.
+            contexts = [limiter.acquire_async() for _ in range(3)]
+            tasks = [asyncio.create_task(context.__aenter__()) for context in contexts]
+            await asyncio.sleep(0.01)
+            assert len(limiter._waiters) == 3
+            tasks[0].cancel()
+            await asyncio.sleep(0.01)
+            assert len(limiter._waiters) == 2
+            assert limiter.queue_depth == 2
+        # The release wakes a single task.
+        await asyncio.sleep(0.01)
+        assert [task.done() for task in tasks[1:]] == [True, False]
+        assert len(limiter._waiters) == 1
+        tasks[2].cancel()
+        await asyncio.sleep(0.01)
+        assert not limiter._waiters
+        assert limiter.queue_depth == 0
+        await contexts[1].__aexit__(None, None, None)
+        assert limiter.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_text_assistant(fake_server: Callable[..., str]) -> None:
+    """Test TextAssistant calls go through the limiter."""
+    address = fake_server()
+    limiter = RateLimiter(max_in_flight=1)
+    with (
+        grpc.insecure_channel(address) as channel,
+        TextAssistant(
+            google.oauth2.credentials.Credentials(token=None),
+            channel=channel,
+            rate_limiter=limiter,
+        ) as assistant,
+    ):
+        assistant.assist("hi")
+        assistant.assist("hi")
+    assert limiter.admitted == 2
+    assert limiter.in_flight == 0
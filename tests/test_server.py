@@ -0,0 +1,163 @@
+"""Tests for the gateway daemon and its client."""
+
+from collections.abc import Callable, Iterator
+from concurrent import futures
+import http.client
+from http.server import BaseHTTPRequestHandler
+import os
+from pathlib import Path
+import socketserver
+import threading
+import time
+
+import google.oauth2.credentials
+import grpc
+import pytest
+
+from gassist_text import SessionManager, TextAssistant
+from gassist_text.fake_server import FakeEmbeddedAssistant
+from gassist_text.server import GatewayClient, GatewayError, GatewayServer, main
+
+CREDENTIALS = google.oauth2.credentials.Credentials(token=None)
+
+
+@pytest.fixture
+def gateway(
+    tmp_path: Path, fake_server: Callable[..., str]
+) -> Iterator[tuple[FakeEmbeddedAssistant, str]]:
+    """Start a gateway in front of a fake server."""
+    servicer = FakeEmbeddedAssistant(audio_size=100, html_size=200)
+    address = fake_server(servicer)
+    socket_path = str(tmp_path / "gateway.sock")
+    with (
+        grpc.insecure_channel(address) as channel,
+        TextAssistant(
+            CREDENTIALS, display=True, audio_out=True, channel=channel
+        ) as assistant,
+        GatewayServer(socket_path, SessionManager(assistant)) as server,
+    ):
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        yield servicer, socket_path
+        server.shutdown()
+        thread.join()
+    assert not os.path.exists(socket_path)
+
+
+def test_assist(gateway: tuple[FakeEmbeddedAssistant, str]) -> None:
+    """Test sessions of many concurrent clients are kept apart."""
+    servicer, socket_path = gateway
+    with GatewayClient(socket_path) as client:
+        text, html, audio = client.assist("hi", "a")
+        assert text == "You said: hi"
+        assert html is not None and b"assistant-card-content" in html
+        assert audio == b"\xff" * 100
+
+        def conversation(session_id: str) -> None:
+            for _ in range(3):
+                client.assist("hi", session_id)
+
+        with futures.ThreadPoolExecutor(8) as executor:
+            list(executor.map(conversation, [str(i) for i in range(8)]))
+        client.assist("hi", "a")
+        client.reset("a")
+        client.assist("hi", "a")
+    # Clients without a session id don't share a conversation.
+    for _ in range(2):
+        with GatewayClient(socket_path) as client:
+            client.assist("hi")
+    states = [
+        (
+            r.config.dialog_state_in.is_new_conversation,
+            r.config.dialog_state_in.conversation_state,
+        )
+        for r in servicer.requests
+        if r.config.text_query == "hi"
+    ]
+    assert states[0] == (True, b"")
+    assert states[-4] == (False, b".")
+    assert states[-3:] == [(True, b"")] * 3
+    assert sum(1 for state in states if state == (False, b"..")) == 8
+
+
+def test_errors(gateway: tuple[FakeEmbeddedAssistant, str]) -> None:
+    """Test invalid requests and API errors are reported to the client."""
+    servicer, socket_path = gateway
+    with GatewayClient(socket_path) as client:
+        with pytest.raises(GatewayError) as exc_info:
+            client._post("/assist", {"session_id": "a"})
+        assert exc_info.value.status == 400
+        with pytest.raises(GatewayError) as exc_info:
+            client._post("/assist", {"text_query": "hi"})
+        assert exc_info.value.status == 400
+        servicer.error = grpc.StatusCode.UNAVAILABLE
+        with pytest.raises(GatewayError) as exc_info:
+            client.assist("hi")
+        assert exc_info.value.status == 502
+        assert exc_info.value.code == "UNAVAILABLE"
+        servicer.error = None
+        assert client.assist("hi")[0] == "You said: hi"
+    with (
+        TextAssistant(CREDENTIALS) as assistant,
+        pytest.raises(OSError, match="already listening"),
+    ):
+        GatewayServer(socket_path, SessionManager(assistant))
+
+
+def test_stale_socket_must_be_a_socket(tmp_path: Path) -> None:
+    """Test a file that isn't a socket isn't replaced by the gateway's socket."""
+    socket_path = tmp_path / "gateway.sock"
+    socket_path.write_text("data")
+    with (
+        TextAssistant(CREDENTIALS) as assistant,
+        pytest.raises(OSError, match="isn't a socket"),
+    ):
+        GatewayServer(str(socket_path), SessionManager(assistant))
+    assert socket_path.read_text() == "data"
+
+
+class _ClosingHandler(BaseHTTPRequestHandler):
+    """Responds and closes the connection on /close, closes without responding on /drop."""
+
+    protocol_version = "HTTP/1.1"
+    paths: list[str]
+
+    def address_string(self) -> str:
+        return "local"
+
+    def do_POST(self) -> None:  # noqa: N802
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.paths.append(self.path)
+        self.close_connection = self.path != "/keep"
+        if self.path == "/drop":
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+
+def test_client_resends_only_unsent_requests(tmp_path: Path) -> None:
+    """Test requests are resent on a closed idle connection but not after being read."""
+    socket_path = str(tmp_path / "gateway.sock")
+    _ClosingHandler.paths = []
+    with socketserver.ThreadingUnixStreamServer(socket_path, _ClosingHandler) as server:
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            with GatewayClient(socket_path) as client:
+                assert client._post("/close", {}) == {}
+                time.sleep(0.1)
+                assert client._post("/keep", {}) == {}
+                with pytest.raises(http.client.RemoteDisconnected):
+                    client._post("/drop", {})
+        finally:
+            server.shutdown()
+            thread.join()
+    assert _ClosingHandler.paths == ["/close", "/keep", "/drop"]
+
+
+def test_main_requires_socket() -> None:
+    """Test the command line is parsed."""
+    with pytest.raises(SystemExit):
+        main(["--credentials", "credentials.json"])
@@ -0,0 +1,94 @@
+"""Tests for SessionManager."""
+
+import asyncio
+from collections.abc import Callable
+from concurrent import futures
+from pathlib import Path
+import time
+
+from gassist_text import (
+    AsyncSessionManager,
+    AsyncTextAssistant,
+    FileSessionStore,
+    SessionManager,
+    TextAssistant,
+)
+
+
+def test_sessions_are_independent(
+    echo_assistant: Callable[[], TextAssistant],
+) -> None:
+    """Test each session chains its own conversation state."""
+    manager = SessionManager(echo_assistant(), max_sessions=1)
+    assert manager.assist("a", "1")[0] == "1"
+    assert manager.assist("b", "x")[0] == "x"
+    assert len(manager) == 1
+    # Session "a" was evicted from memory without a store.
+    assert manager.assist("a", "2")[0] == "2"
+    assert manager.assist("a", "3")[0] == "23"
+    manager.reset("a")
+    assert manager.assist("a", "4")[0] == "4"
+
+
+def test_sessions_resume_from_store(
+    tmp_path: Path, echo_assistant: Callable[[], TextAssistant]
+) -> None:
+    """Test sessions are resumed by id from a FileSessionStore."""
+    manager = SessionManager(echo_assistant(), FileSessionStore(str(tmp_path)))
+    manager.assist("a", "1")
+    manager = SessionManager(echo_assistant(), FileSessionStore(str(tmp_path)))
+    assert manager.assist("a", "2")[0] == "12"
+
+
+def test_sessions_expire(
+    tmp_path: Path, echo_assistant: Callable[[], TextAssistant]
+) -> None:
+    """Test idle sessions start a new conversation."""
+    manager = SessionManager(
+        echo_assistant(), FileSessionStore(str(tmp_path)), idle_timeout=-1
+    )
+    manager.assist("a", "1")
+    assert manager.assist("a", "2")[0] == "2"
+    assert manager.evict_idle() == 1
+    assert len(manager) == 0
+    assert not list(tmp_path.iterdir())
+
+
+def test_sessions_run_concurrently(
+    echo_assistant: Callable[[float], TextAssistant],
+) -> None:
+    """Test queries of different sessions don't wait for each other."""
+    manager = SessionManager(echo_assistant(0.2))
+    start = time.monotonic()
+    with futures.ThreadPoolExecutor(8) as executor:
+        responses = list(
+            executor.map(manager.assist, [str(i) for i in range(8)], ["q"] * 8)
+        )
+    assert time.monotonic() - start < 0.35
+    assert [response[0] for response in responses] == ["q"] * 8
+    # Session locks are dropped once their queries are done.
+    assert not manager._session_locks
+
+
+def test_async_sessions(
+    tmp_path: Path, async_echo_assistant: Callable[[float], AsyncTextAssistant]
+) -> None:
+    """Test the async manager with a store and concurrent sessions."""
+
+    async def run() -> None:
+        manager = AsyncSessionManager(
+            async_echo_assistant(0.2), FileSessionStore(str(tmp_path))
+        )
+        start = time.monotonic()
+        responses = await asyncio.gather(
+            *(manager.assist(session_id, "1") for session_id in "abcd")
+        )
+        assert time.monotonic() - start < 0.35
+        assert [response[0] for response in responses] == ["1"] * 4
+        assert (await manager.assist("a", "2"))[0] == "12"
+        await manager.reset("a")
+        assert (await manager.assist("a", "3"))[0] == "3"
+        assert await manager.evict_idle() == 0
+        assert not manager._session_locks
+
+    asyncio.run(run())
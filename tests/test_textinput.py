@@ -1,10 +1,50 @@
 """Tests for TextAssistant."""
 
+import asyncio
+from collections.abc import Callable, Iterator
+from typing import Any
+
 import google.oauth2.credentials
 import grpc
 import pytest
 
-from gassist_text import TextAssistant
+from gassist_text import (
+    AsyncTextAssistant,
+    AudioOut,
+    ConversationStateUpdate,
+    DisplayText,
+    ScreenOut,
+    TextAssistant,
+)
+from gassist_text.channel_pool import channel_options
+from gassist_text.fake_server import FakeEmbeddedAssistant
+from google.assistant.embedded.v1alpha2 import embedded_assistant_pb2
+
+RESPONSES = [
+    embedded_assistant_pb2.AssistResponse(
+        dialog_state_out=embedded_assistant_pb2.DialogStateOut(
+            conversation_state=b"state", supplemental_display_text="hello"
+        ),
+        screen_out=embedded_assistant_pb2.ScreenOut(data=b"<html></html>"),
+    ),
+    embedded_assistant_pb2.AssistResponse(
+        audio_out=embedded_assistant_pb2.AudioOut(audio_data=b"ab")
+    ),
+    embedded_assistant_pb2.AssistResponse(
+        audio_out=embedded_assistant_pb2.AudioOut(audio_data=b"cd")
+    ),
+]
+
+
+class FakeStub:
+    """Stub that returns canned responses."""
+
+    def Assist(
+        self, requests: Iterator[Any], timeout: int
+    ) -> Iterator[embedded_assistant_pb2.AssistResponse]:
+        """Consume the requests and return canned responses."""
+        list(requests)
+        return iter(RESPONSES)
 
 
 def test_textinput() -> None:
@@ -15,3 +55,116 @@ def test_textinput() -> None:
         pytest.raises(grpc._channel._MultiThreadedRendezvous),
     ):
         assistant.assist("tell me a joke")
+
+
+def test_async_textinput() -> None:
+    """Test async assist call raises if no credentials."""
+
+    async def run() -> None:
+        credentials = google.oauth2.credentials.Credentials(token=None)
+        async with AsyncTextAssistant(credentials) as assistant:
+            with pytest.raises(grpc.aio.AioRpcError):
+                await assistant.assist("tell me a joke")
+        # Closing again does nothing.
+        await assistant.close()
+        with pytest.raises(ValueError, match="closed"):
+            await assistant.warmup()
+
+    asyncio.run(run())
+
+
+def test_assist_stream() -> None:
+    """Test assist_stream yields events in order and assist assembles them."""
+    credentials = google.oauth2.credentials.Credentials(token=None)
+    with TextAssistant(credentials, audio_out=True) as assistant:
+        assistant.assistant = FakeStub()  # type: ignore[assignment]
+        assert list(assistant.assist_stream("hi")) == [
+            ConversationStateUpdate(b"state"),
+            DisplayText("hello"),
+            ScreenOut(b"<html></html>"),
+            AudioOut(b"ab"),
+            AudioOut(b"cd"),
+        ]
+        assert assistant.conversation_state == b"state"
+        assert assistant.assist("hi") == ("hello", b"<html></html>", b"abcd")
+
+
+def test_audio_encoding() -> None:
+    """Test the audio configuration is sent and LINEAR16 audio is returned as WAV."""
+    credentials = google.oauth2.credentials.Credentials(token=None)
+    with pytest.raises(ValueError, match="sample_rate_hertz"):
+        TextAssistant(credentials, sample_rate_hertz=48000)
+    requests: list[embedded_assistant_pb2.AssistRequest] = []
+
+    class RecordingStub(FakeStub):
+        def Assist(
+            self, requests_iter: Iterator[bytes], timeout: int
+        ) -> Iterator[embedded_assistant_pb2.AssistResponse]:
+            requests.extend(
+                embedded_assistant_pb2.AssistRequest.FromString(r)
+                for r in requests_iter
+            )
+            return iter(RESPONSES)
+
+    with TextAssistant(
+        credentials,
+        audio_out=True,
+        audio_encoding="LINEAR16",
+        sample_rate_hertz=16000,
+        volume_percentage=50,
+    ) as assistant:
+        assistant.assistant = RecordingStub()  # type: ignore[assignment]
+        events = list(assistant.assist_stream("hi"))
+        assert events[-2:] == [AudioOut(b"ab", "LINEAR16"), AudioOut(b"cd", "LINEAR16")]
+        audio = assistant.assist("hi")[2]
+        assert audio[:4] == b"RIFF" and audio[-4:] == b"abcd"
+        assistant.audio_encoding = "OPUS_IN_OGG"
+        assert assistant.assist("hi")[2] == b"abcd"
+    configs = [request.config.audio_out_config for request in requests]
+    assert [config.encoding for config in configs] == [
+        embedded_assistant_pb2.AudioOutConfig.LINEAR16,
+        embedded_assistant_pb2.AudioOutConfig.LINEAR16,
+        embedded_assistant_pb2.AudioOutConfig.OPUS_IN_OGG,
+    ]
+    assert configs[0].sample_rate_hertz == 16000
+    assert configs[0].volume_percentage == 50
+
+
+def test_warmup(fake_server: Callable[..., str]) -> None:
+    """Test warmup waits for the channel to connect."""
+    credentials = google.oauth2.credentials.Credentials(token=None)
+    address = fake_server(FakeEmbeddedAssistant())
+    with (
+        grpc.insecure_channel(address) as channel,
+        TextAssistant(credentials, channel=channel) as assistant,
+    ):
+        assistant.warmup(timeout=5)
+        assert assistant.assist("hi")[0] == "You said: hi"
+    with (
+        TextAssistant(
+            credentials,
+            api_endpoint="localhost:1",
+            channel_options=channel_options(keepalive_time=300),
+            compression=grpc.Compression.Gzip,
+        ) as assistant,
+        pytest.raises(grpc.FutureTimeoutError),
+    ):
+        assistant.warmup(timeout=0.1)
+    with pytest.raises(ValueError):
+        assistant.warmup()
+
+
+def test_async_warmup() -> None:
+    """Test async warmup times out if the channel can't connect."""
+
+    async def run() -> None:
+        credentials = google.oauth2.credentials.Credentials(token=None)
+        async with AsyncTextAssistant(
+            credentials,
+            api_endpoint="localhost:1",
+            channel_options=channel_options(max_receive_message_length=1 << 24),
+        ) as assistant:
+            with pytest.raises(asyncio.TimeoutError):
+                await assistant.warmup(timeout=0.1)
+
+    asyncio.run(run())
@@ -0,0 +1,96 @@
+"""Tests for the wire format helpers."""
+
+from gassist_text import wire
+from google.assistant.embedded.v1alpha2 import embedded_assistant_pb2
+
+RESPONSE = embedded_assistant_pb2.AssistResponse(
+    event_type=embedded_assistant_pb2.AssistResponse.END_OF_UTTERANCE,
+    audio_out=embedded_assistant_pb2.AudioOut(audio_data=b"\x00" * 1000),
+    screen_out=embedded_assistant_pb2.ScreenOut(
+        format=embedded_assistant_pb2.ScreenOut.HTML, data=b"<html></html>"
+    ),
+    dialog_state_out=embedded_assistant_pb2.DialogStateOut(
+        conversation_state=b"state",
+        supplemental_display_text="hello",
+        volume_percentage=50,
+    ),
+    speech_results=[embedded_assistant_pb2.SpeechRecognitionResult(stability=0.5)],
+)
+
+
+def test_parse_assist_response_skips_disabled_fields() -> None:
+    """Test audio_out and screen_out are only decoded when enabled."""
+    data = RESPONSE.SerializeToString()
+    assert wire.parse_assist_response(data) == RESPONSE
+    text_only = wire.parse_assist_response(data, audio_out=False, display=False)
+    assert not text_only.HasField("audio_out")
+    assert not text_only.HasField("screen_out")
+    assert text_only.dialog_state_out == RESPONSE.dialog_state_out
+    assert text_only.event_type == RESPONSE.event_type
+    assert text_only.speech_results == RESPONSE.speech_results
+    display_only = wire.parse_assist_response(data, audio_out=False)
+    assert not display_only.HasField("audio_out")
+    assert display_only.screen_out == RESPONSE.screen_out
+
+
+def test_strip_fields_returns_data_unchanged() -> None:
+    """Test data without the skipped fields isn't copied."""
+    data = embedded_assistant_pb2.AssistResponse(
+        dialog_state_out=RESPONSE.dialog_state_out
+    ).SerializeToString()
+    assert wire.strip_fields(data, [wire.AUDIO_OUT_FIELD]) is data
+
+
+def test_assist_request_template() -> None:
+    """Test the template produces the same request as building it in full."""
+    template = wire.AssistRequestTemplate(
+        embedded_assistant_pb2.AssistConfig(
+            dialog_state_in=embedded_assistant_pb2.DialogStateIn(language_code="en-US"),
+            device_config=embedded_assistant_pb2.DeviceConfig(device_id="id"),
+        )
+    )
+    for conversation_state, is_new_conversation in (
+        (None, True),
+        (b"\x00" * 300, False),
+    ):
+        expected = embedded_assistant_pb2.AssistRequest(
+            config=embedded_assistant_pb2.AssistConfig(
+                dialog_state_in=embedded_assistant_pb2.DialogStateIn(
+                    language_code="en-US",
+                    conversation_state=conversation_state,
+                    is_new_conversation=is_new_conversation,
+                ),
+                device_config=embedded_assistant_pb2.DeviceConfig(device_id="id"),
+                text_query="tell me a jöke",
+            )
+        )
+        data = template.serialize(
+            "tell me a jöke", conversation_state, is_new_conversation
+        )
+        assert embedded_assistant_pb2.AssistRequest.FromString(data) == expected
+
+
+def test_assist_request_template_overrides_per_call_fields() -> None:
+    """Test per-call fields set in the template's config are replaced by the call's."""
+    template = wire.AssistRequestTemplate(
+        embedded_assistant_pb2.AssistConfig(
+            text_query="template",
+            dialog_state_in=embedded_assistant_pb2.DialogStateIn(
+                language_code="en-US",
+                conversation_state=b"template",
+                is_new_conversation=True,
+            ),
+        )
+    )
+    config = embedded_assistant_pb2.AssistRequest.FromString(
+        template.serialize("hi", None, False)
+    ).config
+    assert config.text_query == "hi"
+    assert config.dialog_state_in == embedded_assistant_pb2.DialogStateIn(
+        language_code="en-US"
+    )
+    config = embedded_assistant_pb2.AssistRequest.FromString(
+        template.serialize("hi", b"state", True)
+    ).config
+    assert config.dialog_state_in.conversation_state == b"state"
+    assert config.dialog_state_in.is_new_conversation